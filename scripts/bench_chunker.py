@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""会話チャンク分割ベンチマーク
+
+合成したメッセージ列を、通常版（Messageを1件ずつ処理）と
+NumPy版（時刻・チャンネルの配列で分割位置を計算）でチャンク化し、所要時間を比較します。
+
+- 分割位置の計算（chunk_spans）は配列のみで行うため、1000万件でも計測できます
+- Messageオブジェクトを使う比較は --baseline-limit 件以下のサイズのみ実行します
+  （100万件で数GBのメモリを使います）。この比較ではどちらも ConversationChunk の
+  生成が大半を占めます
+
+Discord・Firestore・Gemini には接続しません。
+"""
+
+import argparse
+import gc
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core import chunker
+from src.core.models import Message
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def _synthetic_arrays(size: int, channels: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """チャンネルごとに連続し、時刻順に並んだ (チャンネルコード, マイクロ秒) の配列"""
+    rng = np.random.default_rng(seed)
+    keys = np.sort(rng.integers(0, channels, size))
+    # 会話中は数分おき、会話の合間は数時間あく
+    gaps_minutes = np.where(
+        rng.random(size) < 0.9,
+        rng.exponential(3.0, size),
+        rng.exponential(360.0, size),
+    )
+    timestamps = np.cumsum((gaps_minutes * 60 * 1_000_000).astype(np.int64))
+    return keys, timestamps
+
+
+def _messages_from_arrays(keys: np.ndarray, timestamps: np.ndarray) -> list[Message]:
+    """配列からMessageを生成（計測対象外）"""
+    return [
+        Message(
+            message_id=str(i),
+            channel_id=str(key),
+            channel_name=f"ch-{key}",
+            author_id=str(i % 17),
+            author_name=f"user{i % 17}",
+            content="",
+            timestamp=BASE_TIME + timedelta(microseconds=ts),
+            jump_url="",
+        )
+        for i, (key, ts) in enumerate(zip(keys.tolist(), timestamps.tolist()))
+    ]
+
+
+def _timed(fn, *args, **kwargs):
+    # 直前に生成したオブジェクトの世代別GCが先に実行した方だけにかからないようにする
+    gc.collect()
+    gc.freeze()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会話チャンク分割ベンチマーク")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000_000, 10_000_000],
+        help="メッセージ数 デフォルト: 1000000 10000000",
+    )
+    parser.add_argument("--channels", type=int, default=200, help="チャンネル数 デフォルト: 200")
+    parser.add_argument(
+        "--baseline-limit",
+        type=int,
+        default=1_000_000,
+        help="Messageを使う比較を行う最大件数 デフォルト: 1000000",
+    )
+    parser.add_argument("--time-window", type=int, default=30, help="時間ウィンドウ（分）")
+    parser.add_argument("--max-messages", type=int, default=20, help="1チャンクの最大メッセージ数")
+    parser.add_argument("--min-messages", type=int, default=3, help="1チャンクの最小メッセージ数")
+    args = parser.parse_args()
+
+    params = {
+        "time_window_minutes": args.time_window,
+        "max_messages_per_chunk": args.max_messages,
+        "min_messages_per_chunk": args.min_messages,
+    }
+
+    print("=" * 60)
+    print("Discord Search - 会話チャンク分割ベンチマーク")
+    print("=" * 60)
+
+    for size in args.sizes:
+        keys, timestamps = _synthetic_arrays(size, args.channels)
+        (starts, _, _), spans_seconds = _timed(
+            chunker.chunk_spans,
+            keys,
+            timestamps,
+            time_window_us=args.time_window * 60 * 1_000_000,
+            max_messages=args.max_messages,
+            min_messages=args.min_messages,
+        )
+        print(f"\n[{size:,}件] チャンク数: {len(starts):,}")
+        print(f"  分割位置の計算（NumPy配列）: {spans_seconds:.3f}秒")
+
+        if size > args.baseline_limit:
+            print(f"  Messageを使う比較は省略（--baseline-limit {args.baseline_limit:,}）")
+            continue
+
+        messages = _messages_from_arrays(keys, timestamps)
+        vectorized, vectorized_seconds = _timed(
+            chunker.group_messages_into_chunks_vectorized, messages, **params
+        )
+
+        # 通常版（ベクトル化なし）
+        threshold = chunker.VECTORIZE_MIN_MESSAGES
+        chunker.VECTORIZE_MIN_MESSAGES = sys.maxsize
+        try:
+            baseline, baseline_seconds = _timed(
+                chunker.group_messages_into_chunks, messages, **params
+            )
+        finally:
+            chunker.VECTORIZE_MIN_MESSAGES = threshold
+
+        same = vectorized == baseline
+        print(f"  通常版（Message）:            {baseline_seconds:.3f}秒")
+        print(f"  NumPy版（Message→チャンク）:  {vectorized_seconds:.3f}秒 "
+              f"({baseline_seconds / vectorized_seconds:.1f}倍), 結果一致: {same}")
+        del messages, vectorized, baseline
+        gc.unfreeze()
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+"""コア処理のマイクロベンチマーク
+
+合成したDiscordコーパス（日本語の本文、スレッド、添付ファイル・OCRテキスト）で、
+チャンク分割・File Search用テキストの生成・Firestoreドキュメントからの復元・
+検索レスポンスのパースの所要時間を計測します。
+
+結果は --output のファイル（JSON Lines）に1回1行で追記し、同じコーパス設定の
+前回の結果（別のコミット）と比較して、遅くなった処理を表示します。
+
+Discord・Firestore・Gemini には接続しません。
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core import chunker
+from src.core.gemini import parse_search_response
+from src.core.models import Attachment, ConversationChunk, Message
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Discordのsnowflakeのエポック（2015-01-01T00:00:00Z、ミリ秒）
+DISCORD_EPOCH_MS = 1_420_070_400_000
+
+CHANNEL_NAMES = ["雑談", "開発", "経理", "お知らせ", "質問", "デザイン", "営業", "インフラ"]
+AUTHOR_NAMES = ["たろう", "はなこ", "さくら", "けんた", "ゆうき", "あおい", "しょう", "みさき"]
+SUBJECTS = [
+    "明日の会議", "請求書の処理", "本番環境へのデプロイ", "新機能のレビュー", "週報",
+    "サーバーの負荷", "来月のイベント", "見積書", "APIの仕様", "問い合わせの件",
+]
+PREDICATES = [
+    "について確認したいです", "は完了しました", "の件、どうなりましたか？", "をお願いします",
+    "は来週までに対応できそうです", "で気になる点があります", "を共有しました",
+    "は少し遅れそうです🙇", "、問題なさそうです",
+]
+REPLIES = [
+    "了解です！", "ありがとうございます🙏", "LGTM", "👍", "確認します", "それで大丈夫だと思います",
+    "少し遅れます", "おつかれさまです",
+]
+OCR_TEXTS = [
+    "株式会社〇〇 御中\n請求書\n請求金額: {n:,}円\nお支払期限: 2024年12月末日",
+    "見積書\n件名: システム開発\n合計: {n:,}円（税込）",
+    "エラー: ConnectionTimeout\n再試行回数: {n}\n詳細はログを確認してください",
+]
+CONTENT_TYPES = ["image/png", "image/jpeg", "application/pdf"]
+
+# チャンネルごとのスレッド数
+THREADS_PER_CHANNEL = 2
+# 会話の合間（数時間の空白）が入る確率と平均時間
+BREAK_PROBABILITY = 0.05
+BREAK_MEAN_HOURS = 6.0
+
+
+def _snowflake(timestamp: datetime, sequence: int) -> str:
+    milliseconds = int(timestamp.timestamp() * 1000) - DISCORD_EPOCH_MS
+    return str((milliseconds << 22) | (sequence & 0x3FFFFF))
+
+
+def _japanese_text(rng: random.Random) -> str:
+    """1〜3文の日本語の本文（短い返信が多め）"""
+    if rng.random() < 0.4:
+        return rng.choice(REPLIES)
+    return "。".join(
+        rng.choice(SUBJECTS) + rng.choice(PREDICATES) for _ in range(rng.randint(1, 3))
+    )
+
+
+def generate_corpus(
+    messages: int = 20_000,
+    channels: int = 20,
+    authors: int = 50,
+    messages_per_hour: float = 30.0,
+    attachment_ratio: float = 0.1,
+    ocr_ratio: float = 0.3,
+    thread_ratio: float = 0.1,
+    seed: int = 0,
+) -> list[Message]:
+    """合成したDiscordのメッセージ（チャンネルごとに時間順）
+
+    Args:
+        messages: メッセージ数
+        channels: チャンネル数（投稿数はチャンネルごとに偏りを持たせる）
+        authors: 投稿者数
+        messages_per_hour: 会話中の1チャンネルあたりの投稿頻度
+        attachment_ratio: 添付ファイル付きメッセージの割合
+        ocr_ratio: 添付ファイルのうちOCRテキストがある割合
+        thread_ratio: スレッド内のメッセージの割合
+        seed: 乱数シード
+    """
+    rng = random.Random(seed)
+    guild_id = "1000000000000000000"
+    created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    author_list = [
+        (_snowflake(created, i), AUTHOR_NAMES[i % len(AUTHOR_NAMES)] + str(i // len(AUTHOR_NAMES)))
+        for i in range(authors)
+    ]
+
+    # 投稿数はチャンネル番号に反比例（活発なチャンネルと静かなチャンネル）
+    weights = [1 / (i + 1) for i in range(channels)]
+    counts = Counter(rng.choices(range(channels), weights=weights, k=messages))
+
+    corpus: list[Message] = []
+    sequence = 0
+    for channel in range(channels):
+        channel_id = _snowflake(created, authors + channel)
+        channel_name = f"{CHANNEL_NAMES[channel % len(CHANNEL_NAMES)]}-{channel}"
+        threads = [
+            (_snowflake(created + timedelta(days=1), channel * THREADS_PER_CHANNEL + t),
+             f"{rng.choice(SUBJECTS)}（スレッド{t + 1}）")
+            for t in range(THREADS_PER_CHANNEL)
+        ]
+        members = rng.sample(author_list, min(8, authors))
+        timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(
+            minutes=rng.randrange(24 * 60)
+        )
+
+        for _ in range(counts[channel]):
+            if rng.random() < BREAK_PROBABILITY:
+                gap_seconds = rng.expovariate(1 / (BREAK_MEAN_HOURS * 3600))
+            else:
+                gap_seconds = rng.expovariate(messages_per_hour / 3600)
+            timestamp += timedelta(seconds=gap_seconds)
+            sequence += 1
+            message_id = _snowflake(timestamp, sequence)
+
+            # スレッド内のメッセージは channel_id がスレッドID
+            thread_id = thread_name = None
+            message_channel_id = channel_id
+            if rng.random() < thread_ratio:
+                thread_id, thread_name = rng.choice(threads)
+                message_channel_id = thread_id
+
+            attachments = []
+            if rng.random() < attachment_ratio:
+                for j in range(rng.choice([1, 1, 1, 2])):
+                    content_type = rng.choice(CONTENT_TYPES)
+                    filename = f"file_{sequence}_{j}.{content_type.split('/')[1]}"
+                    has_ocr = rng.random() < ocr_ratio
+                    attachments.append(Attachment(
+                        filename=filename,
+                        content_type=content_type,
+                        url=f"https://cdn.discordapp.com/attachments/{message_channel_id}/"
+                            f"{message_id}/{filename}",
+                        has_ocr=has_ocr,
+                        ocr_text=(
+                            rng.choice(OCR_TEXTS).format(n=rng.randrange(1, 1_000_000))
+                            if has_ocr else None
+                        ),
+                    ))
+
+            author_id, author_name = rng.choice(members)
+            corpus.append(Message(
+                message_id=message_id,
+                channel_id=message_channel_id,
+                channel_name=channel_name,
+                thread_id=thread_id,
+                thread_name=thread_name,
+                author_id=author_id,
+                author_name=author_name,
+                content=_japanese_text(rng),
+                timestamp=timestamp,
+                has_attachment=bool(attachments),
+                attachments=attachments,
+                jump_url=f"https://discord.com/channels/{guild_id}/{message_channel_id}/{message_id}",
+                synced_at=(timestamp + timedelta(minutes=30)).replace(tzinfo=None),
+            ))
+    return corpus
+
+
+def generate_search_responses(
+    messages: list[Message], count: int, seed: int = 0
+) -> list[str]:
+    """search_with_context の応答テキスト（```json ブロック、JSONのみ、JSONなしを混在）"""
+    rng = random.Random(seed)
+    responses = []
+    for _ in range(count):
+        hits = rng.sample(messages, min(5, len(messages)))
+        data = {"results": [
+            {
+                "message_id": f"msg_{msg.message_id}",
+                "reason": f"{rng.choice(SUBJECTS)}に関する発言です",
+                "highlight": msg.content[:40],
+            }
+            for msg in hits
+        ]}
+        kind = rng.random()
+        if kind < 0.8:
+            body = json.dumps(data, ensure_ascii=False, indent=2)
+            responses.append(f"検索結果は以下の通りです。\n```json\n{body}\n```")
+        elif kind < 0.9:
+            responses.append(json.dumps(data, ensure_ascii=False))
+        else:
+            ids = " ".join(f"msg_{msg.message_id}" for msg in hits)
+            responses.append(f"関連するメッセージは {ids} です。")
+    return responses
+
+
+def _channel_groups(messages: list[Message]) -> list[list[Message]]:
+    """チャンネル/スレッドごとの時間順のメッセージ"""
+    grouped: dict[tuple[str, str | None], list[Message]] = defaultdict(list)
+    for msg in messages:
+        grouped[(msg.channel_id, msg.thread_id)].append(msg)
+    for group in grouped.values():
+        group.sort(key=lambda m: m.timestamp)
+    return list(grouped.values())
+
+
+def _group_without_numpy(messages: list[Message], **params) -> list[ConversationChunk]:
+    threshold = chunker.VECTORIZE_MIN_MESSAGES
+    chunker.VECTORIZE_MIN_MESSAGES = sys.maxsize
+    try:
+        return chunker.group_messages_into_chunks(messages, **params)
+    finally:
+        chunker.VECTORIZE_MIN_MESSAGES = threshold
+
+
+def build_cases(messages: list[Message], search_responses: list[str]) -> dict:
+    """計測対象: 名前 → (1回分の処理, 1回あたりの件数)"""
+    params = {"time_window_minutes": 30, "max_messages_per_chunk": 20, "min_messages_per_chunk": 3}
+    time_window = timedelta(minutes=params["time_window_minutes"])
+
+    # 最小コンテキスト保証の前のチャンク（チャンネル/スレッド単位）
+    groups = _channel_groups(messages)
+    raw_chunks = [
+        (chunker._create_chunks_for_channel(group, time_window, params["max_messages_per_chunk"]),
+         group)
+        for group in groups
+    ]
+    raw_chunk_count = sum(len(chunks) for chunks, _ in raw_chunks)
+
+    def ensure_minimum_context():
+        for chunks, group in raw_chunks:
+            chunker._ensure_minimum_context(chunks, group, params["min_messages_per_chunk"])
+
+    # チャンクとそのメッセージ
+    chunks = _group_without_numpy(messages, **params)
+    by_id = {msg.message_id: msg for msg in messages}
+    chunk_messages = [
+        (chunk, [by_id[message_id] for message_id in chunk.message_ids]) for chunk in chunks
+    ]
+
+    # Firestoreのドキュメント（保存時と同じ model_dump(mode="json")）
+    docs = [msg.model_dump(mode="json") for msg in messages]
+
+    cases = {
+        "group_messages_into_chunks": (
+            lambda: chunker.group_messages_into_chunks(messages, **params), len(messages)
+        ),
+        "group_messages_into_chunks[python]": (
+            lambda: _group_without_numpy(messages, **params), len(messages)
+        ),
+        "_ensure_minimum_context": (ensure_minimum_context, raw_chunk_count),
+        "Message.to_file_content": (
+            lambda: [msg.to_file_content() for msg in messages], len(messages)
+        ),
+        "ConversationChunk.to_file_content": (
+            lambda: [chunk.to_file_content(msgs) for chunk, msgs in chunk_messages],
+            len(chunk_messages),
+        ),
+        "Message(**doc)": (lambda: [Message(**doc) for doc in docs], len(docs)),
+        "parse_search_response": (
+            lambda: [parse_search_response(text) for text in search_responses],
+            len(search_responses),
+        ),
+    }
+    if not chunker.NUMPY_AVAILABLE or len(messages) < chunker.VECTORIZE_MIN_MESSAGES:
+        # 通常版と同じ処理になるため省略
+        del cases["group_messages_into_chunks"]
+    return cases
+
+
+def measure(fn, repeat: int) -> list[float]:
+    """repeat回実行した各回の所要時間（秒）"""
+    seconds = []
+    for _ in range(repeat):
+        # timeit と同様、計測中は世代別GCを止める
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return seconds
+
+
+def _git_commit() -> str | None:
+    """現在のコミット（未コミットの変更があれば -dirty を付ける）"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_previous(path: Path, corpus: dict, commit: str | None) -> dict | None:
+    """同じコーパス設定の直近の結果（別のコミットを優先）"""
+    if not path.exists():
+        return None
+    records = [
+        record
+        for record in map(json.loads, path.read_text(encoding="utf-8").splitlines())
+        if record["corpus"] == corpus
+    ]
+    other_commits = [record for record in records if record["commit"] != commit]
+    candidates = other_commits or records
+    return candidates[-1] if candidates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コア処理のマイクロベンチマーク")
+    parser.add_argument(
+        "--messages", type=int, default=20_000, help="メッセージ数 デフォルト: 20000"
+    )
+    parser.add_argument("--channels", type=int, default=20, help="チャンネル数 デフォルト: 20")
+    parser.add_argument("--authors", type=int, default=50, help="投稿者数 デフォルト: 50")
+    parser.add_argument(
+        "--messages-per-hour", type=float, default=30.0,
+        help="会話中の1チャンネルあたりの投稿頻度 デフォルト: 30",
+    )
+    parser.add_argument(
+        "--attachment-ratio", type=float, default=0.1,
+        help="添付ファイル付きの割合 デフォルト: 0.1",
+    )
+    parser.add_argument(
+        "--ocr-ratio", type=float, default=0.3,
+        help="添付ファイルのうちOCRありの割合 デフォルト: 0.3",
+    )
+    parser.add_argument(
+        "--thread-ratio", type=float, default=0.1,
+        help="スレッド内のメッセージの割合 デフォルト: 0.1",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード デフォルト: 0")
+    parser.add_argument(
+        "--search-responses", type=int, default=5_000, help="検索レスポンス数 デフォルト: 5000"
+    )
+    parser.add_argument("--repeat", type=int, default=7, help="各処理の実行回数 デフォルト: 7")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=PROJECT_ROOT / ".cache" / "bench_results.jsonl",
+        help="結果を追記するファイル デフォルト: .cache/bench_results.jsonl",
+    )
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="前回よりこの割合以上遅い処理を表示（最小値で比較） デフォルト: 0.25",
+    )
+    args = parser.parse_args()
+
+    # JSONパース失敗時のフォールバックの警告ログを出さない
+    logging.disable(logging.WARNING)
+
+    corpus_params = {
+        "messages": args.messages,
+        "channels": args.channels,
+        "authors": args.authors,
+        "messages_per_hour": args.messages_per_hour,
+        "attachment_ratio": args.attachment_ratio,
+        "ocr_ratio": args.ocr_ratio,
+        "thread_ratio": args.thread_ratio,
+        "seed": args.seed,
+        "search_responses": args.search_responses,
+    }
+    generator_params = {k: v for k, v in corpus_params.items() if k != "search_responses"}
+
+    print("=" * 72)
+    print("Discord Search - コア処理のマイクロベンチマーク")
+    print("=" * 72)
+
+    start = time.perf_counter()
+    messages = generate_corpus(**generator_params)
+    search_responses = generate_search_responses(messages, args.search_responses, args.seed)
+    cases = build_cases(messages, search_responses)
+    print(f"コーパス: {len(messages):,}件 "
+          f"（添付あり {sum(m.has_attachment for m in messages):,}件, "
+          f"スレッド {sum(m.thread_id is not None for m in messages):,}件）, "
+          f"生成 {time.perf_counter() - start:.1f}秒")
+
+    commit = _git_commit()
+    previous = load_previous(args.output, corpus_params, commit)
+    if previous:
+        print(f"比較対象: {previous['commit']} ({previous['created_at']})")
+
+    results = {}
+    regressions = []
+    # 見出しは全角文字の表示幅（2）を考慮して揃える
+    print(f"\n{'処理':<36}{'件数':>6}{'最小 µs/件':>9}{'中央値 µs/件':>10}{'前回比':>5}")
+    for name, (fn, ops) in cases.items():
+        seconds = measure(fn, args.repeat)
+        results[name] = {
+            "ops": ops,
+            "min_seconds": min(seconds),
+            "median_seconds": statistics.median(seconds),
+        }
+        us_per_op = min(seconds) / ops * 1e6
+        median_us = statistics.median(seconds) / ops * 1e6
+
+        ratio = ""
+        before = (previous or {}).get("results", {}).get(name)
+        if before:
+            change = min(seconds) / before["min_seconds"]
+            ratio = f"{change:.2f}x"
+            if change > 1 + args.threshold:
+                regressions.append((name, change))
+        print(f"{name:<38}{ops:>8,}{us_per_op:>12.2f}{median_us:>14.2f}{ratio:>8}")
+
+    if regressions:
+        print("\n前回より遅くなった処理:")
+        for name, change in regressions:
+            print(f"  {name}: {change:.2f}倍")
+
+    if not args.no_save:
+        record = {
+            "commit": commit,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": chunker.NUMPY_AVAILABLE,
+            "corpus": corpus_params,
+            "results": results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"\n結果を保存: {args.output}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""Firestore アクセスベンチマーク
+
+FirestoreClient の実際のメソッドを、RPCレイテンシを注入したダミーの
+AsyncClient に対して実行し、変更前の呼び出し方（同期クライアントで
+1件ずつ get()/set()）と比較します。
+
+- 検索結果の取得: /search 1回分のメッセージ取得をN件同時に実行
+  （変更前: 1件ずつ get() / 変更後: get_messages_by_ids の get_all 1回）
+- 同期の書き込み: メッセージの保存
+  （変更前: 1件ずつ set() / 変更後: save_messages のバッチコミット。
+   --fail-commits で一時的なコミット失敗を注入し、再試行も通す）
+
+いずれもイベントループの最大遅延（他のインタラクションやheartbeatが
+待たされる時間）もあわせて計測します。実際のFirestoreには接続しません。
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.firestore import SEARCH_RESULT_FIELDS, FirestoreClient
+from src.core.models import Message
+
+
+class _Snapshot:
+    """DocumentSnapshot 相当"""
+
+    def __init__(self, doc_id: str, data: dict | None):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> dict | None:
+        return dict(self._data) if self._data is not None else None
+
+
+class _Store:
+    """ダミーのFirestore（コレクション名 → ドキュメントID → データ）とRPCの記録"""
+
+    def __init__(self, latency: float, fail_commits: int = 0):
+        self.latency = latency
+        self.fail_commits = fail_commits
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.rpc_count = 0
+
+    def rpc(self) -> None:
+        self.rpc_count += 1
+
+
+class _BlockingDocumentRef:
+    """firestore.Client の DocumentReference 相当（RPCがスレッドをブロック）"""
+
+    def __init__(self, store: _Store, collection: str, doc_id: str):
+        self.store = store
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self) -> _Snapshot:
+        self.store.rpc()
+        time.sleep(self.store.latency)
+        return _Snapshot(self.id, self.store.collections[self.collection].get(self.id))
+
+    def set(self, data: dict) -> None:
+        self.store.rpc()
+        time.sleep(self.store.latency)
+        self.store.collections[self.collection][self.id] = data
+
+
+class _AsyncDocumentRef(_BlockingDocumentRef):
+    """firestore.AsyncClient の AsyncDocumentReference 相当"""
+
+    async def get(self) -> _Snapshot:
+        self.store.rpc()
+        await asyncio.sleep(self.store.latency)
+        return _Snapshot(self.id, self.store.collections[self.collection].get(self.id))
+
+    async def set(self, data: dict) -> None:
+        self.store.rpc()
+        await asyncio.sleep(self.store.latency)
+        self.store.collections[self.collection][self.id] = data
+
+
+class _Collection:
+    def __init__(self, store: _Store, name: str, document_type: type):
+        self.store = store
+        self.name = name
+        self.document_type = document_type
+        store.collections.setdefault(name, {})
+
+    def document(self, doc_id: str) -> _BlockingDocumentRef:
+        return self.document_type(self.store, self.name, doc_id)
+
+
+class _AsyncBatch:
+    """AsyncWriteBatch 相当（commit() が1RPC、fail_commits 回までは失敗する）"""
+
+    def __init__(self, store: _Store):
+        self.store = store
+        self.writes: list[tuple[_AsyncDocumentRef, dict]] = []
+
+    def set(self, ref: _AsyncDocumentRef, data: dict) -> None:
+        self.writes.append((ref, data))
+
+    async def commit(self) -> None:
+        self.store.rpc()
+        await asyncio.sleep(self.store.latency)
+        if self.store.fail_commits > 0:
+            self.store.fail_commits -= 1
+            raise RuntimeError("503 Service Unavailable（注入した失敗）")
+        for ref, data in self.writes:
+            self.store.collections[ref.collection][ref.id] = data
+
+
+class _BlockingClient:
+    """変更前の firestore.Client 相当"""
+
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self.store, name, _BlockingDocumentRef)
+
+
+class _AsyncClient:
+    """firestore.AsyncClient 相当（get_all・batch を含む）"""
+
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self.store, name, _AsyncDocumentRef)
+
+    def batch(self) -> _AsyncBatch:
+        return _AsyncBatch(self.store)
+
+    async def get_all(self, refs, field_paths=None):
+        # BatchGetDocuments は1RPCで全ドキュメントを返す
+        self.store.rpc()
+        await asyncio.sleep(self.store.latency)
+        for ref in refs:
+            data = self.store.collections[ref.collection].get(ref.id)
+            if data is not None and field_paths is not None:
+                data = {key: value for key, value in data.items() if key in field_paths}
+            yield _Snapshot(ref.id, data)
+
+
+def _firestore_client(store: _Store) -> FirestoreClient:
+    """ダミーの AsyncClient を使う FirestoreClient（__init__ と同じ参照を設定）"""
+    client = FirestoreClient.__new__(FirestoreClient)
+    client.db = _AsyncClient(store)
+    client.messages_ref = client.db.collection("messages")
+    return client
+
+
+# --- 変更前の呼び出し方（同期クライアントを async 関数内で呼ぶ） ---
+
+async def _old_get_messages_by_ids(db: _BlockingClient, message_ids: list[str]) -> list[Message]:
+    messages = []
+    for message_id in message_ids:
+        doc = db.collection("messages").document(message_id).get()
+        if doc.exists:
+            messages.append(Message(**doc.to_dict()))
+    return messages
+
+
+async def _old_save_messages(db: _BlockingClient, messages: list[Message]) -> int:
+    for message in messages:
+        db.collection("messages").document(message.message_id).set(message.model_dump(mode="json"))
+    return len(messages)
+
+
+def _make_messages(count: int) -> list[Message]:
+    base = datetime(2024, 12, 15, 10, 0, tzinfo=timezone.utc)
+    channel_id = "1100000000000000001"
+    return [
+        Message(
+            message_id=str(message_id),
+            channel_id=channel_id,
+            channel_name="雑談",
+            author_id="1200000000000000002",
+            author_name="たろう",
+            content=f"請求書の件、確認お願いします {i}",
+            timestamp=base + timedelta(seconds=i),
+            jump_url=f"https://discord.com/channels/1/{channel_id}/{message_id}",
+        )
+        for i, message_id in enumerate(range(1300000000000000000, 1300000000000000000 + count))
+    ]
+
+
+async def _measure(coro_factories) -> tuple[float, float, list]:
+    """コルーチンを同時実行し、(経過秒数, イベントループの最大遅延秒数, 結果) を返す"""
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        interval = 0.005
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - start - interval)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(factory() for factory in coro_factories))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+    return elapsed, max_lag, results
+
+
+async def bench_search(concurrency: list[int], latency: float, results: int) -> None:
+    messages = _make_messages(results)
+    data = {msg.message_id: msg.model_dump(mode="json") for msg in messages}
+    message_ids = list(data)
+
+    print(f"\n検索結果の取得（{results}件/検索）")
+    print(f"{'同時数':>6} {'変更前(秒)':>10} {'変更後(秒)':>10} {'高速化':>7} "
+          f"{'RPC 前→後':>12} {'最大遅延 前→後(ms)':>20}")
+    for n in concurrency:
+        old_store, new_store = _Store(latency), _Store(latency)
+        old_db = _BlockingClient(old_store)
+        old_store.collections["messages"] = dict(data)
+        client = _firestore_client(new_store)
+        new_store.collections["messages"] = dict(data)
+
+        old_seconds, old_lag, old_results = await _measure(
+            [lambda: _old_get_messages_by_ids(old_db, message_ids)] * n
+        )
+        new_seconds, new_lag, new_results = await _measure(
+            [lambda: client.get_messages_by_ids(message_ids, field_paths=SEARCH_RESULT_FIELDS)] * n
+        )
+        # 変更前後で同じメッセージを返す
+        assert all(found == old for (found, _), old in zip(new_results, old_results))
+
+        speedup = old_seconds / new_seconds if new_seconds else 0
+        rpcs = f"{old_store.rpc_count}→{new_store.rpc_count}"
+        lags = f"{old_lag * 1000:.0f}→{new_lag * 1000:.0f}"
+        print(f"{n:>6} {old_seconds:>10.3f} {new_seconds:>10.3f} {speedup:>6.1f}x "
+              f"{rpcs:>12} {lags:>20}")
+
+
+async def bench_writes(count: int, latency: float, fail_commits: int) -> None:
+    messages = _make_messages(count)
+
+    old_store = _Store(latency)
+    old_db = _BlockingClient(old_store)
+    old_db.collection("messages")
+    old_seconds, old_lag, _ = await _measure([lambda: _old_save_messages(old_db, messages)])
+
+    new_store = _Store(latency, fail_commits=fail_commits)
+    client = _firestore_client(new_store)
+    new_seconds, new_lag, (saved,) = await _measure([lambda: client.save_messages(messages)])
+    assert new_store.collections["messages"] == old_store.collections["messages"]
+
+    print(f"\nメッセージの書き込み（{count}件、注入したコミット失敗: {fail_commits}回）")
+    print(f"  変更前（1件ずつ set）:   {old_seconds:8.3f}秒, RPC {old_store.rpc_count}回, "
+          f"最大遅延 {old_lag * 1000:.0f}ms")
+    print(f"  変更後（save_messages）: {new_seconds:8.3f}秒, RPC {new_store.rpc_count}回, "
+          f"最大遅延 {new_lag * 1000:.0f}ms, 保存 {saved}/{count}件"
+          f"（再試行の待機を含む）")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Firestore アクセスベンチマーク")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+        help="同時検索数 デフォルト: 1 2 4 8 16 32",
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=20.0,
+        help="1RPCあたりの模擬レイテンシ（ミリ秒）デフォルト: 20",
+    )
+    parser.add_argument(
+        "--results",
+        type=int,
+        default=5,
+        help="1検索あたりの取得メッセージ数 デフォルト: 5",
+    )
+    parser.add_argument(
+        "--writes",
+        type=int,
+        default=500,
+        help="書き込むメッセージ数 デフォルト: 500",
+    )
+    parser.add_argument(
+        "--fail-commits",
+        type=int,
+        default=1,
+        help="失敗させるバッチコミット数（再試行の確認用）デフォルト: 1",
+    )
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+
+    print("=" * 72)
+    print("Discord Search - Firestore アクセスベンチマーク")
+    print("=" * 72)
+    print(f"レイテンシ: {args.latency_ms:.0f}ms/RPC")
+
+    await bench_search(args.concurrency, latency, args.results)
+    await bench_writes(args.writes, latency, args.fail_commits)
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""メッセージテーブル メモリベンチマーク
+
+合成したメッセージを list[Message] と MessageTable（列指向）で保持した場合の
+メモリ使用量（tracemalloc）と、相互変換の所要時間を比較します。
+スナップショットファイル（src/core/snapshot.py）の保存・読み込みも計測します。
+
+Discord・Firestore・Gemini には接続しません。
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.message_table import MessageTable
+from src.core.models import Attachment, Message
+from src.core.snapshot import load_snapshot, save_snapshot
+
+# Discordのsnowflakeのエポック（2015-01-01T00:00:00Z、ミリ秒）
+DISCORD_EPOCH_MS = 1_420_070_400_000
+
+PHRASES = [
+    "おはようございます", "了解です！", "明日の会議は10時からでお願いします",
+    "請求書の処理について確認したいんだけど、来週までに対応できる？",
+    "資料を共有しました", "ありがとうございます🙏", "それで大丈夫だと思います",
+    "デプロイ完了しました。確認お願いします", "少し遅れます", "LGTM",
+]
+
+
+def _snowflake(timestamp: datetime, sequence: int) -> str:
+    milliseconds = int(timestamp.timestamp() * 1000) - DISCORD_EPOCH_MS
+    return str((milliseconds << 22) | (sequence & 0x3FFFFF))
+
+
+def generate_messages(count: int, channels: int, seed: int = 0) -> list[Message]:
+    """合成メッセージを生成（日本語の本文、一部に添付ファイルとOCRテキスト）"""
+    rng = random.Random(seed)
+    guild_id = "1000000000000000000"
+    channel_ids = [
+        _snowflake(datetime(2020, 1, 1, tzinfo=timezone.utc), i) for i in range(channels)
+    ]
+    authors = [(_snowflake(datetime(2019, 1, 1, tzinfo=timezone.utc), i), f"ユーザー{i}")
+               for i in range(50)]
+    timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    messages = []
+    for i in range(count):
+        timestamp += timedelta(seconds=rng.randint(1, 600))
+        message_id = _snowflake(timestamp, i)
+        channel = rng.randrange(channels)
+        author_id, author_name = rng.choice(authors)
+        attachments = []
+        if rng.random() < 0.1:
+            filename = f"screenshot_{i}.png"
+            attachments.append(Attachment(
+                filename=filename,
+                content_type="image/png",
+                url=f"https://cdn.discordapp.com/attachments/{channel_ids[channel]}/{i}/{filename}",
+                has_ocr=rng.random() < 0.3,
+            ))
+            if attachments[0].has_ocr:
+                attachments[0].ocr_text = "株式会社〇〇\n請求書\n金額: 100,000円"
+        messages.append(Message(
+            message_id=message_id,
+            channel_id=channel_ids[channel],
+            channel_name=f"チャンネル{channel}",
+            author_id=author_id,
+            author_name=author_name,
+            content=" ".join(rng.choices(PHRASES, k=rng.randint(1, 3))),
+            timestamp=timestamp,
+            has_attachment=bool(attachments),
+            attachments=attachments,
+            jump_url=f"https://discord.com/channels/{guild_id}/{channel_ids[channel]}/{message_id}",
+            synced_at=timestamp + timedelta(hours=1),
+        ))
+    return messages
+
+
+def _traced(fn, *args):
+    """関数の実行で増えたメモリ（戻り値が保持しているもの）を計測"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _timed(fn, *args):
+    # 生成済みのメッセージを世代別GCの対象から外し、変換処理のみを計測する
+    gc.collect()
+    gc.freeze()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="メッセージテーブル メモリベンチマーク")
+    parser.add_argument(
+        "--messages", type=int, default=100_000, help="メッセージ数 デフォルト: 100000"
+    )
+    parser.add_argument("--channels", type=int, default=50, help="チャンネル数 デフォルト: 50")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Discord Search - メッセージテーブル メモリベンチマーク")
+    print("=" * 60)
+
+    messages, list_bytes = _traced(generate_messages, args.messages, args.channels)
+    table, table_bytes = _traced(MessageTable.from_messages, messages)
+
+    count = len(messages)
+    print(f"\nメッセージ数: {count:,}")
+    print(f"  list[Message]: {list_bytes / 2**20:8.1f} MiB ({list_bytes / count:6.0f} B/件)")
+    print(f"  MessageTable:  {table_bytes / 2**20:8.1f} MiB ({table_bytes / count:6.0f} B/件)"
+          f"  削減率 {1 - table_bytes / list_bytes:.0%}")
+    print(f"    うちデータ本体: {table.nbytes() / 2**20:.1f} MiB "
+          f"（文字列プール {len(table.strings):,}件）")
+
+    _, from_seconds = _timed(MessageTable.from_messages, messages)
+    restored, to_seconds = _timed(table.to_messages)
+    print("\n変換時間:")
+    print(f"  Message → テーブル: {from_seconds:.3f}秒 ({from_seconds / count * 1e6:.1f}µs/件)")
+    print(f"  テーブル → Message: {to_seconds:.3f}秒 ({to_seconds / count * 1e6:.1f}µs/件)")
+    print(f"  結果一致: {restored == messages}")
+
+    print("\nスナップショット:")
+    with tempfile.TemporaryDirectory() as tmp:
+        for compress in (True, False):
+            path = Path(tmp) / f"messages-{compress}.snapshot"
+            size, save_seconds = _timed(save_snapshot, table, path, compress)
+            loaded, load_seconds = _timed(load_snapshot, path)
+            _, channel_seconds = _timed(lambda: sorted(set(loaded.channel_ids)))
+            label = "圧縮あり" if compress else "圧縮なし"
+            print(f"  {label}: {size / 2**20:6.1f} MiB, 保存 {save_seconds:.3f}秒, "
+                  f"読み込み（mmap） {load_seconds:.3f}秒, "
+                  f"チャンネルID列の走査 {channel_seconds:.3f}秒")
+        print(f"  結果一致: {loaded.to_messages() == messages}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""OCR前処理ベンチマーク
+
+サンプル画像ごとに前処理（縮小・スキップ判定）の結果と所要時間を表示します。
+YomiTokuがインストールされていれば、前処理あり・なしでOCRを実行し、
+CPU秒数と抽出テキストの一致率（文字バイグラムの再現率）を比較します。
+
+一致率の基準は、画像と同名の .txt ファイル（例: invoice.png → invoice.txt）があれば
+その内容、なければ前処理なし（元解像度）のOCR結果です。
+
+Discord・Firestore には接続しません。
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.jobs import ocr
+from src.jobs.preprocess import preprocess_image
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+
+def _bigrams(text: str) -> Counter[str]:
+    """空白を除いた文字バイグラム"""
+    chars = "".join(text.split())
+    return Counter(chars[i:i + 2] for i in range(len(chars) - 1))
+
+
+def bigram_recall(reference: str, text: str) -> float:
+    """基準テキストのバイグラムのうち、抽出テキストに含まれる割合"""
+    expected = _bigrams(reference)
+    if not expected:
+        return 1.0
+    found = _bigrams(text)
+    return sum((expected & found).values()) / sum(expected.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR前処理ベンチマーク")
+    parser.add_argument("images", type=Path, help="サンプル画像のディレクトリ")
+    parser.add_argument(
+        "--no-ocr",
+        action="store_true",
+        help="前処理のみ計測する（YomiTokuがあってもOCRしない）",
+    )
+    args = parser.parse_args()
+
+    paths = sorted(p for p in args.images.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        print(f"画像がありません: {args.images}")
+        return
+
+    run_ocr = ocr.YOMITOKU_AVAILABLE and not args.no_ocr
+    if run_ocr:
+        # ワーカープロセスと同じ初期化をこのプロセスで行う
+        ocr._init_worker()
+        run_ocr = ocr._worker_analyzer is not None
+
+    print("=" * 60)
+    print("Discord Search - OCR前処理ベンチマーク")
+    print("=" * 60)
+    if not run_ocr:
+        print("（YomiTokuなし: 前処理のみ計測）")
+
+    baseline_seconds: list[float] = []
+    preprocessed_seconds: list[float] = []
+    recalls: list[float] = []
+    skipped: Counter[str] = Counter()
+
+    for path in paths:
+        start = time.perf_counter()
+        prepared = preprocess_image(path)
+        elapsed = time.perf_counter() - start
+
+        width, height = prepared.original_size
+        if prepared.skipped:
+            skipped[prepared.skip_reason] += 1
+            result = f"スキップ（{prepared.skip_reason}）"
+        else:
+            result = f"{prepared.image.width}x{prepared.image.height}"
+        print(f"\n{path.name}: {width}x{height} → {result}, 前処理 {elapsed * 1000:.1f}ms")
+
+        if not run_ocr:
+            continue
+
+        baseline_text, baseline_cpu, _ = ocr._run_ocr(str(path), preprocess=False)
+        text, cpu, _ = ocr._run_ocr(str(path), preprocess=True)
+        baseline_seconds.append(baseline_cpu)
+        preprocessed_seconds.append(cpu)
+
+        reference_path = path.with_suffix(".txt")
+        if reference_path.exists():
+            reference = reference_path.read_text(encoding="utf-8")
+            baseline_recall = bigram_recall(reference, baseline_text)
+            recalls.append(bigram_recall(reference, text))
+            print(f"  一致率（基準 .txt）: 前処理なし {baseline_recall:.3f}, "
+                  f"前処理あり {recalls[-1]:.3f}")
+        else:
+            recalls.append(bigram_recall(baseline_text, text))
+            print(f"  一致率（前処理なしの結果に対して）: {recalls[-1]:.3f}")
+        print(f"  CPU: 前処理なし {baseline_cpu:.2f}秒, 前処理あり {cpu:.2f}秒")
+
+    print("\n" + "-" * 60)
+    print(f"画像数: {len(paths)}, スキップ: {sum(skipped.values())} {dict(skipped)}")
+    if run_ocr:
+        total_baseline = sum(baseline_seconds)
+        total = sum(preprocessed_seconds)
+        ratio = f" ({total / total_baseline:.0%})" if total_baseline else ""
+        print(f"CPU合計: 前処理なし {total_baseline:.1f}秒 → 前処理あり {total:.1f}秒{ratio}")
+        print(f"一致率: 中央値 {statistics.median(recalls):.3f}, 最小 {min(recalls):.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""起動時間（import時間）ベンチマーク
+
+Bot（python -m src.bot.main）と同期ジョブ（python -m src.jobs.main）が
+起動時に読み込むモジュールを新しいプロセスでimportし、所要時間を計測します。
+Cloud Run のコールドスタートやCLIスクリプトの起動時間の目安になります。
+
+Discord・Firestore・Gemini には接続しません。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# エントリーポイントごとに起動時に読み込まれるモジュール
+TARGETS = {
+    # Botは setup_hook で検索Cogを読み込む
+    "bot": ["src.bot.main", "src.bot.commands.search"],
+    "jobs": ["src.jobs.main"],
+}
+
+
+def _run_import(modules: list[str], importtime: bool = False) -> tuple[float, str]:
+    """新しいプロセスでモジュールをimportし、(経過秒数, stderr) を返す"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", "; ".join(f"import {module}" for module in modules)]
+
+    env = {**os.environ, "GCP_PROJECT_ID": os.environ.get("GCP_PROJECT_ID", "bench")}
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import失敗: {modules}\n{result.stderr}")
+    return elapsed, result.stderr
+
+
+def _slowest_imports(stderr: str, top: int) -> list[tuple[str, float]]:
+    """-X importtime の出力から累積時間の大きいトップレベルパッケージを抽出"""
+    packages: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        if package == "src":
+            continue  # 本体のモジュールは依存パッケージの時間を含むため除外
+        # ネストしたimportは親に含まれるため、最大値をパッケージの時間とする
+        packages[package] = max(packages.get(package, 0.0), int(cumulative) / 1_000_000)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間ベンチマーク")
+    parser.add_argument(
+        "--target",
+        choices=sorted(TARGETS),
+        nargs="+",
+        default=sorted(TARGETS),
+        help="計測するエントリーポイント デフォルト: bot jobs",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="計測回数 デフォルト: 5")
+    parser.add_argument("--top", type=int, default=8, help="表示する重いパッケージ数 デフォルト: 8")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Discord Search - 起動時間ベンチマーク")
+    print("=" * 60)
+
+    for target in args.target:
+        modules = TARGETS[target]
+        # 1回目はバイトコードのコンパイルを含むため除外
+        _run_import(modules)
+        times = [_run_import(modules)[0] for _ in range(args.runs)]
+        _, stderr = _run_import(modules, importtime=True)
+
+        print(f"\n[{target}] import {', '.join(modules)}")
+        print(f"  中央値: {statistics.median(times):.3f}秒 "
+              f"(最小 {min(times):.3f}秒, 最大 {max(times):.3f}秒, {args.runs}回)")
+        print("  重いパッケージ（累積）:")
+        for package, seconds in _slowest_imports(stderr, args.top):
+            print(f"    {package:<24} {seconds:>7.3f}秒")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
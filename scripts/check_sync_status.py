@@ -16,7 +16,7 @@ import discord
 from dotenv import load_dotenv
 
 from src.core.config import settings
-from src.core.firestore import firestore_client
+from src.core.firestore import get_firestore_client
 
 load_dotenv()
 
@@ -28,13 +28,13 @@ async def check_sync_status():
     print("=" * 60)
 
     # Firestore から同期済みチャンネル情報を取得
-    synced_channels = await firestore_client.get_synced_channels_info()
+    synced_channels = await get_firestore_client().get_synced_channels_info()
     synced_ids = {ch["channel_id"] for ch in synced_channels}
 
     print(f"\n[Firestore] 同期済みチャンネル数: {len(synced_channels)}")
 
     # チャンネルごとのメッセージ数を取得
-    message_counts = await firestore_client.get_message_count_by_channel()
+    message_counts = await get_firestore_client().get_message_count_by_channel()
     total_messages = sum(message_counts.values())
     print(f"[Firestore] 総メッセージ数: {total_messages:,}")
 
@@ -103,7 +103,7 @@ async def check_sync_status():
                 print("\n[OK] すべてのチャンネルが同期済みです")
 
             # 最終同期時刻
-            last_sync = await firestore_client.get_last_sync_time()
+            last_sync = await get_firestore_client().get_last_sync_time()
             if last_sync:
                 print(f"\n最終同期時刻: {last_sync.isoformat()}")
             else:
@@ -3,10 +3,12 @@
 
 既存のメッセージを会話チャンク単位でグループ化し、
 Gemini File Search Storeに再インデックスします。
+前回から変更のあったチャンクのみアップロード・削除します。
 """
 
 import asyncio
 import sys
+from collections.abc import AsyncIterator
 from datetime import datetime
 from pathlib import Path
 
@@ -15,9 +17,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import logging
 
-from src.core.chunker import get_messages_for_chunk, group_messages_into_chunks
-from src.core.firestore import firestore_client
-from src.core.gemini import gemini_client
+from src.core.chunker import group_message_stream_into_chunks
+from src.core.firestore import get_firestore_client
+from src.core.gemini import get_gemini_client, is_document_name
+from src.core.models import ConversationChunk, Message
+from src.core.snapshot import load_snapshot, messages_by_channel
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,19 +30,39 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _delete_indexed_chunk(chunk: ConversationChunk) -> None:
+    """インデックス済みチャンクのドキュメントを削除"""
+    if is_document_name(chunk.file_search_doc_id):
+        await get_gemini_client().delete_document(chunk.file_search_doc_id)
+
+
+async def _stream_snapshot_messages(path: str) -> AsyncIterator[Message]:
+    """スナップショットのメッセージをチャンネル順・時間順に返す"""
+    for msg in messages_by_channel(load_snapshot(path)):
+        yield msg
+
+
 async def reindex_with_conversation_chunks(
     time_window_minutes: int = 30,
     max_messages_per_chunk: int = 20,
     min_messages_per_chunk: int = 3,
     dry_run: bool = False,
+    full: bool = False,
+    snapshot_path: str | None = None,
 ) -> dict:
     """会話チャンク方式で再インデックス
 
+    チャンクIDは先頭メッセージから決定的に生成されるため、前回のチャンクと
+    内容ハッシュを比較し、新規・変更チャンクのみアップロード、
+    不要になったチャンクのみ削除する。
+
     Args:
         time_window_minutes: 同一チャンクとみなす時間ウィンドウ（分）
         max_messages_per_chunk: 1チャンクの最大メッセージ数
         min_messages_per_chunk: 1チャンクの最小メッセージ数（コンテキスト保証）
         dry_run: Trueの場合、インデックスせずにチャンク情報のみ表示
+        full: Trueの場合、既存のファイル・チャンクを全削除して作り直す
+        snapshot_path: 指定した場合、メッセージをFirestoreではなくスナップショットから読む
     """
     logger.info("=" * 50)
     logger.info("会話チャンク方式による再インデックス開始")
@@ -46,68 +70,73 @@ async def reindex_with_conversation_chunks(
     logger.info(f"設定: time_window={time_window_minutes}分, "
                 f"max={max_messages_per_chunk}, min={min_messages_per_chunk}")
 
-    # Step 1: 既存のFile Search Storeファイルを削除
-    if not dry_run:
-        logger.info("Step 1: 既存のFile Search Storeファイルを削除中...")
-        deleted_files = await gemini_client.delete_all_files_in_store()
-        logger.info(f"  {deleted_files}件のファイルを削除")
-
-        # Firestoreの既存チャンクも削除
-        deleted_chunks = await firestore_client.delete_all_chunks()
-        logger.info(f"  {deleted_chunks}件のチャンクを削除")
-    else:
-        logger.info("Step 1: [DRY RUN] ファイル削除をスキップ")
+    # Step 1: 既存チャンクを取得（差分判定用）
+    logger.info("Step 1: 既存チャンクを取得中...")
+    existing_chunks = {c.chunk_id: c for c in await get_firestore_client().get_all_chunks()}
+    logger.info(f"  {len(existing_chunks)}件の既存チャンク")
 
-    # Step 2: Firestoreから全メッセージを取得
-    logger.info("Step 2: Firestoreから全メッセージを取得中...")
-    all_messages = await firestore_client.get_all_messages()
-    logger.info(f"  {len(all_messages)}件のメッセージを取得")
+    # 内容ハッシュ・ドキュメント名がない旧形式のチャンクは差分判定できない
+    legacy_count = sum(
+        1 for c in existing_chunks.values()
+        if not c.content_hash or not is_document_name(c.file_search_doc_id)
+    )
+    if legacy_count and not full:
+        logger.warning(f"  旧形式のチャンクが{legacy_count}件あるため全件再構築します")
+        full = True
+
+    if full:
+        if not dry_run:
+            logger.info("  既存のFile Search Storeファイルを削除中...")
+            deleted_files = await get_gemini_client().delete_all_files_in_store()
+            logger.info(f"  {deleted_files}件のファイルを削除")
+
+            # Firestoreの既存チャンクも削除
+            deleted_chunks = await get_firestore_client().delete_all_chunks()
+            logger.info(f"  {deleted_chunks}件のチャンクを削除")
+        else:
+            logger.info("  [DRY RUN] ファイル削除をスキップ")
+        existing_chunks = {}
+
+    # Step 2: Firestoreからチャンネル単位でメッセージを取得し、チャンク化・差分インデックス
+    # メモリに保持するのは1チャンネル分のメッセージのみ
+    logger.info("Step 2: チャンネル単位でメッセージを取得・チャンク化・インデックス中...")
+    chunk_count = 0
+    total_messages_in_chunks = 0
+    channel_count = 0
+    indexed_count = 0
+    unchanged_count = 0
+    error_count = 0
+    seen_chunk_ids: set[str] = set()
+    dry_run_samples: list[ConversationChunk] = []
 
-    if not all_messages:
-        logger.warning("メッセージがありません。終了します。")
-        return {"chunks": 0, "messages": 0, "indexed": 0, "errors": 0}
+    if snapshot_path:
+        logger.info(f"  メッセージはスナップショットから読み込み: {snapshot_path}")
+        message_stream = _stream_snapshot_messages(snapshot_path)
+    else:
+        message_stream = get_firestore_client().stream_messages()
 
-    # Step 3: メッセージを会話チャンクにグループ化
-    logger.info("Step 3: 会話チャンクにグループ化中...")
-    chunks = group_messages_into_chunks(
-        all_messages,
+    channel_stream = group_message_stream_into_chunks(
+        message_stream,
         time_window_minutes=time_window_minutes,
         max_messages_per_chunk=max_messages_per_chunk,
         min_messages_per_chunk=min_messages_per_chunk,
     )
-    logger.info(f"  {len(chunks)}個のチャンクを生成")
 
-    # チャンク統計
-    total_messages_in_chunks = sum(len(c.message_ids) for c in chunks)
-    avg_messages = total_messages_in_chunks / len(chunks) if chunks else 0
-    logger.info(f"  平均メッセージ数/チャンク: {avg_messages:.1f}")
+    async for chunks, channel_messages in channel_stream:
+        channel_count += 1
+        chunk_count += len(chunks)
+        total_messages_in_chunks += sum(len(c.message_ids) for c in chunks)
 
-    if dry_run:
-        logger.info("\n[DRY RUN] チャンク詳細:")
-        for i, chunk in enumerate(chunks[:10], 1):
-            logger.info(f"  Chunk {i}: #{chunk.channel_name} "
-                       f"({chunk.start_time.strftime('%Y-%m-%d %H:%M')} - "
-                       f"{chunk.end_time.strftime('%H:%M')}) "
-                       f"messages={len(chunk.message_ids)}")
-        if len(chunks) > 10:
-            logger.info(f"  ... and {len(chunks) - 10} more chunks")
-        return {
-            "chunks": len(chunks),
-            "messages": total_messages_in_chunks,
-            "indexed": 0,
-            "errors": 0,
-        }
+        # メッセージIDからMessageオブジェクトへのマップを作成（チャンネル単位）
+        msg_map = {msg.message_id: msg for msg in channel_messages}
+        channel_indexed = 0
 
-    # メッセージIDからMessageオブジェクトへのマップを作成
-    msg_map = {msg.message_id: msg for msg in all_messages}
+        # 新規・変更チャンクを集めてまとめてアップロード
+        pending: list[tuple[ConversationChunk, list[Message]]] = []
 
-    # Step 4: 各チャンクをインデックス
-    logger.info("Step 4: チャンクをインデックス中...")
-    indexed_count = 0
-    error_count = 0
+        for chunk in chunks:
+            seen_chunk_ids.add(chunk.chunk_id)
 
-    for i, chunk in enumerate(chunks, 1):
-        try:
             # チャンク内のメッセージを取得
             chunk_messages = [
                 msg_map[msg_id]
@@ -120,43 +149,120 @@ async def reindex_with_conversation_chunks(
                 error_count += 1
                 continue
 
-            # Geminiにインデックス
-            doc_id = await gemini_client.index_conversation_chunk(chunk, chunk_messages)
-
-            if doc_id:
-                # Firestoreにチャンクを保存
-                chunk.file_search_doc_id = doc_id
-                chunk.indexed_at = datetime.utcnow()
-                await firestore_client.save_chunk(chunk)
+            # 内容が変わっていなければスキップ
+            chunk.content_hash = chunk.compute_content_hash(chunk_messages)
+            previous = existing_chunks.get(chunk.chunk_id)
+            if previous and previous.content_hash == chunk.content_hash:
+                unchanged_count += 1
+                continue
 
+            if dry_run:
+                if len(dry_run_samples) < 10:
+                    dry_run_samples.append(chunk)
                 indexed_count += 1
+                continue
 
-                if indexed_count % 10 == 0:
-                    logger.info(f"  進捗: {indexed_count}/{len(chunks)} チャンク完了")
-            else:
+            pending.append((chunk, chunk_messages))
+
+        if pending:
+            # Geminiに並行インデックス
+            # （変更されたチャンクの古いドキュメントは、検索できない期間が
+            #   生じないように新しいドキュメントの保存後に削除する）
+            doc_ids = await get_gemini_client().index_conversation_chunks(pending)
+
+            for (chunk, _), doc_id in zip(pending, doc_ids):
+                if not doc_id:
+                    error_count += 1
+                    logger.warning(f"チャンク {chunk.chunk_id}: インデックス失敗")
+                    continue
+
+                try:
+                    # Firestoreにチャンクを保存
+                    chunk.file_search_doc_id = doc_id
+                    chunk.indexed_at = datetime.utcnow()
+                    await get_firestore_client().save_chunk(chunk)
+                    indexed_count += 1
+                    channel_indexed += 1
+                except Exception as e:
+                    logger.error(f"チャンク {chunk.chunk_id}: エラー - {e}")
+                    error_count += 1
+                    continue
+
+                previous = existing_chunks.get(chunk.chunk_id)
+                if previous and previous.file_search_doc_id != doc_id:
+                    await _delete_indexed_chunk(previous)
+
+            logger.info(f"  進捗: {indexed_count} チャンク完了 "
+                        f"({get_gemini_client().uploader.stats()})")
+
+        logger.info(f"  #{channel_messages[0].channel_name}: "
+                    f"messages={len(channel_messages)}, chunks={len(chunks)}, "
+                    f"indexed={channel_indexed}")
+
+    if channel_count == 0:
+        # 既存チャンクはすべて不要になったため、Step 3 ですべて削除する
+        logger.warning("メッセージがありません。")
+
+    # Step 3: 不要になったチャンクを削除
+    stale_chunks = [c for chunk_id, c in existing_chunks.items() if chunk_id not in seen_chunk_ids]
+    deleted_count = 0
+    if dry_run:
+        logger.info(f"Step 3: [DRY RUN] 不要チャンク{len(stale_chunks)}件の削除をスキップ")
+    else:
+        logger.info(f"Step 3: 不要チャンクを削除中... ({len(stale_chunks)}件)")
+        for chunk in stale_chunks:
+            try:
+                await _delete_indexed_chunk(chunk)
+                await get_firestore_client().delete_chunk(chunk.chunk_id)
+                deleted_count += 1
+            except Exception as e:
+                logger.error(f"チャンク {chunk.chunk_id}: 削除エラー - {e}")
                 error_count += 1
-                logger.warning(f"チャンク {chunk.chunk_id}: インデックス失敗")
 
-        except Exception as e:
-            logger.error(f"チャンク {chunk.chunk_id}: エラー - {e}")
-            error_count += 1
+    # チャンク統計
+    avg_messages = total_messages_in_chunks / chunk_count if chunk_count else 0
+    logger.info(f"  {channel_count}チャンネル, {chunk_count}個のチャンクを生成")
+    logger.info(f"  平均メッセージ数/チャンク: {avg_messages:.1f}")
 
-        # レート制限対策
-        if i % 5 == 0:
-            await asyncio.sleep(1)
+    if dry_run:
+        logger.info("\n[DRY RUN] アップロード対象のチャンク詳細:")
+        for i, chunk in enumerate(dry_run_samples, 1):
+            logger.info(f"  Chunk {i}: #{chunk.channel_name} "
+                       f"({chunk.start_time.strftime('%Y-%m-%d %H:%M')} - "
+                       f"{chunk.end_time.strftime('%H:%M')}) "
+                       f"messages={len(chunk.message_ids)}")
+        if indexed_count > len(dry_run_samples):
+            logger.info(f"  ... and {indexed_count - len(dry_run_samples)} more chunks")
+        return {
+            "chunks": chunk_count,
+            "messages": total_messages_in_chunks,
+            "indexed": 0,
+            "to_index": indexed_count,
+            "unchanged": unchanged_count,
+            "to_delete": len(stale_chunks),
+            "errors": error_count,
+        }
+
+    if full or indexed_count or deleted_count:
+        await get_firestore_client().bump_index_version()
 
     logger.info("=" * 50)
     logger.info("再インデックス完了")
-    logger.info(f"  チャンク数: {len(chunks)}")
+    logger.info(f"  チャンク数: {chunk_count}")
     logger.info(f"  メッセージ数: {total_messages_in_chunks}")
     logger.info(f"  インデックス成功: {indexed_count}")
+    logger.info(f"  変更なし: {unchanged_count}")
+    logger.info(f"  削除: {deleted_count}")
     logger.info(f"  エラー: {error_count}")
+    logger.info(f"  アップロード統計: {get_gemini_client().uploader.stats()}")
     logger.info("=" * 50)
 
     return {
-        "chunks": len(chunks),
+        "chunks": chunk_count,
         "messages": total_messages_in_chunks,
         "indexed": indexed_count,
+        "unchanged": unchanged_count,
+        "deleted": deleted_count,
         "errors": error_count,
     }
 
@@ -172,6 +278,11 @@ async def main():
         action="store_true",
         help="インデックスせずにチャンク情報のみ表示"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="差分ではなく、既存のファイル・チャンクを全削除して作り直す"
+    )
     parser.add_argument(
         "--time-window",
         type=int,
@@ -190,6 +301,11 @@ async def main():
         default=3,
         help="1チャンクの最小メッセージ数 デフォルト: 3"
     )
+    parser.add_argument(
+        "--snapshot",
+        help="メッセージをFirestoreではなくスナップショットファイルから読む"
+             "（scripts/snapshot.py で作成）"
+    )
 
     args = parser.parse_args()
 
@@ -199,10 +315,13 @@ async def main():
     print("=" * 60)
     print()
     print("このスクリプトは以下を実行します:")
-    print("  1. 既存のFile Search Storeファイルを全削除")
-    print("  2. Firestoreの既存チャンクを全削除")
-    print("  3. 全メッセージを会話チャンクにグループ化")
-    print("  4. 各チャンクをGeminiにインデックス")
+    if args.full:
+        print("  1. 既存のFile Search Storeファイル・Firestoreのチャンクを全削除")
+    else:
+        print("  1. 既存チャンクを取得（旧形式のチャンクがあれば全削除）")
+    print("  2. 全メッセージを会話チャンクにグループ化")
+    print("  3. 新規・変更チャンクのみGeminiにインデックス")
+    print("  4. 不要になったチャンクを削除")
     print()
 
     if args.dry_run:
@@ -220,6 +339,8 @@ async def main():
         max_messages_per_chunk=args.max_messages,
         min_messages_per_chunk=args.min_messages,
         dry_run=args.dry_run,
+        full=args.full,
+        snapshot_path=args.snapshot,
     )
 
     print()
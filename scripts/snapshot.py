@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""メッセージスナップショット スクリプト
+
+Firestoreのメッセージ（OCRテキストを含む）をローカルのスナップショットファイルに
+エクスポート・差分更新します。スナップショットからFirestoreへのインポートもできます。
+
+再インデックス（scripts/reindex.py --snapshot）やチャンク分割の実験で、
+Firestoreから全メッセージを読み直さずに済みます。
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.config import settings
+from src.core.snapshot import (
+    export_snapshot,
+    load_snapshot,
+    read_snapshot_info,
+    refresh_snapshot,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+# インポート時に1回で保存するメッセージ数
+IMPORT_BATCH_SIZE = 5000
+
+
+def show_info(path: Path) -> None:
+    """スナップショットの概要を表示"""
+    info = read_snapshot_info(path)
+    start = time.perf_counter()
+    table = load_snapshot(path)
+    elapsed = time.perf_counter() - start
+
+    print(f"ファイル: {path} ({path.stat().st_size / 2**20:.1f} MiB)")
+    print(f"  作成日時: {info['created_at']}")
+    print(f"  メッセージ数: {info['rows']:,}")
+    print(f"  最新の同期日時: {info.get('last_synced_at')}")
+    print(f"  チャンネル数: {len(set(table.channel_ids)):,}")
+    print(f"  展開後のデータ: {table.nbytes() / 2**20:.1f} MiB（読み込み {elapsed:.3f}秒）")
+
+
+async def import_snapshot(path: Path) -> int:
+    """スナップショットのメッセージをFirestoreに保存"""
+    from src.core.firestore import get_firestore_client
+
+    table = load_snapshot(path)
+    saved = 0
+    for start in range(0, len(table), IMPORT_BATCH_SIZE):
+        batch = [table.get(i) for i in range(start, min(start + IMPORT_BATCH_SIZE, len(table)))]
+        saved += await get_firestore_client().save_messages(batch)
+        print(f"  進捗: {saved:,}/{len(table):,}")
+    return saved
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="メッセージスナップショット")
+    parser.add_argument(
+        "command",
+        choices=["export", "refresh", "info", "import"],
+        help="export: 全件エクスポート, refresh: 差分更新, info: 概要表示, "
+             "import: Firestoreに保存",
+    )
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=Path(settings.snapshot_path),
+        help=f"スナップショットファイル デフォルト: {settings.snapshot_path}",
+    )
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="文字列の列も圧縮せずに保存する（全列をメモリマップで読み込める）",
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Discord Search - メッセージスナップショット")
+    print("=" * 60)
+
+    if args.command == "info":
+        show_info(args.path)
+        return
+
+    if args.command == "import":
+        confirm = input(f"{args.path} のメッセージをFirestoreに保存しますか？ (yes/no): ")
+        if confirm.lower() != "yes":
+            print("キャンセルしました")
+            return
+        saved = await import_snapshot(args.path)
+        print(f"保存: {saved:,}件")
+        return
+
+    from src.core.firestore import get_firestore_client
+
+    start = time.perf_counter()
+    if args.command == "export":
+        table = await export_snapshot(
+            get_firestore_client(), args.path, compress=not args.no_compress
+        )
+        added = len(table)
+    else:
+        table, added = await refresh_snapshot(
+            get_firestore_client(), args.path, compress=not args.no_compress
+        )
+    print(f"メッセージ数: {len(table):,}（追加 {added:,}件, {time.perf_counter() - start:.1f}秒）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
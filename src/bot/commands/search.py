@@ -1,14 +1,19 @@
 """検索コマンド"""
 
 import logging
+from datetime import datetime, timedelta
+
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from src.core.config import settings
-from src.core.firestore import firestore_client
-from src.core.gemini import gemini_client
+from src.core.firestore import SEARCH_RESULT_FIELDS, get_firestore_client
+from src.core.gemini import get_gemini_client
+from src.core.keyword_index import KeywordIndex, extract_keywords, make_highlight
 from src.core.models import SearchResult
+from src.core.search_cache import SearchResultCache, make_cache_key
+from src.core.singleflight import SingleFlight
 from src.bot.utils.embed import create_search_result_embed
 
 logger = logging.getLogger(__name__)
@@ -21,6 +26,108 @@ class SearchCog(commands.Cog):
         self.bot = bot
         # ユーザーごとの検索コンテキスト（絞り込み用）
         self.search_context: dict[int, list[str]] = {}
+        # キーワード型クエリ用のローカル索引
+        self.keyword_index = KeywordIndex()
+        self._keyword_index_synced_at: datetime | None = None
+        # Gemini検索結果のキャッシュ
+        self.search_cache = SearchResultCache()
+        self._index_version: str | None = None
+        # 同時に実行された同一クエリのGemini呼び出しを1回に集約
+        self.search_flight = SingleFlight()
+
+    async def cog_load(self):
+        """Cogロード時にキーワード索引の構築・更新とキャッシュ監視を開始"""
+        if settings.keyword_index_enabled:
+            self.refresh_keyword_index.start()
+        self.check_index_version.start()
+
+    async def cog_unload(self):
+        """Cogアンロード時に更新を停止"""
+        self.refresh_keyword_index.cancel()
+        self.check_index_version.cancel()
+
+    @tasks.loop(seconds=settings.search_cache_version_check_seconds)
+    async def check_index_version(self):
+        """同期ジョブ・再インデックスでインデックスが更新されたらキャッシュを破棄"""
+        try:
+            version = await get_firestore_client().get_index_version()
+        except Exception as e:
+            logger.error(f"インデックスバージョン取得エラー: {e}")
+            return
+
+        if version != self._index_version:
+            if self._index_version is not None:
+                logger.info(f"インデックス更新を検出、検索キャッシュを破棄: "
+                            f"{self.search_cache.stats()}")
+            self.search_cache.invalidate()
+            self._index_version = version
+
+    async def _search_gemini(
+        self,
+        query: str,
+        previous_results: list[str] | None = None,
+    ) -> tuple[list[dict], str]:
+        """Gemini File Searchで検索（キャッシュ・同一クエリの集約付き）"""
+        key = make_cache_key(query, previous_results)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            logger.info(f"検索キャッシュヒット: query='{query}', {self.search_cache.stats()}")
+            return cached
+
+        async def fetch() -> tuple[list[dict], str]:
+            # 検索中にインデックスが更新された場合、古い結果はキャッシュしない
+            generation = self.search_cache.generation
+            index_version = self._index_version
+            # 失敗時は例外が送出されるため、エラーは0件の結果としてキャッシュされない
+            results, response_text = await get_gemini_client().search_with_context(
+                query,
+                previous_results=previous_results,
+            )
+            if results is None:
+                # 結果として読めない応答は0件として返し、キャッシュしない
+                return [], response_text
+            if self._index_version == index_version:
+                self.search_cache.put(key, results, response_text, generation=generation)
+            return results, response_text
+
+        results, response_text = await self.search_flight.do(key, fetch)
+        logger.debug(f"検索集約: {self.search_flight.stats()}")
+        return results, response_text
+
+    @tasks.loop(minutes=settings.keyword_index_refresh_minutes)
+    async def refresh_keyword_index(self):
+        """キーワード索引を更新（初回は全メッセージから構築）"""
+        # 同期ジョブの書き込み遅延を考慮して少し前から取得（重複は索引側で除外）
+        started_at = datetime.utcnow() - timedelta(minutes=10)
+        try:
+            if self._keyword_index_synced_at is None:
+                count = 0
+                async for message in get_firestore_client().stream_messages():
+                    count += self.keyword_index.add(message)
+                logger.info(f"キーワード索引を構築: {count}件")
+            else:
+                messages = await get_firestore_client().get_messages_synced_since(
+                    self._keyword_index_synced_at
+                )
+                count = self.keyword_index.add_many(messages)
+                if count:
+                    logger.info(f"キーワード索引を更新: +{count}件")
+            self._keyword_index_synced_at = started_at
+        except Exception as e:
+            logger.error(f"キーワード索引の更新エラー: {e}")
+
+    def _search_keyword_index(self, query: str) -> tuple[list[dict], str | None]:
+        """キーワード型クエリをローカル索引で検索
+
+        Returns:
+            (検索結果, 検索キーワード) 索引未構築・キーワード型でない場合は空
+        """
+        if self._keyword_index_synced_at is None:
+            return [], None
+        keywords = extract_keywords(query)
+        if not keywords:
+            return [], None
+        return self.keyword_index.search(keywords, limit=settings.search_result_limit), keywords
 
     @app_commands.command(name="search", description="Discordメッセージを自然言語で検索")
     @app_commands.describe(query="検索クエリ（例: 先月の経理の話）")
@@ -29,8 +136,13 @@ class SearchCog(commands.Cog):
         await interaction.response.defer(thinking=True)
 
         try:
-            # Gemini File Searchで検索
-            results, response_text = await gemini_client.search_with_context(query)
+            # キーワード型クエリはローカル索引で検索し、見つからなければGemini File Searchで検索
+            results, keywords = self._search_keyword_index(query)
+            if results:
+                logger.info(f"ローカル索引で回答: keywords='{keywords}'")
+            else:
+                keywords = None
+                results, response_text = await self._search_gemini(query)
 
             if not results:
                 embed = create_search_result_embed([], query)
@@ -39,19 +151,7 @@ class SearchCog(commands.Cog):
 
             # メッセージIDからFirestoreでメタデータ取得
             message_ids = [r["message_id"] for r in results]
-            messages = await firestore_client.get_messages_by_ids(message_ids)
-
-            # SearchResult形式に変換（Geminiからの理由とハイライトを含む）
-            # message_idをキーにしてresultsからreasonとhighlightを取得
-            result_map = {r["message_id"]: r for r in results}
-            search_results = []
-            for msg in messages:
-                r = result_map.get(msg.message_id, {})
-                search_results.append(SearchResult(
-                    message=msg,
-                    snippet=r.get("highlight", msg.content[:100] if msg.content else ""),
-                    reason=r.get("reason", ""),
-                ))
+            search_results = await self._hydrate_results(results, keywords)
 
             # 検索コンテキストを保存（絞り込み用）
             self.search_context[interaction.user.id] = message_ids
@@ -69,6 +169,43 @@ class SearchCog(commands.Cog):
                 ephemeral=True,
             )
 
+    async def _hydrate_results(
+        self,
+        results: list[dict],
+        keywords: str | None = None,
+    ) -> list[SearchResult]:
+        """検索結果をFirestoreのメタデータでSearchResultに変換
+
+        1回のバッチ取得で必要なフィールドのみ取得し、検索結果の順位を保持する。
+
+        Args:
+            results: Geminiまたはローカル索引の検索結果
+            keywords: ローカル索引の検索キーワード（ハイライト生成用）
+        """
+        message_ids = [r["message_id"] for r in results]
+        messages, missing_ids = await get_firestore_client().get_messages_by_ids(
+            message_ids,
+            field_paths=SEARCH_RESULT_FIELDS,
+        )
+        if missing_ids:
+            logger.warning(f"Firestoreに存在しないメッセージID: {missing_ids}")
+
+        # SearchResult形式に変換（Geminiからの理由とハイライトを含む）
+        # message_idをキーにしてresultsからreasonとhighlightを取得
+        result_map = {r["message_id"]: r for r in results}
+        search_results = []
+        for msg in messages:
+            r = result_map.get(msg.message_id, {})
+            snippet = r.get("highlight", msg.content[:100] if msg.content else "")
+            if keywords and not snippet:
+                snippet = make_highlight(msg, keywords)
+            search_results.append(SearchResult(
+                message=msg,
+                snippet=snippet,
+                reason=r.get("reason", ""),
+            ))
+        return search_results
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """メッセージ監視（絞り込み対応）"""
@@ -91,7 +228,7 @@ class SearchCog(commands.Cog):
 
         try:
             async with message.channel.typing():
-                results, response_text = await gemini_client.search_with_context(
+                results, response_text = await self._search_gemini(
                     query,
                     previous_results=previous_results,
                 )
@@ -102,18 +239,7 @@ class SearchCog(commands.Cog):
 
                 # メッセージIDからFirestoreでメタデータ取得
                 message_ids = [r["message_id"] for r in results]
-                messages = await firestore_client.get_messages_by_ids(message_ids)
-
-                # SearchResult形式に変換（Geminiからの理由とハイライトを含む）
-                result_map = {r["message_id"]: r for r in results}
-                search_results = []
-                for msg in messages:
-                    r = result_map.get(msg.message_id, {})
-                    search_results.append(SearchResult(
-                        message=msg,
-                        snippet=r.get("highlight", msg.content[:100] if msg.content else ""),
-                        reason=r.get("reason", ""),
-                    ))
+                search_results = await self._hydrate_results(results)
 
                 # コンテキスト更新
                 self.search_context[user_id] = message_ids
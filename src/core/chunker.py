@@ -3,12 +3,48 @@
 メッセージを会話単位でグループ化し、RAG検索の精度を向上させる。
 """
 
+import importlib.util
+import operator
 import uuid
 from collections import defaultdict
-from datetime import datetime, timedelta
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from typing import TYPE_CHECKING
 
 from src.core.models import ConversationChunk, Message
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# チャンクID生成用の名前空間
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "discord-search/conversation-chunk")
+
+# NumPyはオプション依存（あれば大量のメッセージをベクトル化して分割する）
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# これ以上のメッセージ数ではベクトル化した分割を使う
+VECTORIZE_MIN_MESSAGES = 5_000
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+_channel_key = operator.attrgetter("channel_id", "thread_id")
+_timestamp = operator.attrgetter("timestamp")
+_message_id = operator.attrgetter("message_id")
+_author_name = operator.attrgetter("author_name")
+
+
+def make_chunk_id(channel_id: str, thread_id: str | None, first_message_id: str) -> str:
+    """チャンネル・スレッド・先頭メッセージIDから決定的なチャンクIDを生成
+
+    同じメッセージ境界のチャンクは再インデックスをまたいで同じIDになる。
+    """
+    key = f"{channel_id}/{thread_id or ''}/{first_message_id}"
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, key))
+
 
 def group_messages_into_chunks(
     messages: list[Message],
@@ -27,6 +63,14 @@ def group_messages_into_chunks(
     if not messages:
         return []
 
+    if NUMPY_AVAILABLE and len(messages) >= VECTORIZE_MIN_MESSAGES:
+        return group_messages_into_chunks_vectorized(
+            messages,
+            time_window_minutes=time_window_minutes,
+            max_messages_per_chunk=max_messages_per_chunk,
+            min_messages_per_chunk=min_messages_per_chunk,
+        )
+
     # チャンネル+スレッドでグループ化
     grouped: dict[tuple[str, str | None], list[Message]] = defaultdict(list)
     for msg in messages:
@@ -59,6 +103,364 @@ def group_messages_into_chunks(
     return chunks
 
 
+def group_messages_into_chunks_vectorized(
+    messages: list[Message],
+    time_window_minutes: int = 30,
+    max_messages_per_chunk: int = 20,
+    min_messages_per_chunk: int = 3,
+) -> list[ConversationChunk]:
+    """group_messages_into_chunks のNumPy版（結果は同じ）
+
+    分割位置は chunk_spans で配列演算により求め、Pythonのループは
+    チャンクの生成（チャンク数回）のみ。NumPyが必要。
+    """
+    import numpy as np
+
+    if not messages:
+        return []
+
+    # メッセージ単位の処理は map/attrgetter（C実装）で行い、Pythonのループを避ける
+    # (channel_id, thread_id) を出現順の整数コードに変換
+    channel_keys = list(map(_channel_key, messages))
+    key_codes = {key: code for code, key in enumerate(dict.fromkeys(channel_keys))}
+    keys = np.fromiter(map(key_codes.__getitem__, channel_keys), dtype=np.int64,
+                       count=len(messages))
+    timestamps = _timestamps_to_microseconds(list(map(_timestamp, messages)))
+
+    # チャンネル+スレッド、時刻の順に並べる（安定ソート）
+    order = np.lexsort((timestamps, keys))
+    starts, context_starts, ends = chunk_spans(
+        keys[order],
+        timestamps[order],
+        time_window_us=time_window_minutes * 60 * 1_000_000,
+        max_messages=max_messages_per_chunk,
+        min_messages=min_messages_per_chunk,
+    )
+
+    ordered = list(map(messages.__getitem__, order.tolist()))
+    message_ids = list(map(_message_id, ordered))
+    author_names = list(map(_author_name, ordered))
+
+    chunks: list[ConversationChunk] = []
+    for start, context_start, end in zip(starts.tolist(), context_starts.tolist(), ends.tolist()):
+        first_msg = ordered[start]
+        chunks.append(ConversationChunk(
+            chunk_id=make_chunk_id(first_msg.channel_id, first_msg.thread_id, first_msg.message_id),
+            channel_id=first_msg.channel_id,
+            channel_name=first_msg.channel_name,
+            thread_id=first_msg.thread_id,
+            thread_name=first_msg.thread_name,
+            start_time=ordered[context_start].timestamp,
+            end_time=ordered[end - 1].timestamp,
+            message_ids=message_ids[context_start:end],
+            participant_names=list(dict.fromkeys(author_names[context_start:end])),
+        ))
+    return chunks
+
+
+def chunk_spans(
+    keys: "np.ndarray",
+    timestamps: "np.ndarray",
+    time_window_us: int,
+    max_messages: int,
+    min_messages: int,
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """チャンクの範囲を配列演算で求める
+
+    Args:
+        keys: チャンネル/スレッドの整数コード（int64、同じ値が連続していること）
+        timestamps: 時刻（int64マイクロ秒、キー内で昇順）
+        time_window_us: 同一チャンクとみなす時間ウィンドウ（マイクロ秒）
+        max_messages: 1チャンクの最大メッセージ数
+        min_messages: 1チャンクの最小メッセージ数（コンテキスト保証）
+
+    Returns:
+        (チャンク本来の先頭, 最小コンテキストを含む先頭, 末尾の次) のインデックス配列
+    """
+    import numpy as np
+
+    n = len(timestamps)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    # キーの切り替わりと時間ウィンドウ超過で区間に分ける
+    key_breaks = np.empty(n, dtype=bool)
+    key_breaks[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=key_breaks[1:])
+    breaks = key_breaks.copy()
+    breaks[1:] |= np.diff(timestamps) > time_window_us
+
+    segment_starts = np.flatnonzero(breaks)
+    segment_ends = np.append(segment_starts[1:], n)
+
+    # 各区間を最大メッセージ数ごとに分割
+    chunks_per_segment = -(-(segment_ends - segment_starts) // max_messages)
+    segment_of_chunk = np.repeat(np.arange(len(segment_starts)), chunks_per_segment)
+    first_chunk_of_segment = np.cumsum(chunks_per_segment) - chunks_per_segment
+    offset = np.arange(len(segment_of_chunk)) - first_chunk_of_segment[segment_of_chunk]
+    starts = segment_starts[segment_of_chunk] + offset * max_messages
+    ends = np.minimum(starts + max_messages, segment_ends[segment_of_chunk])
+
+    # 最小コンテキスト: 同じキー内の直前のメッセージで不足分を補う
+    key_starts = np.flatnonzero(key_breaks)
+    key_start_of_chunk = key_starts[np.searchsorted(key_starts, starts, side="right") - 1]
+    needed = np.maximum(min_messages - (ends - starts), 0)
+    context_starts = np.maximum(starts - needed, key_start_of_chunk)
+
+    return starts, context_starts, ends
+
+
+def _timestamps_to_microseconds(timestamps: list[datetime]) -> "np.ndarray":
+    """時刻をエポックからのマイクロ秒（int64）に変換
+
+    タイムゾーン付きの時刻はUTCのエポックからの差になる。整数演算のため誤差はない。
+    """
+    import numpy as np
+
+    if not timestamps:
+        return np.empty(0, dtype=np.int64)
+    epoch = _EPOCH_UTC if timestamps[0].tzinfo else _EPOCH
+    deltas = map(operator.sub, timestamps, repeat(epoch))
+    return np.fromiter(
+        map(operator.floordiv, deltas, repeat(_MICROSECOND)),
+        dtype=np.int64,
+        count=len(timestamps),
+    )
+
+
+async def group_message_stream_into_chunks(
+    messages: AsyncIterator[Message],
+    time_window_minutes: int = 30,
+    max_messages_per_chunk: int = 20,
+    min_messages_per_chunk: int = 3,
+) -> AsyncIterator[tuple[list[ConversationChunk], list[Message]]]:
+    """チャンネル順のメッセージストリームを1チャンネルずつチャンク化
+
+    メモリに保持するのは1チャンネル/スレッド分のメッセージのみ。
+
+    Args:
+        messages: (channel_id, thread_id) ごとに連続して並んだメッセージ
+        time_window_minutes: 同一チャンクとみなす時間ウィンドウ（分）
+        max_messages_per_chunk: 1チャンクの最大メッセージ数
+        min_messages_per_chunk: 1チャンクの最小メッセージ数（コンテキスト保証）
+
+    Yields:
+        (チャンネルのチャンク一覧, チャンネルの全メッセージ)
+    """
+    current_key: tuple[str, str | None] | None = None
+    current_messages: list[Message] = []
+
+    async for msg in messages:
+        key = (msg.channel_id, msg.thread_id)
+        if key != current_key and current_messages:
+            yield _group_partition(
+                current_messages,
+                time_window_minutes,
+                max_messages_per_chunk,
+                min_messages_per_chunk,
+            )
+            current_messages = []
+        current_key = key
+        current_messages.append(msg)
+
+    if current_messages:
+        yield _group_partition(
+            current_messages,
+            time_window_minutes,
+            max_messages_per_chunk,
+            min_messages_per_chunk,
+        )
+
+
+def _group_partition(
+    messages: list[Message],
+    time_window_minutes: int,
+    max_messages_per_chunk: int,
+    min_messages_per_chunk: int,
+) -> tuple[list[ConversationChunk], list[Message]]:
+    """1チャンネル/スレッド分のメッセージをチャンク化"""
+    chunks = group_messages_into_chunks(
+        messages,
+        time_window_minutes=time_window_minutes,
+        max_messages_per_chunk=max_messages_per_chunk,
+        min_messages_per_chunk=min_messages_per_chunk,
+    )
+    return chunks, messages
+
+
+def extend_channel_chunks(
+    open_chunk: ConversationChunk | None,
+    open_chunk_messages: list[Message],
+    new_messages: list[Message],
+    time_window_minutes: int = 30,
+    max_messages_per_chunk: int = 20,
+    min_messages_per_chunk: int = 3,
+) -> list[ConversationChunk]:
+    """末尾の未確定チャンクに新着メッセージを加えてチャンクを再生成
+
+    open_chunk から状態を復元した IncrementalChunker に新着メッセージを追加する。
+    全件をバッチ処理した場合と同じ境界になり、返り値の先頭チャンクは
+    open_chunk と同じ chunk_id になる。
+
+    Args:
+        open_chunk: 同一チャンネル/スレッドの最新チャンク（なければNone）
+        open_chunk_messages: open_chunkのメッセージ一覧（最小コンテキスト分を含む）
+        new_messages: 新着メッセージ一覧（同一チャンネル/スレッド）
+        time_window_minutes: 同一チャンクとみなす時間ウィンドウ（分）
+        max_messages_per_chunk: 1チャンクの最大メッセージ数
+        min_messages_per_chunk: 1チャンクの最小メッセージ数（コンテキスト保証）
+
+    Returns:
+        新規作成・更新されたチャンク一覧
+    """
+    chunker = IncrementalChunker(
+        time_window_minutes=time_window_minutes,
+        max_messages_per_chunk=max_messages_per_chunk,
+        min_messages_per_chunk=min_messages_per_chunk,
+    )
+    if open_chunk:
+        chunker.restore(open_chunk, open_chunk_messages)
+    return [chunk for chunk, _ in chunker.add(sorted(new_messages, key=lambda m: m.timestamp))]
+
+
+@dataclass
+class _OpenChunk:
+    """チャンネル/スレッドの末尾の未確定チャンク"""
+
+    # 直前のメッセージ（最小コンテキスト用、最大 min_messages_per_chunk - 1 件）
+    context: list[Message] = field(default_factory=list)
+    # チャンク本来のメッセージ（時間順）
+    messages: list[Message] = field(default_factory=list)
+    # チャンクに含めたメッセージID（確定済みチャンク・復元した末尾チャンクを含む）
+    chunked_ids: set[str] = field(default_factory=set)
+
+
+class IncrementalChunker:
+    """ストリームで届くメッセージを逐次チャンク化
+
+    (channel_id, thread_id) ごとに末尾の未確定チャンクと直前のメッセージのみを保持し、
+    メッセージの追加で確定・変更されたチャンクだけを返す。
+    チャンネル/スレッドごとに時間順で追加すれば、全件を group_messages_into_chunks で
+    処理した場合と同じチャンクになる。
+    """
+
+    def __init__(
+        self,
+        time_window_minutes: int = 30,
+        max_messages_per_chunk: int = 20,
+        min_messages_per_chunk: int = 3,
+    ):
+        self.time_window = timedelta(minutes=time_window_minutes)
+        self.max_messages = max_messages_per_chunk
+        self.min_messages = min_messages_per_chunk
+        self._open: dict[tuple[str, str | None], _OpenChunk] = {}
+
+    def __contains__(self, key: tuple[str, str | None]) -> bool:
+        """(channel_id, thread_id) の状態を保持しているか"""
+        return key in self._open
+
+    def restore(self, open_chunk: ConversationChunk, open_chunk_messages: list[Message]) -> None:
+        """保存済みの末尾チャンクから状態を復元
+
+        Args:
+            open_chunk: チャンネル/スレッドの最新チャンク
+            open_chunk_messages: open_chunkのメッセージ一覧（最小コンテキスト分を含む）
+        """
+        msg_map = {msg.message_id: msg for msg in open_chunk_messages}
+        ordered = [msg_map[mid] for mid in open_chunk.message_ids if mid in msg_map]
+
+        # 最小コンテキストで補われたメッセージを除いた、本来の先頭を探す
+        own_start = 0
+        for i, msg in enumerate(ordered):
+            if make_chunk_id(msg.channel_id, msg.thread_id, msg.message_id) == open_chunk.chunk_id:
+                own_start = i
+                break
+
+        key = (open_chunk.channel_id, open_chunk.thread_id)
+        self._open[key] = _OpenChunk(
+            context=ordered[:own_start],
+            messages=ordered[own_start:],
+            chunked_ids={msg.message_id for msg in ordered},
+        )
+
+    def discard(self, channel_id: str) -> None:
+        """チャンネル（とそのスレッド）の状態を破棄"""
+        for key in [key for key in self._open if key[0] == channel_id]:
+            del self._open[key]
+
+    def add(self, messages: Iterable[Message]) -> list[tuple[ConversationChunk, list[Message]]]:
+        """メッセージを追加し、確定・変更されたチャンクを返す
+
+        チャンク化済みのメッセージ（復元した末尾チャンクとその最小コンテキスト、
+        このインスタンスで確定したチャンクに含まれるID）は無視する。末尾チャンクより古い
+        メッセージは末尾チャンク内で並べ直すため、バッチ処理とは境界が異なりうる。
+
+        Returns:
+            (チャンク, チャンクのメッセージ) の一覧。チャンネル/スレッド内では時間順で、
+            各チャンネル/スレッドの最後のチャンクは未確定（以降の追加で変わりうる）。
+        """
+        emitted: dict[str, tuple[ConversationChunk, list[Message]]] = {}
+        modified: list[tuple[str, str | None]] = []
+
+        for msg in messages:
+            key = (msg.channel_id, msg.thread_id)
+            state = self._open.setdefault(key, _OpenChunk())
+            if msg.message_id in state.chunked_ids:
+                continue
+            state.chunked_ids.add(msg.message_id)
+
+            if state.messages and msg.timestamp < state.messages[-1].timestamp:
+                # 順序が前後した場合は末尾チャンクを作り直す
+                reordered = sorted([*state.messages, msg], key=lambda m: m.timestamp)
+                state.messages = []
+                for reordered_msg in reordered:
+                    self._append(state, reordered_msg, emitted)
+            else:
+                self._append(state, msg, emitted)
+
+            if key not in modified:
+                modified.append(key)
+
+        for key in modified:
+            chunk, chunk_messages = self._build(self._open[key])
+            emitted[chunk.chunk_id] = (chunk, chunk_messages)
+
+        return list(emitted.values())
+
+    def _append(
+        self,
+        state: _OpenChunk,
+        msg: Message,
+        emitted: dict[str, tuple[ConversationChunk, list[Message]]],
+    ) -> None:
+        """末尾チャンクにメッセージを追加（必要なら確定して新しいチャンクを開始）"""
+        if state.messages and (
+            len(state.messages) >= self.max_messages
+            or msg.timestamp - state.messages[-1].timestamp > self.time_window
+        ):
+            chunk, chunk_messages = self._build(state)
+            emitted[chunk.chunk_id] = (chunk, chunk_messages)
+
+            # 次のチャンクの最小コンテキストに必要な分だけ残す
+            keep = self.min_messages - 1
+            state.context = [*state.context, *state.messages][-keep:] if keep > 0 else []
+            state.messages = []
+
+        state.messages.append(msg)
+
+    def _build(self, state: _OpenChunk) -> tuple[ConversationChunk, list[Message]]:
+        """未確定チャンクからチャンク（最小コンテキスト適用済み）を生成"""
+        all_messages = [*state.context, *state.messages]
+        chunk = _ensure_minimum_context(
+            [_create_chunk_from_messages(state.messages)],
+            all_messages,
+            self.min_messages,
+        )[0]
+        # 最小コンテキストは直前のメッセージから補われる
+        return chunk, all_messages[len(all_messages) - len(chunk.message_ids):]
+
+
 def _create_chunks_for_channel(
     messages: list[Message],
     time_window: timedelta,
@@ -110,7 +512,7 @@ def _create_chunk_from_messages(messages: list[Message]) -> ConversationChunk:
             seen.add(msg.author_name)
 
     return ConversationChunk(
-        chunk_id=str(uuid.uuid4()),
+        chunk_id=make_chunk_id(first_msg.channel_id, first_msg.thread_id, first_msg.message_id),
         channel_id=first_msg.channel_id,
         channel_name=first_msg.channel_name,
         thread_id=first_msg.thread_id,
@@ -195,6 +597,7 @@ def _ensure_minimum_context(
                 end_time=chunk.end_time,
                 message_ids=new_message_ids,
                 participant_names=new_participants,
+                content_hash=chunk.content_hash,
                 indexed_at=chunk.indexed_at,
                 file_search_doc_id=chunk.file_search_doc_id,
             )
@@ -19,14 +19,53 @@ class Settings(BaseSettings):
 
     # File Search
     file_search_store_name: str = "discord-messages"
+    gemini_upload_concurrency: int = 8  # 同時アップロード数
+    gemini_poll_interval_seconds: float = 1.0  # インデックス完了のポーリング間隔
 
     # Sync settings
     sync_interval_seconds: int = 3600  # 1時間
     sync_batch_size: int = 100
-    sync_delay_seconds: float = 1.0  # レート制限対策
+    sync_concurrency: int = 4  # 並行して同期するチャンネル数
+    sync_message_concurrency: int = 16  # チャンネルごとに並行して処理するメッセージ数
+    discord_requests_per_second: float = 40.0  # グローバル制限（50/秒）より低く設定
+
+    # OCR settings
+    ocr_workers: int = 0  # OCRワーカープロセス数（0は利用可能なコア数）
+    ocr_preprocess_enabled: bool = True  # 縮小・OCR不要な画像のスキップ
+    ocr_target_dpi: int = 200  # DPI情報がある画像の縮小先
+    ocr_max_image_edge: int = 2048  # 長辺の上限（ピクセル）
+    ocr_min_image_edge: int = 32  # 短辺がこれ未満の画像はOCRしない
+    ocr_min_entropy: float = 0.25  # 輝度エントロピー（ビット）がこれ未満の画像はOCRしない
+    ocr_min_edge_density: float = 0.02  # エッジ画素の割合がこれ未満の画像はOCRしない
+    ocr_cache_path: str = ".cache/ocr_cache.sqlite3"  # 空文字でローカルキャッシュ無効
+    ocr_cache_firestore: bool = False  # Firestoreの共有キャッシュも使う
+
+    # PDF settings
+    pdf_max_pages: int = 50  # 1ファイルで処理するページ数の上限
+    pdf_min_page_chars: int = 10  # テキストレイヤーの文字数がこれ未満のページは画像化してOCR
+
+    # Snapshot settings
+    snapshot_path: str = ".cache/messages.snapshot"  # メッセージのローカルスナップショット
+
+    # Attachment download settings
+    download_max_bytes: int = 20 * 1024 * 1024  # 1ファイルの上限（超える場合はOCRしない）
+    download_concurrency_per_host: int = 8  # CDNホストごとの同時接続数
+    download_max_retries: int = 3
+
+    # Firestore bulk write settings
+    firestore_write_batch_size: int = 400  # 1バッチの最大書き込み数（上限500）
+    firestore_flush_interval_seconds: float = 5.0
 
     # Search settings
     search_result_limit: int = 5
+    keyword_index_enabled: bool = True  # キーワード型クエリをローカル索引で回答
+    keyword_index_refresh_minutes: int = 10
+
+    # Search cache settings
+    search_cache_size: int = 256
+    search_cache_ttl_seconds: int = 600
+    search_cache_negative_ttl_seconds: int = 60  # 結果0件のキャッシュ期限
+    search_cache_version_check_seconds: int = 60  # インデックス更新の確認間隔
 
     class Config:
         env_file = ".env.local", ".env"
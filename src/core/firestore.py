@@ -1,69 +1,241 @@
 """Firestore クライアント"""
 
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
 from datetime import datetime
+from functools import cache
 from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 
 from src.core.config import settings
-from src.core.models import ConversationChunk, Message, SyncStatus, Attachment
+from src.core.models import ConversationChunk, Message, SyncStatus
+
+logger = logging.getLogger(__name__)
+
+# Firestoreの1バッチあたりの書き込み上限
+MAX_BATCH_WRITES = 500
+
+# 検索結果の表示に必要なフィールド（indexed_at等の管理用フィールドは取得しない）
+SEARCH_RESULT_FIELDS = [
+    "message_id",
+    "channel_id",
+    "channel_name",
+    "thread_id",
+    "thread_name",
+    "author_id",
+    "author_name",
+    "content",
+    "timestamp",
+    "has_attachment",
+    "attachments",
+    "jump_url",
+]
 
 
 class FirestoreClient:
-    """Firestore操作クラス"""
+    """Firestore操作クラス
+
+    AsyncClient を使用し、全RPCをイベントループ上で非同期に実行する。
+    """
 
     def __init__(self):
-        self.db = firestore.Client(project=settings.gcp_project_id)
+        self.db = firestore.AsyncClient(project=settings.gcp_project_id)
         self.messages_ref = self.db.collection("messages")
         self.chunks_ref = self.db.collection("conversation_chunks")
         self.sync_status_ref = self.db.collection("sync_status")
         self.config_ref = self.db.collection("config")
         self.channels_ref = self.db.collection("synced_channels")
+        self.ocr_cache_ref = self.db.collection("ocr_cache")
 
     # --- Messages ---
 
     async def save_message(self, message: Message) -> None:
         """メッセージを保存"""
         doc_ref = self.messages_ref.document(message.message_id)
-        doc_ref.set(message.model_dump(mode="json"))
+        await doc_ref.set(message.model_dump(mode="json"))
+
+    async def save_messages(self, messages: list[Message], max_retries: int = 3) -> int:
+        """複数のメッセージをバッチコミットで保存
+
+        失敗したバッチは指数バックオフで再試行する。
+
+        Returns:
+            保存できたメッセージ数
+        """
+        saved_count = 0
+        for start in range(0, len(messages), MAX_BATCH_WRITES):
+            batch_messages = messages[start:start + MAX_BATCH_WRITES]
+
+            for attempt in range(max_retries + 1):
+                batch = self.db.batch()
+                for message in batch_messages:
+                    batch.set(
+                        self.messages_ref.document(message.message_id),
+                        message.model_dump(mode="json"),
+                    )
+                try:
+                    await batch.commit()
+                    saved_count += len(batch_messages)
+                    break
+                except Exception as e:
+                    if attempt >= max_retries:
+                        logger.error(f"バッチ保存失敗: {len(batch_messages)}件 - {e}")
+                        break
+                    wait = 2 ** attempt
+                    logger.warning(f"バッチ保存リトライ({attempt + 1}/{max_retries}): {e}")
+                    await asyncio.sleep(wait)
+
+        return saved_count
 
     async def get_message(self, message_id: str) -> Message | None:
         """メッセージを取得"""
-        doc = self.messages_ref.document(message_id).get()
+        doc = await self.messages_ref.document(message_id).get()
         if doc.exists:
             return Message(**doc.to_dict())
         return None
 
-    async def get_messages_by_ids(self, message_ids: list[str]) -> list[Message]:
-        """複数のメッセージを取得"""
-        messages = []
-        for message_id in message_ids:
-            msg = await self.get_message(message_id)
-            if msg:
-                messages.append(msg)
-        return messages
+    async def get_messages_by_ids(
+        self,
+        message_ids: list[str],
+        field_paths: list[str] | None = None,
+    ) -> tuple[list[Message], list[str]]:
+        """複数のメッセージを1回のバッチ取得で取得
+
+        Args:
+            message_ids: 取得するメッセージID一覧（この順序で返す）
+            field_paths: 取得するフィールド（Noneの場合は全フィールド）
+
+        Returns:
+            (見つかったメッセージ一覧, 見つからなかったメッセージID一覧)
+        """
+        # 重複を除去（順序保持）
+        unique_ids = list(dict.fromkeys(message_ids))
+        if not unique_ids:
+            return [], []
+
+        refs = [self.messages_ref.document(message_id) for message_id in unique_ids]
+        found: dict[str, Message] = {}
+        async for doc in self.db.get_all(refs, field_paths=field_paths):
+            if doc.exists:
+                found[doc.id] = Message(**doc.to_dict())
+
+        messages = [found[message_id] for message_id in unique_ids if message_id in found]
+        missing_ids = [message_id for message_id in unique_ids if message_id not in found]
+        return messages, missing_ids
 
     async def message_exists(self, message_id: str) -> bool:
         """メッセージが存在するか確認"""
-        doc = self.messages_ref.document(message_id).get()
+        doc = await self.messages_ref.document(message_id).get()
         return doc.exists
 
+    async def get_message_ids_by_channel(
+        self,
+        channel_id: str,
+        since: datetime | None = None,
+    ) -> list[str]:
+        """チャンネル内のメッセージIDを取得（キーのみ）
+
+        Args:
+            since: 指定時刻（秒単位に切り捨て）以降のメッセージのみ取得する。
+                複合インデックス (channel_id ASC, timestamp ASC) を使用する
+        """
+        query = self.messages_ref.where("channel_id", "==", channel_id)
+        if since:
+            # timestamp はISO 8601文字列のため、秒までの文字列を下限にする
+            query = query.where("timestamp", ">=", since.strftime("%Y-%m-%dT%H:%M:%S"))
+        docs = query.select(["__name__"]).stream()
+        return [doc.id async for doc in docs]
+
     async def get_all_messages(self) -> list[Message]:
         """全メッセージを取得（再インデックス用）"""
         messages = []
         docs = self.messages_ref.stream()
-        for doc in docs:
+        async for doc in docs:
             messages.append(Message(**doc.to_dict()))
         return messages
 
+    async def get_messages_synced_since(self, since: datetime) -> list[Message]:
+        """指定時刻以降に同期ジョブで保存されたメッセージを取得"""
+        docs = (
+            self.messages_ref
+            .where("synced_at", ">=", since.isoformat())
+            .stream()
+        )
+        return [Message(**doc.to_dict()) async for doc in docs]
+
+    async def stream_messages(self, page_size: int = 1000) -> AsyncIterator[Message]:
+        """全メッセージをチャンネル順・時間順にページ単位で取得（再インデックス用）
+
+        (channel_id, timestamp) 順で返す。スレッド内のメッセージは channel_id が
+        スレッドIDのため、(channel_id, thread_id, timestamp) 順と同じになる。
+        複合インデックス (channel_id ASC, timestamp ASC) が必要。
+
+        Args:
+            page_size: 1ページあたりの取得件数
+        """
+        query = (
+            self.messages_ref
+            .order_by("channel_id")
+            .order_by("timestamp")
+            .limit(page_size)
+        )
+        last_doc = None
+
+        while True:
+            page_query = query.start_after(last_doc) if last_doc else query
+            # ページを読み切ってから返す（処理中にストリームを開いたままにしない）
+            docs = [doc async for doc in page_query.stream()]
+            for doc in docs:
+                yield Message(**doc.to_dict())
+
+            if len(docs) < page_size:
+                return
+            last_doc = docs[-1]
+
+    async def stream_messages_synced_since(
+        self, since: datetime, page_size: int = 1000
+    ) -> AsyncIterator[Message]:
+        """指定日時（秒単位）以降に同期ジョブで保存されたメッセージを同期日時順にページ単位で取得
+
+        スナップショットの差分更新用。synced_at は ISO 8601 文字列で保存されているため、
+        秒までの接頭辞（タイムゾーン表記なし）を下限にして、"Z"・"+00:00"・
+        小数秒の有無によらず、その秒以降のメッセージをすべて含める。
+        synced_at のないメッセージは含まれない。
+
+        Args:
+            since: 下限の日時（UTC。秒未満は切り捨て）
+            page_size: 1ページあたりの取得件数
+        """
+        query = (
+            self.messages_ref
+            .where("synced_at", ">=", since.strftime("%Y-%m-%dT%H:%M:%S"))
+            .order_by("synced_at")
+            .limit(page_size)
+        )
+        last_doc = None
+
+        while True:
+            page_query = query.start_after(last_doc) if last_doc else query
+            docs = [doc async for doc in page_query.stream()]
+            for doc in docs:
+                yield Message(**doc.to_dict())
+
+            if len(docs) < page_size:
+                return
+            last_doc = docs[-1]
+
     # --- Conversation Chunks ---
 
     async def save_chunk(self, chunk: ConversationChunk) -> None:
         """会話チャンクを保存"""
         doc_ref = self.chunks_ref.document(chunk.chunk_id)
-        doc_ref.set(chunk.model_dump(mode="json"))
+        await doc_ref.set(chunk.model_dump(mode="json"))
 
     async def get_chunk(self, chunk_id: str) -> ConversationChunk | None:
         """会話チャンクを取得"""
-        doc = self.chunks_ref.document(chunk_id).get()
+        doc = await self.chunks_ref.document(chunk_id).get()
         if doc.exists:
             return ConversationChunk(**doc.to_dict())
         return None
@@ -76,7 +248,23 @@ class FirestoreClient:
             .limit(1)
             .stream()
         )
-        for doc in docs:
+        async for doc in docs:
+            return ConversationChunk(**doc.to_dict())
+        return None
+
+    async def get_latest_chunk(self, channel_id: str) -> ConversationChunk | None:
+        """チャンネル/スレッドの最新チャンクを取得
+
+        複合インデックス (channel_id ASC, end_time DESC) が必要。
+        """
+        docs = (
+            self.chunks_ref
+            .where("channel_id", "==", channel_id)
+            .order_by("end_time", direction=firestore.Query.DESCENDING)
+            .limit(1)
+            .stream()
+        )
+        async for doc in docs:
             return ConversationChunk(**doc.to_dict())
         return None
 
@@ -84,10 +272,14 @@ class FirestoreClient:
         """全チャンクを取得"""
         chunks = []
         docs = self.chunks_ref.stream()
-        for doc in docs:
+        async for doc in docs:
             chunks.append(ConversationChunk(**doc.to_dict()))
         return chunks
 
+    async def delete_chunk(self, chunk_id: str) -> None:
+        """会話チャンクを削除"""
+        await self.chunks_ref.document(chunk_id).delete()
+
     async def delete_all_chunks(self) -> int:
         """全チャンクを削除（再インデックス用）
 
@@ -96,11 +288,33 @@ class FirestoreClient:
         """
         deleted_count = 0
         docs = self.chunks_ref.stream()
-        for doc in docs:
-            doc.reference.delete()
+        async for doc in docs:
+            await doc.reference.delete()
             deleted_count += 1
         return deleted_count
 
+    # --- OCR Cache ---
+
+    async def get_ocr_result(self, sha256: str) -> tuple[str, float] | None:
+        """画像のSHA-256からキャッシュ済みOCR結果を取得
+
+        Returns:
+            (OCRテキスト, 推論のCPU秒数)、なければNone
+        """
+        doc = await self.ocr_cache_ref.document(sha256).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        return data.get("text", ""), data.get("cpu_seconds", 0.0)
+
+    async def save_ocr_result(self, sha256: str, text: str, cpu_seconds: float) -> None:
+        """OCR結果を画像のSHA-256をキーに保存"""
+        await self.ocr_cache_ref.document(sha256).set({
+            "text": text,
+            "cpu_seconds": cpu_seconds,
+            "created_at": datetime.utcnow().isoformat(),
+        })
+
     # --- Sync Status ---
 
     async def create_sync_status(self, sync_id: str, sync_type: str = "incremental") -> SyncStatus:
@@ -111,7 +325,7 @@ class FirestoreClient:
             sync_type=sync_type,
             started_at=datetime.utcnow(),
         )
-        self.sync_status_ref.document(sync_id).set(status.model_dump(mode="json"))
+        await self.sync_status_ref.document(sync_id).set(status.model_dump(mode="json"))
         return status
 
     async def update_sync_progress(
@@ -121,20 +335,40 @@ class FirestoreClient:
         last_message_id: str | None = None,
         processed_count: int | None = None,
     ) -> None:
-        """同期進捗を更新"""
+        """同期進捗を更新
+
+        チャンネルIDとメッセージIDを指定した場合はチャンネル別のチェックポイントも記録する。
+        """
         update_data = {}
         if last_channel_id:
             update_data["last_channel_id"] = last_channel_id
         if last_message_id:
             update_data["last_message_id"] = last_message_id
+        if last_channel_id and last_message_id:
+            field = FieldPath("channel_checkpoints", last_channel_id).to_api_repr()
+            update_data[field] = last_message_id
         if processed_count is not None:
             update_data["processed_count"] = processed_count
         if update_data:
-            self.sync_status_ref.document(sync_id).update(update_data)
+            await self.sync_status_ref.document(sync_id).update(update_data)
+
+    async def complete_channel_sync(self, sync_id: str, channel_id: str) -> None:
+        """チャンネルの同期完了を記録（再開時にスキップ）"""
+        await self.sync_status_ref.document(sync_id).update({
+            "completed_channel_ids": firestore.ArrayUnion([channel_id]),
+        })
+
+    async def resume_sync_status(self, sync_id: str) -> None:
+        """中断・失敗した同期を再開状態に戻し、再開回数を数える"""
+        await self.sync_status_ref.document(sync_id).update({
+            "status": "in_progress",
+            "completed_at": None,
+            "resume_count": firestore.Increment(1),
+        })
 
     async def complete_sync(self, sync_id: str, error_count: int = 0) -> None:
         """同期完了"""
-        self.sync_status_ref.document(sync_id).update({
+        await self.sync_status_ref.document(sync_id).update({
             "status": "completed",
             "completed_at": datetime.utcnow().isoformat(),
             "error_count": error_count,
@@ -142,10 +376,10 @@ class FirestoreClient:
 
     async def fail_sync(self, sync_id: str, error_message: str) -> None:
         """同期失敗"""
-        doc = self.sync_status_ref.document(sync_id).get()
+        doc = await self.sync_status_ref.document(sync_id).get()
         errors = doc.to_dict().get("error_messages", []) if doc.exists else []
         errors.append(error_message)
-        self.sync_status_ref.document(sync_id).update({
+        await self.sync_status_ref.document(sync_id).update({
             "status": "failed",
             "completed_at": datetime.utcnow().isoformat(),
             "error_messages": errors,
@@ -159,7 +393,7 @@ class FirestoreClient:
             .limit(1)
             .stream()
         )
-        for doc in docs:
+        async for doc in docs:
             return SyncStatus(**doc.to_dict())
         return None
 
@@ -167,7 +401,7 @@ class FirestoreClient:
 
     async def get_last_sync_time(self) -> datetime | None:
         """最後の同期時刻を取得"""
-        doc = self.config_ref.document("sync").get()
+        doc = await self.config_ref.document("sync").get()
         if doc.exists:
             data = doc.to_dict()
             last_sync = data.get("last_sync_at")
@@ -179,52 +413,89 @@ class FirestoreClient:
 
     async def update_last_sync_time(self, sync_time: datetime) -> None:
         """最後の同期時刻を更新"""
-        self.config_ref.document("sync").set({
+        await self.config_ref.document("sync").set({
             "last_sync_at": sync_time.isoformat(),
             "initial_sync_completed": True,
         }, merge=True)
 
+    async def get_index_version(self) -> str | None:
+        """検索インデックスのバージョン（最終更新日時）を取得"""
+        doc = await self.config_ref.document("index").get()
+        if doc.exists:
+            return doc.to_dict().get("updated_at")
+        return None
+
+    async def bump_index_version(self) -> None:
+        """検索インデックスの更新を記録（Botの検索キャッシュを無効化）"""
+        await self.config_ref.document("index").set({
+            "updated_at": datetime.utcnow().isoformat(),
+        }, merge=True)
+
     # --- Synced Channels ---
 
     async def get_synced_channel_ids(self) -> set[str]:
         """同期済みチャンネルIDの一覧を取得"""
         channel_ids = set()
         docs = self.channels_ref.stream()
-        for doc in docs:
+        async for doc in docs:
             channel_ids.add(doc.id)
         return channel_ids
 
+    async def get_channel_watermarks(self) -> dict[str, int | None]:
+        """同期済みチャンネルごとの同期済み最大メッセージID（ウォーターマーク）を取得
+
+        Returns:
+            チャンネルID → 最大メッセージID（未記録のチャンネルはNone）
+        """
+        watermarks: dict[str, int | None] = {}
+        docs = self.channels_ref.select(["last_message_id"]).stream()
+        async for doc in docs:
+            last_message_id = (doc.to_dict() or {}).get("last_message_id")
+            watermarks[doc.id] = int(last_message_id) if last_message_id else None
+        return watermarks
+
     async def mark_channel_synced(
         self,
         channel_id: str,
         channel_name: str,
         first_synced_at: datetime | None = None,
+        last_message_id: str | None = None,
     ) -> None:
-        """チャンネルを同期済みとしてマーク"""
+        """チャンネルを同期済みとしてマーク
+
+        Args:
+            last_message_id: 同期済みの最大メッセージID（次回の差分同期の起点）
+        """
         now = datetime.utcnow()
         doc_ref = self.channels_ref.document(channel_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
 
         if doc.exists:
-            # 既存: last_synced_atのみ更新
-            doc_ref.update({
+            # 既存: last_synced_at（とウォーターマーク）のみ更新
+            update_data = {
                 "channel_name": channel_name,
                 "last_synced_at": now.isoformat(),
-            })
+            }
+            if last_message_id:
+                update_data["last_message_id"] = last_message_id
+            await doc_ref.update(update_data)
         else:
             # 新規: 全フィールド設定
-            doc_ref.set({
+            data = {
                 "channel_id": channel_id,
                 "channel_name": channel_name,
                 "first_synced_at": (first_synced_at or now).isoformat(),
                 "last_synced_at": now.isoformat(),
-            })
+            }
+            if last_message_id:
+                data["last_message_id"] = last_message_id
+            await doc_ref.set(data)
 
     async def get_synced_channels_info(self) -> list[dict]:
         """同期済みチャンネルの詳細情報を取得"""
         channels = []
         docs = self.channels_ref.stream()
-        for doc in docs:
+        async for doc in docs:
             channels.append(doc.to_dict())
         return channels
 
@@ -233,7 +504,7 @@ class FirestoreClient:
         from collections import defaultdict
         counts = defaultdict(int)
         docs = self.messages_ref.stream()
-        for doc in docs:
+        async for doc in docs:
             data = doc.to_dict()
             channel_id = data.get("channel_id")
             if channel_id:
@@ -241,5 +512,71 @@ class FirestoreClient:
         return dict(counts)
 
 
-# シングルトンインスタンス
-firestore_client = FirestoreClient()
+class MessageBatchWriter:
+    """メッセージのバッファ付き一括書き込み
+
+    件数または経過時間のしきい値でまとめて save_messages に流し、
+    書き込みスループットを集計する。フラッシュは1つずつ実行し、flush() は
+    実行中のフラッシュの完了を待つため、flush() が返った時点でそれまでに
+    add() したメッセージは書き込み済み（または failed_count に計上済み）になる。
+    """
+
+    def __init__(
+        self,
+        client: FirestoreClient,
+        batch_size: int = settings.firestore_write_batch_size,
+        flush_interval_seconds: float = settings.firestore_flush_interval_seconds,
+    ):
+        self.client = client
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.flush_interval_seconds = flush_interval_seconds
+        self._buffer: list[Message] = []
+        self._flush_lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+        self._started_at = time.monotonic()
+        self.written_count = 0
+        self.failed_count = 0
+        self.batch_count = 0
+        self.write_seconds = 0.0
+
+    async def add(self, message: Message) -> None:
+        """メッセージをバッファに追加し、しきい値を超えたらフラッシュ"""
+        self._buffer.append(message)
+        elapsed = time.monotonic() - self._last_flush
+        if len(self._buffer) >= self.batch_size or elapsed >= self.flush_interval_seconds:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """バッファ内のメッセージを書き込み（実行中のフラッシュがあれば完了を待つ）"""
+        self._last_flush = time.monotonic()
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+
+            messages, self._buffer = self._buffer, []
+            start = time.perf_counter()
+            saved = await self.client.save_messages(messages)
+            self.write_seconds += time.perf_counter() - start
+
+            self.batch_count += 1
+            self.written_count += saved
+            self.failed_count += len(messages) - saved
+            logger.debug(f"バッチ保存: {saved}/{len(messages)}件")
+
+    def stats(self) -> dict:
+        """書き込み統計を取得"""
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "written": self.written_count,
+            "failed": self.failed_count,
+            "batches": self.batch_count,
+            "write_seconds": round(self.write_seconds, 2),
+            "messages_per_second": round(self.written_count / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+# シングルトンインスタンス（import時ではなく初回利用時に生成）
+@cache
+def get_firestore_client() -> FirestoreClient:
+    """Firestoreクライアントを取得（初回呼び出し時に生成）"""
+    return FirestoreClient()
@@ -1,17 +1,27 @@
 """Gemini File Search クライアント"""
 
+import asyncio
 import json
 import logging
+import re
+from functools import cache
 from pathlib import Path
-
-from google import genai
-from google.genai import types
+from typing import TYPE_CHECKING
 
 from src.core.config import settings
 from src.core.models import ConversationChunk, Message
+from src.core.uploader import FileSearchUploader
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 logger = logging.getLogger(__name__)
 
+# 検索レスポンス中のJSONブロック
+_JSON_BLOCK_PATTERN = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
+# JSONパース失敗時に拾うメッセージID
+_MESSAGE_ID_PATTERN = re.compile(r"msg_(\d+)")
+
 
 def load_user_aliases() -> dict[str, str]:
     """config/aliases.json からユーザーエイリアスを読み込む"""
@@ -29,13 +39,73 @@ def load_user_aliases() -> dict[str, str]:
         return {}
 
 
+def is_document_name(doc_id: str | None) -> bool:
+    """File Search Storeのドキュメント名（削除可能な形式）か判定"""
+    return bool(doc_id) and doc_id.startswith("fileSearchStores/")
+
+
+def parse_search_response(
+    response_text: str,
+    limit: int = settings.search_result_limit,
+) -> list[dict] | None:
+    """検索レスポンスのJSONから結果（message_id, reason, highlight）を取り出す
+
+    JSONとして読めない場合は本文中の msg_<ID> を拾う。JSONがオブジェクトでない
+    （配列等）場合は結果として読めない応答としてNoneを返す（0件として扱い、キャッシュしない）。
+    """
+    if not response_text:
+        return []
+
+    results = []
+
+    # JSONブロックを抽出
+    json_match = _JSON_BLOCK_PATTERN.search(response_text)
+    if json_match:
+        json_str = json_match.group(1)
+    else:
+        # ```なしの場合、全体をJSONとしてパース試行
+        json_str = response_text.strip()
+
+    try:
+        data = json.loads(json_str)
+        if not isinstance(data, dict):
+            logger.warning(f"検索レスポンスがJSONオブジェクトではありません: {response_text[:200]}")
+            return None
+        for item in data.get("results", [])[:limit]:
+            msg_id = item.get("message_id", "")
+            # msg_プレフィックスを除去
+            if msg_id.startswith("msg_"):
+                msg_id = msg_id[4:]
+            results.append({
+                "message_id": msg_id,
+                "reason": item.get("reason", ""),
+                "highlight": item.get("highlight", ""),
+            })
+    except json.JSONDecodeError:
+        # JSONパース失敗時は従来方式にフォールバック
+        logger.warning(f"JSONパース失敗、従来方式にフォールバック: {response_text[:200]}")
+        message_ids = _MESSAGE_ID_PATTERN.findall(response_text)
+        for msg_id in message_ids[:limit]:
+            results.append({
+                "message_id": msg_id,
+                "reason": "",
+                "highlight": "",
+            })
+
+    return results
+
+
 class GeminiClient:
     """Gemini API操作クラス"""
 
     def __init__(self):
+        # google.genai は読み込みが重いため、クライアント生成時にimportする
+        from google import genai
+
         self.client = genai.Client(api_key=settings.gemini_api_key)
         self.store_name: str | None = None
-        self._store: types.FileSearchStore | None = None
+        self._store: "types.FileSearchStore | None" = None
+        self.uploader = FileSearchUploader(self.client)
 
     async def ensure_store(self) -> str:
         """File Search Storeが存在することを確認し、名前を返す"""
@@ -61,49 +131,20 @@ class GeminiClient:
 
     async def index_message(self, message: Message) -> str | None:
         """メッセージをFile Search Storeにインデックス"""
-        import tempfile
-        import os
-        import time
+        store_name = await self.ensure_store()
+        display_name = f"msg_{message.message_id}"
 
-        try:
-            store_name = await self.ensure_store()
-            content = message.to_file_content()
-
-            # 一時ファイルに書き込み
-            with tempfile.NamedTemporaryFile(
-                mode="w",
-                suffix=".txt",
-                encoding="utf-8",
-                delete=False,
-            ) as tmp_file:
-                tmp_file.write(content)
-                tmp_path = tmp_file.name
-
-            try:
-                # ファイルとしてアップロード
-                operation = self.client.file_search_stores.upload_to_file_search_store(
-                    file=tmp_path,
-                    file_search_store_name=store_name,
-                    config={
-                        "display_name": f"msg_{message.message_id}",
-                    }
-                )
-
-                # 完了を待機
-                while not operation.done:
-                    time.sleep(1)
-                    operation = self.client.operations.get(operation)
-
-                logger.debug(f"メッセージをインデックス: {message.message_id}")
-                return f"msg_{message.message_id}"
-            finally:
-                # 一時ファイルを削除
-                os.unlink(tmp_path)
-
-        except Exception as e:
-            logger.error(f"インデックス失敗: {message.message_id} - {e}")
+        document_name = await self.uploader.upload(
+            store_name,
+            display_name,
+            message.to_file_content(),
+        )
+        if not document_name:
             return None
 
+        logger.debug(f"メッセージをインデックス: {message.message_id}")
+        return display_name
+
     async def index_conversation_chunk(
         self,
         chunk: ConversationChunk,
@@ -114,89 +155,88 @@ class GeminiClient:
         Args:
             chunk: インデックスする会話チャンク
             messages: チャンク内のメッセージ一覧（時間順）
+
+        Returns:
+            ストア内のドキュメント名（削除に使用）
         """
-        import tempfile
-        import os
-        import time
+        store_name = await self.ensure_store()
 
-        try:
-            store_name = await self.ensure_store()
-            content = chunk.to_file_content(messages)
-
-            # 一時ファイルに書き込み
-            with tempfile.NamedTemporaryFile(
-                mode="w",
-                suffix=".txt",
-                encoding="utf-8",
-                delete=False,
-            ) as tmp_file:
-                tmp_file.write(content)
-                tmp_path = tmp_file.name
-
-            try:
-                # ファイルとしてアップロード
-                operation = self.client.file_search_stores.upload_to_file_search_store(
-                    file=tmp_path,
-                    file_search_store_name=store_name,
-                    config={
-                        "display_name": f"chunk_{chunk.chunk_id}",
-                    }
-                )
+        document_name = await self.uploader.upload(
+            store_name,
+            f"chunk_{chunk.chunk_id}",
+            chunk.to_file_content(messages),
+        )
+        if document_name:
+            logger.debug(f"チャンクをインデックス: {chunk.chunk_id}")
+        return document_name
 
-                # 完了を待機
-                while not operation.done:
-                    time.sleep(1)
-                    operation = self.client.operations.get(operation)
+    async def index_conversation_chunks(
+        self,
+        items: list[tuple[ConversationChunk, list[Message]]],
+    ) -> list[str | None]:
+        """複数の会話チャンクを並行インデックス
 
-                logger.debug(f"チャンクをインデックス: {chunk.chunk_id}")
-                return f"chunk_{chunk.chunk_id}"
-            finally:
-                # 一時ファイルを削除
-                os.unlink(tmp_path)
+        Args:
+            items: (チャンク, チャンク内のメッセージ一覧) の一覧
 
-        except Exception as e:
-            logger.error(f"チャンクインデックス失敗: {chunk.chunk_id} - {e}")
-            return None
+        Returns:
+            itemsと同じ順序のドキュメント名一覧（失敗はNone）
+        """
+        return await asyncio.gather(*(
+            self.index_conversation_chunk(chunk, messages)
+            for chunk, messages in items
+        ))
 
-    async def delete_all_files_in_store(self) -> int:
-        """File Search Store内の全ファイルを削除（再インデックス用）
+    async def delete_document(self, document_name: str) -> bool:
+        """File Search Store内のドキュメントを削除
 
-        Returns:
-            削除したファイル数
+        Args:
+            document_name: ドキュメント名（fileSearchStores/.../documents/...）
         """
         try:
-            store_name = await self.ensure_store()
-            deleted_count = 0
-
-            # ストア内のファイル一覧を取得して削除
-            files = self.client.file_search_stores.list_files(
-                file_search_store_name=store_name
+            await self.client.aio.file_search_stores.documents.delete(
+                name=document_name,
+                config={"force": True},
             )
+            logger.debug(f"ドキュメント削除: {document_name}")
+            return True
+        except Exception as e:
+            logger.warning(f"ドキュメント削除失敗: {document_name} - {e}")
+            return False
 
-            for file in files:
-                try:
-                    self.client.file_search_stores.delete_file(
-                        file_search_store_name=store_name,
-                        file_name=file.name,
-                    )
-                    deleted_count += 1
-                    logger.debug(f"ファイル削除: {file.name}")
-                except Exception as e:
-                    logger.warning(f"ファイル削除失敗: {file.name} - {e}")
+    async def delete_all_files_in_store(self) -> int:
+        """File Search Store内の全ドキュメントを削除（再インデックス用）
 
-            logger.info(f"File Search Store内の{deleted_count}件のファイルを削除")
-            return deleted_count
+        一覧を読み切ってから delete_document で1件ずつ削除する
+        （削除しながらページを進めると取りこぼすため）。
 
+        Returns:
+            削除したドキュメント数
+        """
+        try:
+            store_name = await self.ensure_store()
+            pager = await self.client.aio.file_search_stores.documents.list(parent=store_name)
+            document_names = [document.name async for document in pager]
         except Exception as e:
-            logger.error(f"ファイル削除処理失敗: {e}")
+            logger.error(f"ドキュメント一覧の取得失敗: {e}")
             return 0
 
+        deleted_count = 0
+        for document_name in document_names:
+            if await self.delete_document(document_name):
+                deleted_count += 1
+
+        logger.info(f"File Search Store内の{deleted_count}件のドキュメントを削除")
+        return deleted_count
+
     async def search(self, query: str) -> list[dict]:
         """自然言語で検索"""
+        from google.genai import types
+
         try:
             store_name = await self.ensure_store()
 
-            response = self.client.models.generate_content(
+            response = await self.client.aio.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=query,
                 config=types.GenerateContentConfig(
@@ -224,8 +264,7 @@ class GeminiClient:
             results = []
             if response.text:
                 # msg_で始まるIDを抽出
-                import re
-                message_ids = re.findall(r"msg_(\d+)", response.text)
+                message_ids = _MESSAGE_ID_PATTERN.findall(response.text)
                 for msg_id in message_ids[:settings.search_result_limit]:
                     results.append({
                         "message_id": msg_id,
@@ -242,8 +281,14 @@ class GeminiClient:
         self,
         query: str,
         previous_results: list[str] | None = None,
-    ) -> tuple[list[dict], str]:
-        """コンテキスト付き検索（絞り込み対応）"""
+    ) -> tuple[list[dict] | None, str]:
+        """コンテキスト付き検索（絞り込み対応）
+
+        API呼び出しに失敗した場合は例外を送出する（0件の結果と区別するため）。
+        結果として読めない応答の場合、結果はNone（parse_search_response を参照）。
+        """
+        from google.genai import types
+
         try:
             store_name = await self.ensure_store()
 
@@ -254,7 +299,7 @@ class GeminiClient:
 
             full_query = query + context
 
-            response = self.client.models.generate_content(
+            response = await self.client.aio.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=full_query,
                 config=types.GenerateContentConfig(
@@ -270,48 +315,12 @@ class GeminiClient:
             )
 
             # レスポンスからJSONをパース
-            results = []
             response_text = response.text or ""
-
-            if response_text:
-                import re
-
-                # JSONブロックを抽出
-                json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                else:
-                    # ```なしの場合、全体をJSONとしてパース試行
-                    json_str = response_text.strip()
-
-                try:
-                    data = json.loads(json_str)
-                    for item in data.get("results", [])[:settings.search_result_limit]:
-                        msg_id = item.get("message_id", "")
-                        # msg_プレフィックスを除去
-                        if msg_id.startswith("msg_"):
-                            msg_id = msg_id[4:]
-                        results.append({
-                            "message_id": msg_id,
-                            "reason": item.get("reason", ""),
-                            "highlight": item.get("highlight", ""),
-                        })
-                except json.JSONDecodeError:
-                    # JSONパース失敗時は従来方式にフォールバック
-                    logger.warning(f"JSONパース失敗、従来方式にフォールバック: {response_text[:200]}")
-                    message_ids = re.findall(r"msg_(\d+)", response_text)
-                    for msg_id in message_ids[:settings.search_result_limit]:
-                        results.append({
-                            "message_id": msg_id,
-                            "reason": "",
-                            "highlight": "",
-                        })
-
-            return results, response_text
+            return parse_search_response(response_text), response_text
 
         except Exception as e:
             logger.error(f"検索失敗: {query} - {e}")
-            return [], str(e)
+            raise
 
     def _build_search_system_instruction(self) -> str:
         """検索用のシステムインストラクションを構築"""
@@ -352,5 +361,8 @@ class GeminiClient:
 """
 
 
-# シングルトンインスタンス
-gemini_client = GeminiClient()
+# シングルトンインスタンス（import時ではなく初回利用時に生成）
+@cache
+def get_gemini_client() -> GeminiClient:
+    """Geminiクライアントを取得（初回呼び出し時に生成）"""
+    return GeminiClient()
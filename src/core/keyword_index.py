@@ -0,0 +1,200 @@
+"""ローカル キーワード検索インデックス
+
+メッセージ本文・OCRテキストの転置インデックスを保持し、BM25でランキングする。
+日本語は文字bi-gram、英数字は単語単位でトークン化する。
+ファイル名や金額などの完全一致寄りのクエリをGeminiを使わずに即時回答するために使う。
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from collections import Counter
+
+from src.core.models import Message
+
+# 英数字の連続（単語単位）と、それ以外の文字の連続（bi-gram）
+_TOKEN_PATTERN = re.compile(r"[0-9a-z_]+|[^\s0-9a-z_\W]+")
+
+# キーワード検索向きのクエリ: 引用符で囲まれた語、ファイル名、金額
+_QUOTED_PATTERN = re.compile(r"^[\"「『](.+)[\"」』]$")
+_FILENAME_PATTERN = re.compile(r"[\w\-]+\.[a-z0-9]{2,5}\b", re.IGNORECASE)
+_AMOUNT_PATTERN = re.compile(r"[¥￥$]?\d[\d,]*(?:円|万円|ドル)")
+
+# BM25パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_text(text: str) -> str:
+    """NFKC正規化して小文字化"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> list[str]:
+    """テキストをトークン化（英数字は単語、その他は文字bi-gram）"""
+    tokens: list[str] = []
+    for match in _TOKEN_PATTERN.finditer(normalize_text(text)):
+        run = match.group()
+        if run.isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def extract_keywords(query: str) -> str | None:
+    """キーワード型のクエリからローカル検索に使うキーワードを取り出す
+
+    引用符で囲まれた語、ファイル名、金額を含むクエリが対象。
+
+    Returns:
+        検索キーワード（キーワード型でなければNone）
+    """
+    query = normalize_text(query.strip())
+    quoted = _QUOTED_PATTERN.match(query)
+    if quoted:
+        return quoted.group(1)
+
+    matches = _FILENAME_PATTERN.findall(query) or _AMOUNT_PATTERN.findall(query)
+    if matches:
+        return " ".join(matches)
+    return None
+
+
+def _message_text(message: Message) -> str:
+    """インデックス対象のテキスト（本文・ファイル名・OCRテキスト）"""
+    parts = [message.content]
+    for att in message.attachments:
+        parts.append(att.filename)
+        if att.ocr_text:
+            parts.append(att.ocr_text)
+    return "\n".join(part for part in parts if part)
+
+
+class KeywordIndex:
+    """BM25転置インデックス
+
+    ポスティングは語ごとに文書番号と出現回数の array('I') で保持する。
+    """
+
+    def __init__(self):
+        self._message_ids: list[str] = []
+        self._doc_numbers: dict[str, int] = {}
+        self._doc_lengths = array("I")
+        self._total_length = 0
+        # 語 → (文書番号の配列, 出現回数の配列)
+        self._postings: dict[str, tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        return len(self._message_ids)
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._doc_numbers
+
+    def add(self, message: Message) -> bool:
+        """メッセージを追加（追加済みの場合は何もしない）
+
+        Returns:
+            追加した場合True
+        """
+        if message.message_id in self._doc_numbers:
+            return False
+
+        text = _message_text(message)
+        term_counts = Counter(tokenize(text))
+        doc_number = len(self._message_ids)
+
+        self._message_ids.append(message.message_id)
+        self._doc_numbers[message.message_id] = doc_number
+        length = sum(term_counts.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+
+        for term, count in term_counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = (array("I"), array("I"))
+                self._postings[term] = postings
+            postings[0].append(doc_number)
+            postings[1].append(count)
+
+        return True
+
+    def add_many(self, messages: list[Message]) -> int:
+        """複数のメッセージを追加
+
+        Returns:
+            新規に追加したメッセージ数
+        """
+        return sum(1 for message in messages if self.add(message))
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        """BM25でランキングしたメッセージを返す
+
+        クエリの全トークンを含むメッセージのみ対象とする。
+
+        Args:
+            query: 検索キーワード（extract_keywords()の結果）
+            limit: 最大件数
+
+        Returns:
+            {"message_id", "reason", "highlight"} の一覧（スコア順）
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._message_ids:
+            return []
+
+        # 出現文書数が少ない語から処理
+        term_postings = []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                return []
+            term_postings.append((term, postings))
+        term_postings.sort(key=lambda item: len(item[1][0]))
+
+        n_docs = len(self._message_ids)
+        avg_length = self._total_length / n_docs
+        scores: dict[int, float] = {}
+
+        for i, (_, (doc_numbers, counts)) in enumerate(term_postings):
+            df = len(doc_numbers)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            next_scores: dict[int, float] = {}
+            for doc_number, tf in zip(doc_numbers, counts):
+                if i > 0 and doc_number not in scores:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc_number] / avg_length)
+                score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                next_scores[doc_number] = scores.get(doc_number, 0.0) + score
+            scores = next_scores
+            if not scores:
+                return []
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "message_id": self._message_ids[doc_number],
+                "reason": f"キーワード「{query}」に一致",
+                "highlight": "",
+            }
+            for doc_number, _ in top
+        ]
+
+
+def make_highlight(message: Message, keywords: str, width: int = 50) -> str:
+    """キーワードに一致した箇所の周辺テキストを切り出す（本文・OCRテキストから）"""
+    text = _message_text(message)
+    normalized = normalize_text(text)
+    position = min(
+        (pos for pos in (normalized.find(word) for word in keywords.split()) if pos >= 0),
+        default=-1,
+    )
+    if position < 0:
+        return ""
+    start = max(position - width // 4, 0)
+    return text[start:start + width].replace("\n", " ")
@@ -0,0 +1,37 @@
+"""同期済みメッセージIDの集合
+
+Discordのメッセージ ID（snowflake）を符号なし64bit整数のソート済み配列で保持し、
+Firestoreへの存在確認をローカルの二分探索に置き換える。
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+
+class KnownMessageIds:
+    """同期済みメッセージIDのメンバーシップ集合（1チャンネル分）
+
+    1IDあたり8バイト。ルックアップは O(log n) で偽陽性はない。
+    """
+
+    def __init__(self, message_ids: Iterable[str | int] = ()):
+        self._ids = array("Q", sorted({int(message_id) for message_id in message_ids}))
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, message_id: str | int) -> bool:
+        value = int(message_id)
+        i = bisect_left(self._ids, value)
+        return i < len(self._ids) and self._ids[i] == value
+
+    def check(self, message_id: str | int) -> bool:
+        """同期済みか判定し、ヒット/ミスを記録"""
+        if message_id in self:
+            self.hit_count += 1
+            return True
+        self.miss_count += 1
+        return False
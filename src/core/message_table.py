@@ -0,0 +1,302 @@
+"""列指向のメッセージテーブル
+
+バッチ処理（再インデックス等）でコーパス全体をメモリに保持するためのコンパクトな表現。
+Message（pydanticモデル）をメッセージごとに持つ代わりに、列ごとの配列で保持する。
+
+- メッセージID・チャンネルID・投稿者ID（snowflake）と日時は int64 の配列
+- チャンネル名・投稿者名・Content-Type 等の重複の多い文字列は文字列プールの番号
+- 本文・URL・OCRテキスト等は1つの連続したUTF-8バッファとオフセット
+- 添付ファイルは子テーブル（メッセージごとの開始位置で参照）
+
+int64の列は array.array のため、NumPyがあれば np.frombuffer でコピーせずに参照できる。
+スナップショット（src/core/snapshot.py）から読み込んだテーブルは、列がファイルを
+メモリマップした memoryview になる（読み取り専用）。
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+
+from src.core.models import Attachment, Message
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# 日時がNoneの場合の値
+_NULL_TIME = -(2 ** 63)
+
+# flags 列のビット
+_HAS_ATTACHMENT = 1
+_TIMESTAMP_AWARE = 2
+_SYNCED_AT_AWARE = 4
+_INDEXED_AT_AWARE = 8
+
+
+def _snowflake(value: str) -> int:
+    """snowflake ID（10進文字列）を整数に変換"""
+    if not (value.isascii() and value.isdigit()) or value != str(int(value)) or len(value) > 19:
+        raise ValueError(f"snowflake IDではありません: {value!r}")
+    number = int(value)
+    if number >= 2 ** 63:
+        raise ValueError(f"snowflake IDが範囲外です: {value!r}")
+    return number
+
+
+def _to_microseconds(value: datetime | None) -> int:
+    """日時をエポックからのマイクロ秒に変換（タイムゾーン付きはUTC）"""
+    if value is None:
+        return _NULL_TIME
+    return (value - (_EPOCH_UTC if value.tzinfo else _EPOCH)) // _MICROSECOND
+
+
+def _from_microseconds(value: int, aware: bool) -> datetime | None:
+    if value == _NULL_TIME:
+        return None
+    # timedelta は位置引数の方が生成が速い
+    return (_EPOCH_UTC if aware else _EPOCH) + timedelta(0, 0, value)
+
+
+class StringPool:
+    """重複の多い文字列を番号で保持（同じ文字列は1つだけ保持する）"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: list[str] = list(values)
+        self._index: dict[str, int] = {value: i for i, value in enumerate(self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: str | None) -> int:
+        """文字列を登録して番号を返す（Noneは-1）"""
+        if value is None:
+            return -1
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def get(self, index: int) -> str | None:
+        return self.values[index] if index >= 0 else None
+
+    def nbytes(self) -> int:
+        """文字列本体のバイト数（UTF-8）"""
+        return sum(len(value.encode("utf-8")) for value in self.values)
+
+
+class TextColumn:
+    """可変長文字列の列（連続したUTF-8バッファ + 終端オフセット）"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+        self.nulls = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.nulls)
+
+    def append(self, value: str | None) -> None:
+        if value is None:
+            self.nulls.append(1)
+        else:
+            self.nulls.append(0)
+            self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def get(self, index: int) -> str | None:
+        if self.nulls[index]:
+            return None
+        # data は bytearray またはメモリマップした memoryview
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def nbytes(self) -> int:
+        return len(self.data) + len(self.offsets) * self.offsets.itemsize + len(self.nulls)
+
+
+class MessageTable:
+    """Message の列指向テーブル
+
+    Message との相互変換は可逆（IDはsnowflakeであること）。
+    タイムゾーン付きの日時はUTCとして復元する。
+    """
+
+    # 列の一覧（スナップショットの保存順）
+    ARRAY_COLUMNS = (
+        "message_ids", "channel_ids", "thread_ids", "author_ids",
+        "timestamps", "synced_at", "indexed_at",
+        "channel_names", "thread_names", "author_names", "jump_urls",
+        "attachment_offsets", "attachment_content_types",
+    )
+    BYTE_COLUMNS = ("flags", "attachment_has_ocr")
+    TEXT_COLUMNS = (
+        "contents", "file_search_doc_ids",
+        "attachment_filenames", "attachment_urls", "attachment_ocr_texts",
+    )
+
+    def __init__(self):
+        # snowflake ID（スレッドなしは0）
+        self.message_ids = array("q")
+        self.channel_ids = array("q")
+        self.thread_ids = array("q")
+        self.author_ids = array("q")
+        # 日時（エポックからのマイクロ秒、Noneは _NULL_TIME）
+        self.timestamps = array("q")
+        self.synced_at = array("q")
+        self.indexed_at = array("q")
+        # 文字列プールの番号（Noneは-1）
+        self.strings = StringPool()
+        self.channel_names = array("i")
+        self.thread_names = array("i")
+        self.author_names = array("i")
+        # jump_url は「.../{message_id}」の接頭辞の番号（接頭辞で表せない場合は ~番号 で全体）
+        self.jump_urls = array("i")
+        self.flags = bytearray()
+        self.contents = TextColumn()
+        self.file_search_doc_ids = TextColumn()
+        # 添付ファイル（メッセージ i の添付は attachment_offsets[i]〜[i + 1]）
+        self.attachment_offsets = array("q", [0])
+        self.attachment_filenames = TextColumn()
+        self.attachment_content_types = array("i")
+        self.attachment_urls = TextColumn()
+        self.attachment_has_ocr = bytearray()
+        self.attachment_ocr_texts = TextColumn()
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Message]) -> "MessageTable":
+        """Message の一覧からテーブルを作成"""
+        table = cls()
+        table.extend(messages)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.message_ids)
+
+    def __iter__(self) -> Iterator[Message]:
+        return (self.get(i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> Message:
+        return self.get(index)
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        """メッセージを追加"""
+        for msg in messages:
+            self.append(msg)
+
+    def append(self, msg: Message) -> None:
+        """メッセージを1件追加"""
+        # 列の長さが揃うよう、IDの変換（失敗しうる）を先に行う
+        message_id = _snowflake(msg.message_id)
+        channel_id = _snowflake(msg.channel_id)
+        thread_id = _snowflake(msg.thread_id) if msg.thread_id else 0
+        author_id = _snowflake(msg.author_id)
+
+        self.message_ids.append(message_id)
+        self.channel_ids.append(channel_id)
+        self.thread_ids.append(thread_id)
+        self.author_ids.append(author_id)
+
+        self.timestamps.append(_to_microseconds(msg.timestamp))
+        self.synced_at.append(_to_microseconds(msg.synced_at))
+        self.indexed_at.append(_to_microseconds(msg.indexed_at))
+
+        strings = self.strings
+        self.channel_names.append(strings.add(msg.channel_name))
+        self.thread_names.append(strings.add(msg.thread_name))
+        self.author_names.append(strings.add(msg.author_name))
+
+        suffix = f"/{message_id}"
+        if msg.jump_url.endswith(suffix):
+            self.jump_urls.append(strings.add(msg.jump_url[:-len(msg.message_id)]))
+        else:
+            self.jump_urls.append(~strings.add(msg.jump_url))
+
+        flags = 0
+        if msg.has_attachment:
+            flags |= _HAS_ATTACHMENT
+        if msg.timestamp.tzinfo:
+            flags |= _TIMESTAMP_AWARE
+        if msg.synced_at and msg.synced_at.tzinfo:
+            flags |= _SYNCED_AT_AWARE
+        if msg.indexed_at and msg.indexed_at.tzinfo:
+            flags |= _INDEXED_AT_AWARE
+        self.flags.append(flags)
+
+        self.contents.append(msg.content)
+        self.file_search_doc_ids.append(msg.file_search_doc_id)
+
+        for att in msg.attachments:
+            self.attachment_filenames.append(att.filename)
+            self.attachment_content_types.append(strings.add(att.content_type))
+            self.attachment_urls.append(att.url)
+            self.attachment_has_ocr.append(att.has_ocr)
+            self.attachment_ocr_texts.append(att.ocr_text)
+        self.attachment_offsets.append(len(self.attachment_has_ocr))
+
+    def get(self, index: int) -> Message:
+        """i番目のメッセージを Message に変換"""
+        if index < 0:
+            index += len(self)
+        strings = self.strings
+        flags = self.flags[index]
+        message_id = str(self.message_ids[index])
+        thread_id = self.thread_ids[index]
+
+        jump_url = self.jump_urls[index]
+        if jump_url >= 0:
+            jump_url = strings.values[jump_url] + message_id
+        else:
+            jump_url = strings.values[~jump_url]
+
+        attachments = [
+            Attachment(
+                filename=self.attachment_filenames.get(j),
+                content_type=strings.values[self.attachment_content_types[j]],
+                url=self.attachment_urls.get(j),
+                has_ocr=bool(self.attachment_has_ocr[j]),
+                ocr_text=self.attachment_ocr_texts.get(j),
+            )
+            for j in range(self.attachment_offsets[index], self.attachment_offsets[index + 1])
+        ]
+
+        # model_construct よりも通常の生成（pydantic-coreでの検証）の方が速い
+        return Message(
+            message_id=message_id,
+            channel_id=str(self.channel_ids[index]),
+            channel_name=strings.values[self.channel_names[index]],
+            thread_id=str(thread_id) if thread_id else None,
+            thread_name=strings.get(self.thread_names[index]),
+            author_id=str(self.author_ids[index]),
+            author_name=strings.values[self.author_names[index]],
+            content=self.contents.get(index),
+            timestamp=_from_microseconds(self.timestamps[index], bool(flags & _TIMESTAMP_AWARE)),
+            has_attachment=bool(flags & _HAS_ATTACHMENT),
+            attachments=attachments,
+            jump_url=jump_url,
+            synced_at=_from_microseconds(self.synced_at[index], bool(flags & _SYNCED_AT_AWARE)),
+            indexed_at=_from_microseconds(self.indexed_at[index], bool(flags & _INDEXED_AT_AWARE)),
+            file_search_doc_id=self.file_search_doc_ids.get(index),
+        )
+
+    def to_messages(self) -> list[Message]:
+        """全メッセージを Message の一覧に変換"""
+        return list(self)
+
+    def watermark(self) -> int | None:
+        """テーブル内の最大メッセージID（空の場合はNone）"""
+        return max(self.message_ids) if len(self) else None
+
+    def last_synced_at(self) -> datetime | None:
+        """テーブル内の最新の同期日時（UTC、タイムゾーンなし。記録がない場合はNone）"""
+        latest = max(self.synced_at, default=_NULL_TIME)
+        return _from_microseconds(latest, aware=False)
+
+    def nbytes(self) -> int:
+        """テーブルが保持するデータのバイト数（配列・バッファ・プールの文字列）"""
+        return (
+            sum(len(getattr(self, name)) * getattr(self, name).itemsize
+                for name in self.ARRAY_COLUMNS)
+            + sum(len(getattr(self, name)) for name in self.BYTE_COLUMNS)
+            + sum(getattr(self, name).nbytes() for name in self.TEXT_COLUMNS)
+            + self.strings.nbytes()
+        )
@@ -1,5 +1,6 @@
 """Pydantic モデル定義"""
 
+import hashlib
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -29,6 +30,7 @@ class Message(BaseModel):
     has_attachment: bool = False
     attachments: list[Attachment] = Field(default_factory=list)
     jump_url: str
+    synced_at: datetime | None = None  # 同期ジョブで保存した日時
     indexed_at: datetime | None = None
     file_search_doc_id: str | None = None
 
@@ -77,6 +79,12 @@ class SyncStatus(BaseModel):
     processed_count: int = 0
     error_count: int = 0
     error_messages: list[str] = Field(default_factory=list)
+    # 再開用: チャンネルID → 保存・インデックス済みの最大メッセージID
+    channel_checkpoints: dict[str, str] = Field(default_factory=dict)
+    # 再開用: 同期が完了したチャンネルID
+    completed_channel_ids: list[str] = Field(default_factory=list)
+    # 同じ sync_id で再開した回数（失敗・強制終了のどちらで止まった場合も数える）
+    resume_count: int = 0
 
 
 class SearchResult(BaseModel):
@@ -95,7 +103,7 @@ class ConversationChunk(BaseModel):
     最適チャンクサイズ: 256-512トークン
     """
 
-    chunk_id: str  # UUID
+    chunk_id: str  # UUID（チャンネル・スレッド・先頭メッセージIDから決定的に生成）
     channel_id: str
     channel_name: str
     thread_id: str | None = None
@@ -104,9 +112,19 @@ class ConversationChunk(BaseModel):
     end_time: datetime  # 最後のメッセージ時刻
     message_ids: list[str] = Field(default_factory=list)
     participant_names: list[str] = Field(default_factory=list)
+    content_hash: str | None = None  # to_file_content()のSHA-256（差分判定用）
     indexed_at: datetime | None = None
     file_search_doc_id: str | None = None
 
+    def compute_content_hash(self, messages: list[Message]) -> str:
+        """インデックスする内容のハッシュを計算
+
+        Args:
+            messages: チャンク内のメッセージ一覧（時間順）
+        """
+        content = self.to_file_content(messages)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     def to_file_content(self, messages: list[Message]) -> str:
         """File Search Store用の会話形式テキストを生成
 
@@ -0,0 +1,102 @@
+"""検索結果キャッシュ
+
+正規化したクエリと絞り込み元の結果をキーに、Geminiの検索結果を保持する。
+件数上限（LRU）・有効期限（TTL）付きで、結果0件も短い期限でキャッシュする。
+"""
+
+import re
+import time
+from collections import OrderedDict
+
+from src.core.config import settings
+from src.core.keyword_index import normalize_text
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+CacheKey = tuple[str, tuple[str, ...]]
+
+
+def make_cache_key(query: str, previous_results: list[str] | None = None) -> CacheKey:
+    """キャッシュキーを生成（NFKC正規化・小文字化・空白の正規化）"""
+    normalized = _WHITESPACE_PATTERN.sub(" ", normalize_text(query)).strip()
+    return normalized, tuple(previous_results or ())
+
+
+class SearchResultCache:
+    """TTL付きLRU検索結果キャッシュ"""
+
+    def __init__(
+        self,
+        max_size: int = settings.search_cache_size,
+        ttl_seconds: float = settings.search_cache_ttl_seconds,
+        negative_ttl_seconds: float = settings.search_cache_negative_ttl_seconds,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # キー → (有効期限, (検索結果, レスポンステキスト))
+        self._entries: OrderedDict[CacheKey, tuple[float, tuple[list[dict], str]]] = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.invalidation_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> tuple[list[dict], str] | None:
+        """キャッシュを取得（なければNone）"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.miss_count += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hit_count += 1
+        return entry[1]
+
+    @property
+    def generation(self) -> int:
+        """invalidate() のたびに変わる世代番号（取得開始時に控えて put に渡す）"""
+        return self.invalidation_count
+
+    def put(
+        self,
+        key: CacheKey,
+        results: list[dict],
+        response_text: str,
+        generation: int | None = None,
+    ) -> None:
+        """検索結果をキャッシュ（0件は短い有効期限）
+
+        Args:
+            generation: 検索開始時の generation。検索中に invalidate() された場合は
+                更新前のインデックスの結果のため保存しない
+        """
+        if generation is not None and generation != self.generation:
+            return
+        ttl = self.ttl_seconds if results else self.negative_ttl_seconds
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, (results, response_text))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """全エントリを破棄（インデックス更新時）"""
+        self._entries.clear()
+        self.invalidation_count += 1
+
+    def stats(self) -> dict:
+        """キャッシュ統計を取得"""
+        total = self.hit_count + self.miss_count
+        return {
+            "size": len(self._entries),
+            "hits": self.hit_count,
+            "misses": self.miss_count,
+            "hit_ratio": round(self.hit_count / total, 3) if total else 0.0,
+            "invalidations": self.invalidation_count,
+        }
@@ -0,0 +1,56 @@
+"""同時実行される同一リクエストの集約（single-flight）"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """同じキーの処理が実行中なら、新たに実行せずその結果を共有する"""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.call_count = 0
+        self.coalesced_count = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """キーごとに1回だけfnを実行し、全ての呼び出し元に結果を返す
+
+        fnが例外を送出した場合は全ての呼び出し元に同じ例外を送出し、キーを解放する
+        （失敗を結果として共有せず、次の呼び出しで再実行する）。共有中の処理が
+        キャンセルされた場合は、呼び出し元自身のキャンセルと区別できるよう RuntimeError を送出する。
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.call_count += 1
+        else:
+            self.coalesced_count += 1
+
+        try:
+            # 呼び出し元がキャンセルされても共有中の処理は継続させる
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                raise RuntimeError(f"共有中の処理がキャンセルされました: {key}") from None
+            raise
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        """完了した処理のキーを解放"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 呼び出し元が全てキャンセルされていても、例外の未取得の警告を出さない
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """集約統計を取得"""
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.call_count,
+            "coalesced": self.coalesced_count,
+        }
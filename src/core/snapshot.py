@@ -0,0 +1,267 @@
+"""メッセージのローカルスナップショット
+
+Firestoreの messages コレクション（OCRテキストを含む）を MessageTable の列ごとに
+1つのファイルへ保存し、再インデックスやチャンク分割の実験をFirestoreに接続せずに
+行えるようにする。
+
+ファイル形式:
+    MAGIC（8バイト） + ヘッダー長（uint64 LE） + ヘッダー（JSON）
+    + 列データ（各列は _ALIGNMENT バイト境界から配置）
+
+- IDや日時などの固定長の列は無圧縮で保存し、読み込み時はファイルをメモリマップして
+  コピーせずに参照する
+- 本文・OCRテキスト等の文字列（*.data）と文字列プールはzlibで圧縮する
+  （compress=False の場合は全列を無圧縮で保存し、全列をメモリマップする）
+- 差分更新は保存済みの最新の同期日時（synced_at）以降に保存されたメッセージを
+  synced_at の範囲で取得し、スナップショットにないものを追記する。投稿時刻やIDでは
+  なく同期日時で取得するため、再開・再取得で後から保存された古いメッセージも含まれる。
+  保存済みメッセージの更新（後から付いたOCRテキスト等）は反映されないため、
+  必要に応じて全件エクスポートし直す
+"""
+
+import json
+import logging
+import mmap
+import os
+import sys
+import zlib
+from array import array
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.core.config import settings
+from src.core.message_table import MessageTable, StringPool, TextColumn
+from src.core.models import Message
+
+if TYPE_CHECKING:
+    from src.core.firestore import FirestoreClient
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DSSNAP\x00\x01"
+FORMAT_VERSION = 1
+
+# 列データの配置境界（int64の列を np.frombuffer 等でそのまま参照できるように揃える）
+_ALIGNMENT = 64
+
+# 差分更新の取得範囲を同期日時より前に広げる幅（同期ジョブはメッセージの synced_at を
+# 記録してからまとめて書き込むため、記録順と書き込み順が前後する）
+SYNC_WRITE_LAG = timedelta(minutes=10)
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _columns(table: MessageTable) -> Iterator[tuple[str, str, memoryview]]:
+    """(列名, 型コード, バイト列) を保存順に返す"""
+    for name in table.ARRAY_COLUMNS:
+        column = getattr(table, name)
+        # メモリマップから読み込んだテーブルの列は memoryview
+        typecode = column.typecode if isinstance(column, array) else column.format
+        yield name, typecode, memoryview(column).cast("B")
+    for name in table.BYTE_COLUMNS:
+        yield name, "B", memoryview(getattr(table, name)).cast("B")
+
+    pool = TextColumn()
+    for value in table.strings.values:
+        pool.append(value)
+    for name, column in [("strings", pool)] + [(n, getattr(table, n)) for n in table.TEXT_COLUMNS]:
+        yield f"{name}.data", "B", memoryview(column.data).cast("B")
+        yield f"{name}.offsets", "q", memoryview(column.offsets).cast("B")
+        if name != "strings":
+            yield f"{name}.nulls", "B", memoryview(column.nulls).cast("B")
+
+
+def save_snapshot(table: MessageTable, path: str | Path, compress: bool = True) -> int:
+    """テーブルをスナップショットファイルに保存（一時ファイルに書いてから置き換える）
+
+    Args:
+        compress: 文字列の列をzlibで圧縮する
+
+    Returns:
+        ファイルサイズ（バイト）
+    """
+    path = Path(path)
+    specs: dict[str, dict] = {}
+    buffers: list[bytes | memoryview] = []
+    offset = 0
+    for name, typecode, data in _columns(table):
+        compression = None
+        raw_length = len(data)
+        if compress and name.endswith(".data"):
+            data = zlib.compress(data)
+            compression = "zlib"
+        offset = _aligned(offset)
+        specs[name] = {
+            "typecode": typecode,
+            "offset": offset,
+            "length": len(data),
+            "raw_length": raw_length,
+            "compression": compression,
+        }
+        buffers.append(data)
+        offset += len(data)
+
+    last_synced_at = table.last_synced_at()
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "rows": len(table),
+        # 差分更新の開始位置
+        "last_synced_at": last_synced_at.isoformat() if last_synced_at else None,
+        "created_at": datetime.utcnow().isoformat(),
+        "columns": specs,
+    }).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        data_start = _aligned(f.tell())
+        for spec, data in zip(specs.values(), buffers):
+            f.write(b"\x00" * (data_start + spec["offset"] - f.tell()))
+            f.write(data)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def _read_header(view: memoryview | bytes) -> tuple[dict, int]:
+    """ヘッダーと列データの開始位置を読み込む"""
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("スナップショットファイルではありません")
+    header_length = int.from_bytes(view[len(MAGIC):len(MAGIC) + 8], "little")
+    header_start = len(MAGIC) + 8
+    header = json.loads(bytes(view[header_start:header_start + header_length]))
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"未対応のスナップショット形式です: version={header['version']}")
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"バイトオーダーが異なるスナップショットです: {header['byteorder']}")
+    return header, _aligned(header_start + header_length)
+
+
+def read_snapshot_info(path: str | Path) -> dict:
+    """スナップショットのヘッダー（件数・最新の同期日時等）を読み込む"""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + 8)
+        header_length = int.from_bytes(head[len(MAGIC):], "little")
+        header, _ = _read_header(head + f.read(header_length))
+    return header
+
+
+def load_snapshot(path: str | Path, use_mmap: bool = True) -> MessageTable:
+    """スナップショットを MessageTable として読み込む
+
+    Args:
+        use_mmap: ファイルをメモリマップし、無圧縮の列をコピーせずに参照する。
+            この場合、テーブルは読み取り専用（append/extend 不可）になる。
+            Falseの場合は全列をメモリに読み込み、追記できるテーブルを返す
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            # 列の memoryview がマップを参照し続けるため、ファイルを閉じても有効
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            view = memoryview(f.read())
+    header, data_start = _read_header(view)
+
+    def column(name: str):
+        spec = header["columns"][name]
+        start = data_start + spec["offset"]
+        data = view[start:start + spec["length"]]
+        if spec["compression"] == "zlib":
+            data = memoryview(zlib.decompress(data))
+        elif spec["compression"] is not None:
+            raise ValueError(f"未対応の圧縮形式です: {spec['compression']}")
+        if use_mmap:
+            return data.cast(spec["typecode"])
+        if spec["typecode"] == "B":
+            return bytearray(data)
+        return array(spec["typecode"], data.tobytes())
+
+    table = MessageTable()
+    for name in table.ARRAY_COLUMNS + table.BYTE_COLUMNS:
+        setattr(table, name, column(name))
+    for name in table.TEXT_COLUMNS:
+        text = getattr(table, name)
+        text.data = column(f"{name}.data")
+        text.offsets = column(f"{name}.offsets")
+        text.nulls = column(f"{name}.nulls")
+
+    pool = TextColumn()
+    pool.data = column("strings.data")
+    pool.offsets = column("strings.offsets")
+    pool.nulls = bytes(len(pool.offsets) - 1)
+    table.strings = StringPool(pool.get(i) for i in range(len(pool)))
+
+    if len(table) != header["rows"]:
+        raise ValueError(f"スナップショットの件数が一致しません: {len(table)} != {header['rows']}")
+    return table
+
+
+def messages_by_channel(table: MessageTable) -> Iterator[Message]:
+    """チャンネル順・時間順にメッセージを返す（FirestoreClient.stream_messages と同じ順序）"""
+    channel_ids = table.channel_ids
+    timestamps = table.timestamps
+    order = sorted(range(len(table)), key=lambda i: (channel_ids[i], timestamps[i]))
+    return (table.get(i) for i in order)
+
+
+async def export_snapshot(
+    client: "FirestoreClient",
+    path: str | Path = settings.snapshot_path,
+    compress: bool = True,
+) -> MessageTable:
+    """Firestoreの全メッセージをスナップショットに保存"""
+    table = MessageTable()
+    async for msg in client.stream_messages():
+        table.append(msg)
+        if len(table) % 10_000 == 0:
+            logger.info(f"  {len(table)}件取得")
+    size = save_snapshot(table, path, compress=compress)
+    logger.info(f"スナップショット保存: {path} ({len(table)}件, {size / 2**20:.1f} MiB)")
+    return table
+
+
+async def refresh_snapshot(
+    client: "FirestoreClient",
+    path: str | Path = settings.snapshot_path,
+    compress: bool = True,
+) -> tuple[MessageTable, int]:
+    """前回以降に同期ジョブで保存されたメッセージをスナップショットに追記
+
+    ヘッダーに記録した最新の同期日時から SYNC_WRITE_LAG だけ遡った時刻以降に
+    保存されたメッセージを synced_at の範囲で取得し、スナップショットにないものを
+    追記する（取得範囲が重なった保存済みのメッセージはIDで除く）。
+    スナップショットがない場合・同期日時の記録がない場合は全件エクスポートする。
+
+    Returns:
+        (更新後のテーブル, 追加したメッセージ数)
+    """
+    if not Path(path).exists():
+        table = await export_snapshot(client, path, compress=compress)
+        return table, len(table)
+
+    last_synced_at = read_snapshot_info(path).get("last_synced_at")
+    if last_synced_at is None:
+        table = await export_snapshot(client, path, compress=compress)
+        return table, len(table)
+
+    table = load_snapshot(path, use_mmap=False)
+    saved_ids = set(table.message_ids)
+    since = datetime.fromisoformat(last_synced_at) - SYNC_WRITE_LAG
+    added = 0
+    async for msg in client.stream_messages_synced_since(since):
+        message_id = int(msg.message_id)
+        if message_id not in saved_ids:
+            saved_ids.add(message_id)
+            table.append(msg)
+            added += 1
+    if added:
+        size = save_snapshot(table, path, compress=compress)
+        logger.info(f"スナップショット更新: {path} (+{added}件, {size / 2**20:.1f} MiB)")
+    return table, added
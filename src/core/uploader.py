@@ -0,0 +1,140 @@
+"""File Search Store 並行アップロードエンジン
+
+アップロード数をセマフォで制限しつつ並行に実行し、
+インデックス処理中のオペレーションは1つのポーリングループでまとめて確認する。
+"""
+
+import asyncio
+import io
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from src.core.config import settings
+
+if TYPE_CHECKING:
+    from google import genai
+
+logger = logging.getLogger(__name__)
+
+
+class FileSearchUploader:
+    """File Search Storeへの並行アップロード"""
+
+    def __init__(
+        self,
+        client: "genai.Client",
+        concurrency: int = settings.gemini_upload_concurrency,
+        poll_interval_seconds: float = settings.gemini_poll_interval_seconds,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.poll_interval_seconds = poll_interval_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # オペレーション名 → (最新のオペレーション, 完了待ちFuture)
+        self._pending: dict[str, tuple[object, asyncio.Future]] = {}
+        self._poller: asyncio.Task | None = None
+        self._started_at: float | None = None
+        self.in_flight = 0
+        self.completed_count = 0
+        self.failed_count = 0
+
+    async def upload(self, store_name: str, display_name: str, content: str) -> str | None:
+        """テキストをアップロードし、インデックス完了まで待機
+
+        Returns:
+            ストア内のドキュメント名（取得できない場合はdisplay_name）、失敗時はNone
+        """
+        async with self._semaphore:
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            self.in_flight += 1
+            try:
+                operation = await self.client.aio.file_search_stores.upload_to_file_search_store(
+                    file=io.BytesIO(content.encode("utf-8")),
+                    file_search_store_name=store_name,
+                    config={
+                        "display_name": display_name,
+                        "mime_type": "text/plain",
+                    },
+                )
+
+                # 完了を待機（ポーリングは全アップロードで共有）
+                if not operation.done:
+                    operation = await self._wait(operation)
+
+                if operation.error:
+                    raise RuntimeError(operation.error)
+
+                self.completed_count += 1
+                if operation.response and operation.response.document_name:
+                    return operation.response.document_name
+                return display_name
+
+            except Exception as e:
+                logger.error(f"アップロード失敗: {display_name} - {e}")
+                self.failed_count += 1
+                return None
+            finally:
+                self.in_flight -= 1
+
+    async def upload_many(
+        self,
+        store_name: str,
+        items: list[tuple[str, str]],
+    ) -> list[str | None]:
+        """複数のテキストを並行アップロード
+
+        Args:
+            store_name: File Search Store名
+            items: (display_name, content) の一覧
+
+        Returns:
+            itemsと同じ順序のドキュメント名一覧（失敗はNone）
+        """
+        return await asyncio.gather(*(
+            self.upload(store_name, display_name, content)
+            for display_name, content in items
+        ))
+
+    def stats(self) -> dict:
+        """アップロード統計を取得"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+            "in_flight": self.in_flight,
+            "pending_operations": len(self._pending),
+            "docs_per_second": round(self.completed_count / elapsed, 2) if elapsed else 0.0,
+        }
+
+    async def _wait(self, operation):
+        """オペレーションを待機キューに登録し、完了まで待つ"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[operation.name] = (operation, future)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_loop())
+        return await future
+
+    async def _poll_loop(self) -> None:
+        """待機中の全オペレーションをまとめてポーリング"""
+        while self._pending:
+            await asyncio.sleep(self.poll_interval_seconds)
+
+            items = list(self._pending.items())
+            results = await asyncio.gather(
+                *(self.client.aio.operations.get(operation) for _, (operation, _) in items),
+                return_exceptions=True,
+            )
+
+            for (name, (_, future)), result in zip(items, results):
+                if isinstance(result, Exception):
+                    del self._pending[name]
+                    if not future.done():
+                        future.set_exception(result)
+                elif result.done:
+                    del self._pending[name]
+                    if not future.done():
+                        future.set_result(result)
+                else:
+                    self._pending[name] = (result, future)
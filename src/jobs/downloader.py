@@ -0,0 +1,167 @@
+"""添付ファイルダウンローダー
+
+同期ジョブ全体で1つのHTTPセッション（コネクションプール）を共有し、
+添付ファイルをチャンク単位で一時ファイルへストリーミング保存する。
+保存と同時にSHA-256を計算するため、本文をメモリに保持しない。
+"""
+
+import asyncio
+import hashlib
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 読み込みのチャンクサイズ
+CHUNK_SIZE = 64 * 1024
+
+# 再試行するHTTPステータス
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _RetryableError(Exception):
+    """再試行可能なダウンロード失敗"""
+
+
+@dataclass
+class DownloadedFile:
+    """ダウンロード済みの一時ファイル"""
+
+    path: Path
+    sha256: str
+    size: int
+
+    def cleanup(self) -> None:
+        """一時ファイルを削除"""
+        self.path.unlink(missing_ok=True)
+
+
+class AttachmentDownloader:
+    """共有セッションによるストリーミングダウンロード"""
+
+    def __init__(
+        self,
+        max_bytes: int = settings.download_max_bytes,
+        concurrency_per_host: int = settings.download_concurrency_per_host,
+        max_retries: int = settings.download_max_retries,
+        timeout_seconds: float = 60.0,
+    ):
+        self.max_bytes = max_bytes
+        self.concurrency_per_host = concurrency_per_host
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self._session: aiohttp.ClientSession | None = None
+        self._started_at: float | None = None
+        self.file_count = 0
+        self.byte_count = 0
+        self.failed_count = 0
+        self.too_large_count = 0
+        self.retry_count = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """HTTPセッションを取得（初回に作成）"""
+        if self._session is None or self._session.closed:
+            # CDNホストごとの同時接続数を制限し、接続はキープアライブで再利用
+            connector = aiohttp.TCPConnector(limit_per_host=self.concurrency_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def download(self, url: str, filename: str) -> DownloadedFile | None:
+        """ファイルを一時ファイルへダウンロード
+
+        サイズ上限を超える場合やダウンロードに失敗した場合はNoneを返す。
+        一時ファイルは呼び出し側で DownloadedFile.cleanup() により削除する。
+        """
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                downloaded = await self._download_once(url, filename)
+                if downloaded:
+                    self.file_count += 1
+                    self.byte_count += downloaded.size
+                return downloaded
+
+            except _RetryableError as e:
+                if attempt == self.max_retries:
+                    logger.error(f"ダウンロード失敗: {url} - {e}")
+                    break
+                wait = 2 ** attempt
+                logger.warning(f"ダウンロード再試行 ({attempt + 1}/{self.max_retries}): "
+                               f"{url} - {e}, {wait}秒後")
+                self.retry_count += 1
+                await asyncio.sleep(wait)
+
+            except Exception as e:
+                logger.error(f"ダウンロードエラー: {url} - {e}")
+                break
+
+        self.failed_count += 1
+        return None
+
+    async def _download_once(self, url: str, filename: str) -> DownloadedFile | None:
+        """1回分のダウンロード（再試行すべき失敗は _RetryableError を送出）"""
+        try:
+            async with self._get_session().get(url) as response:
+                if response.status in RETRYABLE_STATUSES:
+                    raise _RetryableError(f"status={response.status}")
+                if response.status != 200:
+                    logger.error(f"ダウンロード失敗: {url}, status={response.status}")
+                    self.failed_count += 1
+                    return None
+
+                if response.content_length and response.content_length > self.max_bytes:
+                    return self._skip_too_large(url, response.content_length)
+
+                suffix = Path(filename).suffix or ".bin"
+                digest = hashlib.sha256()
+                size = 0
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+                    path = Path(f.name)
+                    try:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                path.unlink(missing_ok=True)
+                                return self._skip_too_large(url, size)
+                            digest.update(chunk)
+                            f.write(chunk)
+                    except BaseException:
+                        path.unlink(missing_ok=True)
+                        raise
+
+                return DownloadedFile(path=path, sha256=digest.hexdigest(), size=size)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise _RetryableError(str(e) or type(e).__name__) from e
+
+    def _skip_too_large(self, url: str, size: int) -> None:
+        logger.warning(f"サイズ上限超過のためスキップ: {url}, size={size}, max={self.max_bytes}")
+        self.too_large_count += 1
+        return None
+
+    async def close(self) -> None:
+        """HTTPセッションを閉じる"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict:
+        """ダウンロード統計を取得"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "files": self.file_count,
+            "bytes": self.byte_count,
+            "failed": self.failed_count,
+            "too_large": self.too_large_count,
+            "retries": self.retry_count,
+            "bytes_per_second": round(self.byte_count / elapsed) if elapsed else 0,
+        }
@@ -7,6 +7,9 @@ import sys
 import discord
 
 from src.core.config import settings
+from src.core.firestore import get_firestore_client
+from src.core.models import SyncStatus
+from src.jobs.ocr import get_ocr_processor
 from src.jobs.sync import MessageSyncer
 
 # ロギング設定
@@ -16,11 +19,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 再開対象の同期ステータス（ジョブが強制終了された場合は in_progress のまま残る）
+RESUMABLE_STATUSES = ("in_progress", "failed")
+
+# 同じ sync_id で再開する上限（再開回数 = SyncStatus.resume_count）
+MAX_RESUME_FAILURES = 3
+
+
+async def find_resumable_sync(full_sync: bool = False) -> SyncStatus | None:
+    """中断・失敗した同期を取得
+
+    フル同期を指定した場合は、中断したフル同期のみ再開対象とする。
+    再開が MAX_RESUME_FAILURES 回に達した同期は、失敗・強制終了（in_progress のまま）の
+    どちらで止まった場合も再開せず、新しい同期を開始する。
+    """
+    status = await get_firestore_client().get_last_sync_status()
+    if not status or status.status not in RESUMABLE_STATUSES:
+        return None
+    if full_sync and status.sync_type != "initial":
+        return None
+    if status.resume_count >= MAX_RESUME_FAILURES:
+        logger.warning(
+            f"再開回数が上限に達したため再開しません: sync_id={status.sync_id}, "
+            f"status={status.status}, resumes={status.resume_count}"
+        )
+        return None
+    return status
+
 
 class SyncClient(discord.Client):
     """同期用Discordクライアント"""
 
-    def __init__(self, full_sync: bool = False):
+    def __init__(self, full_sync: bool = False, resume: bool = True):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.messages = True
@@ -28,6 +58,7 @@ class SyncClient(discord.Client):
         super().__init__(intents=intents)
 
         self.full_sync = full_sync
+        self.resume = resume
         self.result = None
 
     async def on_ready(self):
@@ -36,8 +67,15 @@ class SyncClient(discord.Client):
 
         try:
             guild_id = int(settings.discord_guild_id)
+            resume_from = await find_resumable_sync(self.full_sync) if self.resume else None
+            if resume_from:
+                logger.info(
+                    f"中断した同期を再開: sync_id={resume_from.sync_id}, "
+                    f"status={resume_from.status}, type={resume_from.sync_type}"
+                )
+
             syncer = MessageSyncer(self)
-            self.result = await syncer.sync_guild(guild_id, self.full_sync)
+            self.result = await syncer.sync_guild(guild_id, self.full_sync, resume_from)
             logger.info(f"同期結果: {self.result}")
         except Exception as e:
             logger.error(f"同期エラー: {e}")
@@ -46,7 +84,7 @@ class SyncClient(discord.Client):
             await self.close()
 
 
-async def run_sync(full_sync: bool = False) -> dict:
+async def run_sync(full_sync: bool = False, resume: bool = True) -> dict:
     """同期を実行"""
     if not settings.discord_bot_token:
         logger.error("DISCORD_BOT_TOKEN が設定されていません")
@@ -56,13 +94,15 @@ async def run_sync(full_sync: bool = False) -> dict:
         logger.error("DISCORD_GUILD_ID が設定されていません")
         return {"error": "DISCORD_GUILD_ID not set"}
 
-    client = SyncClient(full_sync=full_sync)
+    client = SyncClient(full_sync=full_sync, resume=resume)
 
     try:
         await client.start(settings.discord_bot_token)
     except Exception as e:
         logger.error(f"クライアントエラー: {e}")
         return {"error": str(e)}
+    finally:
+        get_ocr_processor().shutdown()
 
     return client.result or {"error": "No result"}
 
@@ -71,13 +111,15 @@ def main():
     """メイン関数"""
     # コマンドライン引数で初回同期を指定
     full_sync = "--full" in sys.argv or "--initial" in sys.argv
+    # 中断した同期があれば再開（--no-resume で新規に開始）
+    resume = "--no-resume" not in sys.argv
 
     if full_sync:
         logger.info("初回フル同期モード")
     else:
         logger.info("差分同期モード")
 
-    result = asyncio.run(run_sync(full_sync))
+    result = asyncio.run(run_sync(full_sync, resume))
     logger.info(f"完了: {result}")
 
     # エラーがあれば終了コード1
@@ -1,42 +1,208 @@
-"""YomiToku OCR処理"""
+"""YomiToku OCR処理
 
+OCRはCPU負荷が高いため、プロセスプールで実行してイベントループをブロックしない。
+各ワーカープロセスは初期化時に自身の DocumentAnalyzer を1つ作成して使い回す。
+PDFはテキストレイヤーを抽出し、テキストのないページのみOCRする（src.jobs.pdf）。
+"""
+
+import asyncio
+import importlib.util
 import logging
-import tempfile
-import aiohttp
+import multiprocessing
+import os
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.core.config import settings
+from src.core.firestore import get_firestore_client
+from src.core.singleflight import SingleFlight
+from src.jobs.downloader import AttachmentDownloader
+from src.jobs.ocr_cache import OCRResultCache
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
 # YomiTokuはオプション依存
-try:
-    from yomitoku import DocumentAnalyzer
-    YOMITOKU_AVAILABLE = True
-except ImportError:
-    YOMITOKU_AVAILABLE = False
+# 読み込み（PyTorch等）が重いため、ここでは存在確認のみ行い、ワーカープロセスでimportする
+YOMITOKU_AVAILABLE = importlib.util.find_spec("yomitoku") is not None
+if not YOMITOKU_AVAILABLE:
     logger.warning("YomiTokuがインストールされていません。画像OCRは無効です。")
 
+# PDFのテキスト抽出はpypdfium2（YomiTokuの依存）を使う
+PDF_AVAILABLE = importlib.util.find_spec("pypdfium2") is not None
+
+# ワーカープロセスごとのDocumentAnalyzer（_init_workerで作成）
+_worker_analyzer = None
+
+
+def available_cpu_count() -> int:
+    """このプロセスが利用できるCPUコア数"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    """ワーカープロセスの初期化（DocumentAnalyzerを作成）"""
+    global _worker_analyzer
+    if not YOMITOKU_AVAILABLE:
+        return  # PDFのテキスト抽出のみ行う
+    try:
+        from yomitoku import DocumentAnalyzer
+
+        # 軽量モデル、CPU推論
+        _worker_analyzer = DocumentAnalyzer(
+            configs={
+                "ocr": {"device": "cpu", "lite": True},
+                "layout": {"device": "cpu"},
+            }
+        )
+        logger.info(f"YomiToku初期化完了（軽量モデル、CPU）: pid={os.getpid()}")
+    except Exception as e:
+        logger.error(f"YomiToku初期化失敗: {e}")
+
+
+def _result_to_text(result) -> str:
+    """解析結果からテキストを取り出す"""
+    if hasattr(result, "text"):
+        return result.text
+    if hasattr(result, "to_text"):
+        return result.to_text()
+
+    # フォールバック: 全テキストブロックを結合
+    text_blocks = []
+    if hasattr(result, "blocks"):
+        for block in result.blocks:
+            if hasattr(block, "text"):
+                text_blocks.append(block.text)
+    return "\n".join(text_blocks)
+
+
+def _run_ocr(image_path: str, preprocess: bool = True) -> tuple[str, float, str | None]:
+    """ワーカープロセスでOCRを実行
+
+    Args:
+        image_path: ダウンロード済みの画像ファイルのパス
+        preprocess: 前処理（縮小・スキップ判定）を行うか
+
+    Returns:
+        (抽出テキスト, 前処理と推論に使ったCPU秒数, スキップ理由)
+    """
+    if _worker_analyzer is None:
+        raise RuntimeError("YomiTokuが初期化されていません")
+
+    start = time.process_time()
+    if not preprocess:
+        text = _result_to_text(_worker_analyzer(image_path))
+        return text, time.process_time() - start, None
+
+    from src.jobs.preprocess import preprocess_image
+
+    prepared = preprocess_image(image_path)
+    if prepared.skipped:
+        return "", time.process_time() - start, prepared.skip_reason
+
+    return _analyze(prepared.image), time.process_time() - start, None
+
+
+def _analyze(image: "Image.Image") -> str:
+    """前処理済みのRGB画像をOCR"""
+    import numpy as np
+
+    # YomiTokuはOpenCVと同じBGR配列を受け取る
+    return _result_to_text(_worker_analyzer(np.asarray(image)[:, :, ::-1]))
+
+
+def _ocr_page_image(image: "Image.Image") -> str:
+    """PDFのページ画像をOCR（白紙のページは省略）"""
+    from src.jobs.preprocess import prepare_image
+
+    prepared = prepare_image(image)
+    if prepared.skipped:
+        return ""
+    return _analyze(prepared.image)
+
+
+def _pdf_page_count(pdf_path: str) -> int:
+    """ワーカープロセスでPDFのページ数を取得"""
+    from src.jobs.pdf import page_count
+
+    return page_count(pdf_path)
+
+
+def _run_pdf_page(pdf_path: str, index: int) -> tuple[str, float, str]:
+    """ワーカープロセスでPDFの1ページを処理
+
+    Returns:
+        (抽出テキスト, CPU秒数, 抽出方法 text/ocr/empty)
+    """
+    from src.jobs.pdf import extract_page
+
+    start = time.process_time()
+    ocr = _ocr_page_image if _worker_analyzer is not None else None
+    text, method = extract_page(pdf_path, index, ocr=ocr)
+    return text, time.process_time() - start, method
+
 
 class OCRProcessor:
     """OCR処理クラス"""
 
-    def __init__(self):
-        self.analyzer = None
-        if YOMITOKU_AVAILABLE:
-            try:
-                # 軽量モデル、CPU推論
-                self.analyzer = DocumentAnalyzer(
-                    configs={
-                        "ocr": {"device": "cpu", "lite": True},
-                        "layout": {"device": "cpu"},
-                    }
-                )
-                logger.info("YomiToku初期化完了（軽量モデル、CPU）")
-            except Exception as e:
-                logger.error(f"YomiToku初期化失敗: {e}")
+    def __init__(self, max_workers: int = settings.ocr_workers):
+        # 0は利用可能なコア数
+        self.max_workers = max_workers or available_cpu_count()
+        self._executor: ProcessPoolExecutor | None = None
+        self.cache = OCRResultCache(
+            remote=get_firestore_client() if settings.ocr_cache_firestore else None,
+        )
+        # 同じ画像が同時に処理される場合は推論を1回にまとめる
+        self._inflight = SingleFlight()
+        self.ocr_count = 0
+        self.cpu_seconds = 0.0
+        # 前処理でOCRを省略した画像数（理由ごと）
+        self.skip_counts: Counter[str] = Counter()
+        # 処理したPDFのページ数（抽出方法ごと）
+        self.pdf_page_counts: Counter[str] = Counter()
 
     def is_available(self) -> bool:
         """OCRが利用可能か"""
-        return self.analyzer is not None
+        return YOMITOKU_AVAILABLE
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """ワーカープールを取得（初回に起動）"""
+        if self._executor is None:
+            # fork は親プロセスのスレッド（gRPC等）と相性が悪いため spawn で起動
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            logger.info(f"OCRワーカープール起動: workers={self.max_workers}")
+        return self._executor
+
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.cache.close()
+
+    def stats(self) -> dict:
+        """OCR統計（実行数・CPU秒数・前処理でのスキップ数・PDFページ数・キャッシュ）を取得"""
+        return {
+            "processed": self.ocr_count,
+            "cpu_seconds": round(self.cpu_seconds, 1),
+            "skipped": dict(self.skip_counts),
+            "pdf_pages": dict(self.pdf_page_counts),
+            "cache": self.cache.stats(),
+        }
 
     def is_image(self, content_type: str) -> bool:
         """画像ファイルか判定"""
@@ -49,82 +215,167 @@ class OCRProcessor:
         ]
         return content_type.lower() in image_types
 
-    async def download_file(self, url: str) -> bytes | None:
-        """ファイルをダウンロード"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    logger.error(f"ダウンロード失敗: {url}, status={response.status}")
-                    return None
-        except Exception as e:
-            logger.error(f"ダウンロードエラー: {url} - {e}")
-            return None
+    def is_pdf(self, content_type: str) -> bool:
+        """PDFファイルか判定"""
+        return content_type.lower() == "application/pdf"
+
+    def can_extract(self, content_type: str) -> bool:
+        """テキストを抽出できる添付ファイルか（画像はYomiToku、PDFはpypdfium2が必要）"""
+        if self.is_image(content_type):
+            return self.is_available()
+        if self.is_pdf(content_type):
+            return PDF_AVAILABLE
+        return False
+
+    async def extract_text(self, image_path: str | Path, filename: str) -> str | None:
+        """画像ファイルからテキストを抽出"""
+        result = await self._run_in_pool(image_path, filename)
+        return result[0] if result else None
+
+    async def _run_in_pool(self, image_path: str | Path, filename: str) -> tuple[str, float] | None:
+        """ワーカープールでOCRを実行
 
-    async def extract_text(self, image_data: bytes, filename: str) -> str | None:
-        """画像からテキストを抽出"""
+        Returns:
+            (抽出テキスト, CPU秒数)、失敗時はNone
+        """
         if not self.is_available():
             logger.warning("OCRが利用不可")
             return None
 
         try:
-            # 一時ファイルに保存
-            suffix = Path(filename).suffix or ".png"
-            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
-                f.write(image_data)
-                temp_path = f.name
-
-            # OCR実行
-            result = self.analyzer(temp_path)
-
-            # テキスト抽出
-            if hasattr(result, "text"):
-                text = result.text
-            elif hasattr(result, "to_text"):
-                text = result.to_text()
-            else:
-                # フォールバック: 全テキストブロックを結合
-                text_blocks = []
-                if hasattr(result, "blocks"):
-                    for block in result.blocks:
-                        if hasattr(block, "text"):
-                            text_blocks.append(block.text)
-                text = "\n".join(text_blocks)
-
-            # 一時ファイル削除
-            Path(temp_path).unlink(missing_ok=True)
-
-            if text:
+            # ワーカープロセスで実行し、待機中も同期処理を進める
+            loop = asyncio.get_running_loop()
+            text, cpu_seconds, skip_reason = await loop.run_in_executor(
+                self._get_executor(), _run_ocr, str(image_path), settings.ocr_preprocess_enabled
+            )
+
+            self.ocr_count += 1
+            self.cpu_seconds += cpu_seconds
+            if skip_reason:
+                logger.debug(f"OCRをスキップ: {filename} ({skip_reason})")
+                self.skip_counts[skip_reason] += 1
+            elif text:
                 logger.info(f"OCR完了: {filename}, 文字数={len(text)}")
-            return text
+            return text, cpu_seconds
 
+        except BrokenProcessPool as e:
+            # ワーカーが異常終了した場合は次回呼び出しでプールを作り直す
+            logger.error(f"OCRワーカー異常終了: {filename} - {e}")
+            self._executor = None
+            return None
         except Exception as e:
             logger.error(f"OCRエラー: {filename} - {e}")
             return None
 
+    async def _run_pdf(self, pdf_path: str | Path, filename: str) -> tuple[str, float] | None:
+        """PDFの各ページをワーカープールで並行して処理
+
+        先頭から pdf_max_pages ページまでを処理し、ページ順に結合する。
+
+        Returns:
+            (抽出テキスト, CPU秒数)、失敗時はNone
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            total = await loop.run_in_executor(executor, _pdf_page_count, str(pdf_path))
+            if total > settings.pdf_max_pages:
+                logger.info(f"ページ数が上限を超えるため先頭のみ処理: {filename}, "
+                            f"pages={total}, max={settings.pdf_max_pages}")
+            pages = await asyncio.gather(*(
+                loop.run_in_executor(executor, _run_pdf_page, str(pdf_path), index)
+                for index in range(min(total, settings.pdf_max_pages))
+            ))
+
+        except BrokenProcessPool as e:
+            logger.error(f"OCRワーカー異常終了: {filename} - {e}")
+            self._executor = None
+            return None
+        except Exception as e:
+            logger.error(f"PDF処理エラー: {filename} - {e}")
+            return None
+
+        cpu_seconds = sum(seconds for _, seconds, _ in pages)
+        self.cpu_seconds += cpu_seconds
+        self.pdf_page_counts.update(method for _, _, method in pages)
+        text = "\n\n".join(page_text for page_text, _, _ in pages if page_text)
+        logger.info(f"PDF処理完了: {filename}, ページ数={len(pages)}, 文字数={len(text)}")
+        return text, cpu_seconds
+
     async def process_attachment(
         self,
         url: str,
         filename: str,
         content_type: str,
+        downloader: AttachmentDownloader,
     ) -> str | None:
-        """添付ファイルを処理してテキストを抽出"""
-        if not self.is_image(content_type):
-            logger.debug(f"画像以外はスキップ: {filename} ({content_type})")
-            return None
+        """添付ファイル（画像・PDF）を処理してテキストを抽出
 
-        if not self.is_available():
+        Args:
+            downloader: 同期ジョブが共有するダウンローダー
+        """
+        if not self.can_extract(content_type):
+            logger.debug(f"テキスト抽出の対象外: {filename} ({content_type})")
             return None
 
-        # ダウンロード
-        image_data = await self.download_file(url)
-        if not image_data:
+        # ダウンロード（一時ファイルへストリーミング保存）
+        downloaded = await downloader.download(url, filename)
+        if not downloaded:
             return None
 
-        # OCR
-        return await self.extract_text(image_data, filename)
+        run = self._run_pdf if self.is_pdf(content_type) else self._run_in_pool
+        sha256 = downloaded.sha256
+
+        async def extract() -> str | None:
+            # 共有する抽出処理が一時ファイルを所有し、完了・失敗・キャンセル時に削除する
+            # （先に呼んだ側がキャンセルされても、同じ画像を待つ側の処理中に削除しない）
+            try:
+                return await self._extract_text_cached(sha256, downloaded.path, filename, run)
+            finally:
+                downloaded.cleanup()
+
+        shared = False
+
+        def start() -> Awaitable[str | None]:
+            nonlocal shared
+            shared = True
+            return extract()
+
+        try:
+            # OCR（内容のハッシュでキャッシュ）
+            return await self._inflight.do(sha256, start)
+        finally:
+            # 実行中の同じ画像の結果を待った場合、自分の一時ファイルは使わない
+            if not shared:
+                downloaded.cleanup()
+
+    async def _extract_text_cached(
+        self,
+        sha256: str,
+        path: Path,
+        filename: str,
+        run: Callable[[Path, str], Awaitable[tuple[str, float] | None]],
+    ) -> str | None:
+        """キャッシュを確認し、なければ抽出を実行して保存
+
+        Args:
+            run: 抽出処理（画像は _run_in_pool、PDFは _run_pdf）
+        """
+        cached = await self.cache.get(sha256)
+        if cached is not None:
+            logger.debug(f"OCRキャッシュヒット: {filename}")
+            return cached
+
+        result = await run(path, filename)
+        if result is None:
+            return None
+        text, cpu_seconds = result
+        await self.cache.put(sha256, text, cpu_seconds)
+        return text
 
 
-# シングルトンインスタンス
-ocr_processor = OCRProcessor()
+# シングルトンインスタンス（import時ではなく初回利用時に生成）
+@cache
+def get_ocr_processor() -> OCRProcessor:
+    """OCR処理を取得（初回呼び出し時に生成）"""
+    return OCRProcessor()
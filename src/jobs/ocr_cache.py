@@ -0,0 +1,120 @@
+"""OCR結果キャッシュ
+
+ダウンロードした画像のSHA-256（AttachmentDownloader がダウンロード中に計算）を
+キーにOCR結果を保存し、同じ画像（別チャンネルへの再投稿、フル再同期）で推論を省略する。
+ローカルのSQLiteと、任意でFirestoreの共有コレクションに保存する。
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.core.config import settings
+
+if TYPE_CHECKING:
+    from src.core.firestore import FirestoreClient
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """内容アドレス方式のOCR結果キャッシュ
+
+    結果が空（文字なし）の画像もキャッシュする。
+    """
+
+    def __init__(
+        self,
+        path: str = settings.ocr_cache_path,
+        remote: "FirestoreClient | None" = None,
+    ):
+        self.path = path
+        self.remote = remote
+        self._db: sqlite3.Connection | None = None
+        self.local_hit_count = 0
+        self.remote_hit_count = 0
+        self.miss_count = 0
+        # キャッシュヒットで省略した推論のCPU秒数
+        self.cpu_seconds_saved = 0.0
+
+    def _connect(self) -> sqlite3.Connection | None:
+        """SQLiteに接続（初回にテーブルを作成）"""
+        if self._db is None and self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                " sha256 TEXT PRIMARY KEY,"
+                " text TEXT NOT NULL,"
+                " cpu_seconds REAL NOT NULL,"
+                " created_at TEXT NOT NULL)"
+            )
+        return self._db
+
+    async def get(self, sha256: str) -> str | None:
+        """キャッシュ済みのOCR結果を取得（なければNone）"""
+        db = self._connect()
+        if db is not None:
+            row = db.execute(
+                "SELECT text, cpu_seconds FROM ocr_results WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row:
+                self.local_hit_count += 1
+                self.cpu_seconds_saved += row[1]
+                return row[0]
+
+        if self.remote:
+            try:
+                cached = await self.remote.get_ocr_result(sha256)
+            except Exception as e:
+                logger.warning(f"OCRキャッシュ取得エラー: {sha256} - {e}")
+                cached = None
+            if cached:
+                text, cpu_seconds = cached
+                self.remote_hit_count += 1
+                self.cpu_seconds_saved += cpu_seconds
+                self._put_local(sha256, text, cpu_seconds)
+                return text
+
+        self.miss_count += 1
+        return None
+
+    async def put(self, sha256: str, text: str, cpu_seconds: float) -> None:
+        """OCR結果を保存"""
+        self._put_local(sha256, text, cpu_seconds)
+        if self.remote:
+            try:
+                await self.remote.save_ocr_result(sha256, text, cpu_seconds)
+            except Exception as e:
+                logger.warning(f"OCRキャッシュ保存エラー: {sha256} - {e}")
+
+    def _put_local(self, sha256: str, text: str, cpu_seconds: float) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?, ?)",
+                (sha256, text, cpu_seconds, datetime.utcnow().isoformat()),
+            )
+
+    def close(self) -> None:
+        """SQLite接続を閉じる"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        """キャッシュ統計を取得"""
+        hits = self.local_hit_count + self.remote_hit_count
+        total = hits + self.miss_count
+        return {
+            "hits": hits,
+            "local_hits": self.local_hit_count,
+            "remote_hits": self.remote_hit_count,
+            "misses": self.miss_count,
+            "hit_ratio": round(hits / total, 3) if total else 0.0,
+            "cpu_seconds_saved": round(self.cpu_seconds_saved, 1),
+        }
@@ -0,0 +1,69 @@
+"""PDFのテキスト抽出
+
+PDFに埋め込まれたテキストレイヤーをページ単位で取り出す。
+テキストのないページ（スキャンした書類等）のみ画像化してOCRする。
+OCRワーカープロセス内で1ページずつ実行し、ページ間は並行して処理する。
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pypdfium2 as pdfium
+from PIL import Image
+
+from src.core.config import settings
+
+
+def page_count(path: str | Path) -> int:
+    """PDFのページ数"""
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_page(
+    path: str | Path,
+    index: int,
+    ocr: Callable[[Image.Image], str] | None = None,
+    min_chars: int = settings.pdf_min_page_chars,
+    render_dpi: int = settings.ocr_target_dpi,
+) -> tuple[str, str]:
+    """1ページのテキストを抽出
+
+    ページごとに文書を開き直すため、ページ数によらずメモリ使用量は一定。
+
+    Args:
+        path: PDFファイルのパス
+        index: ページ番号（0始まり）
+        ocr: 画像からテキストを抽出する関数（Noneの場合はOCRしない）
+        min_chars: テキストレイヤーの文字数（空白除く）がこれ未満のページはOCRする
+        render_dpi: OCR用に画像化する解像度
+
+    Returns:
+        (テキスト, 抽出方法) 抽出方法は text, ocr, empty のいずれか
+    """
+    pdf = pdfium.PdfDocument(path)
+    try:
+        page = pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range().strip()
+            finally:
+                textpage.close()
+
+            if len("".join(text.split())) >= min_chars or ocr is None:
+                return text, "text" if text else "empty"
+
+            image = page.render(scale=render_dpi / 72).to_pil().convert("RGB")
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+    ocr_text = ocr(image).strip()
+    if ocr_text:
+        return ocr_text, "ocr"
+    return text, "text" if text else "empty"
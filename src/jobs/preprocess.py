@@ -0,0 +1,115 @@
+"""OCR前の画像前処理
+
+OCRワーカープロセス内で実行し、推論にかかるCPU時間を減らす。
+- 高解像度の画像は目標DPI（DPI情報がなければ長辺の上限）まで縮小する
+- アニメーションGIF等は先頭フレームのみ使う
+- 小さすぎる画像・情報量（エントロピー）の低い画像はOCRしない
+- エッジの少ない画像（写真やイラスト等、文字を含む可能性が低い）はOCRしない
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageFilter
+
+from src.core.config import settings
+
+# 文字らしさの判定に使う縮小画像の長辺
+_ANALYSIS_EDGE = 256
+
+# エッジとみなす輝度差（FIND_EDGES後の画素値）
+_EDGE_THRESHOLD = 48
+
+
+@dataclass
+class PreprocessedImage:
+    """前処理の結果"""
+
+    image: Image.Image | None
+    original_size: tuple[int, int]
+    skip_reason: str | None = None  # too_small, low_entropy, no_text
+
+    @property
+    def skipped(self) -> bool:
+        return self.skip_reason is not None
+
+
+def edge_density(gray: Image.Image) -> float:
+    """エッジ画素の割合（文字を含む画像ほど高い）"""
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    histogram = edges.histogram()
+    total = sum(histogram)
+    return sum(histogram[_EDGE_THRESHOLD:]) / total if total else 0.0
+
+
+def preprocess_image(
+    path: str | Path,
+    target_dpi: int = settings.ocr_target_dpi,
+    max_edge: int = settings.ocr_max_image_edge,
+    min_edge: int = settings.ocr_min_image_edge,
+    min_entropy: float = settings.ocr_min_entropy,
+    min_edge_density: float = settings.ocr_min_edge_density,
+) -> PreprocessedImage:
+    """画像を読み込み、OCR向けに前処理する
+
+    Args:
+        path: 画像ファイルのパス
+        target_dpi: DPI情報がある画像の縮小先DPI
+        max_edge: 長辺の上限（ピクセル）
+        min_edge: これより短辺が小さい画像はスキップ
+        min_entropy: これより輝度エントロピーが低い画像はスキップ（ビット）
+        min_edge_density: これよりエッジ画素の割合が低い画像はスキップ
+
+    Returns:
+        前処理済みのRGB画像（スキップ時は image=None と理由）
+    """
+    with Image.open(path) as source:
+        # アニメーション画像は先頭フレームのみ
+        source.seek(0)
+        dpi = source.info.get("dpi")
+        image = source.convert("RGB")
+
+    scale = target_dpi / dpi[0] if dpi and dpi[0] else 1.0
+    return prepare_image(
+        image,
+        scale=scale,
+        max_edge=max_edge,
+        min_edge=min_edge,
+        min_entropy=min_entropy,
+        min_edge_density=min_edge_density,
+    )
+
+
+def prepare_image(
+    image: Image.Image,
+    scale: float = 1.0,
+    max_edge: int = settings.ocr_max_image_edge,
+    min_edge: int = settings.ocr_min_image_edge,
+    min_entropy: float = settings.ocr_min_entropy,
+    min_edge_density: float = settings.ocr_min_edge_density,
+) -> PreprocessedImage:
+    """読み込み済みのRGB画像をOCR向けに前処理する（PDFのページ画像等）
+
+    Args:
+        image: RGB画像
+        scale: 縮小率の上限（1.0以上は縮小しない）
+    """
+    original_size = image.size
+    if min(original_size) < min_edge:
+        return PreprocessedImage(None, original_size, "too_small")
+
+    # 判定は縮小したグレースケール画像で行う
+    gray = image.convert("L")
+    gray.thumbnail((_ANALYSIS_EDGE, _ANALYSIS_EDGE))
+    if gray.entropy() < min_entropy:
+        return PreprocessedImage(None, original_size, "low_entropy")
+    if edge_density(gray) < min_edge_density:
+        return PreprocessedImage(None, original_size, "no_text")
+
+    # 縮小（拡大はしない）
+    scale = min(1.0, scale, max_edge / max(original_size))
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    return PreprocessedImage(image, original_size)
@@ -0,0 +1,125 @@
+"""チャンネル同期スケジューラ
+
+複数チャンネルを優先度順にワーカーで並行同期する。
+Discord APIへのリクエストはトークンバケットで全体のレートを制限する。
+
+レート制限の分担:
+- グローバル制限（Bot全体で毎秒50リクエスト）: RateLimiter で上限以下に抑える
+- ルート別制限（チャンネルごとのメッセージ履歴取得）: 1チャンネルを同時に
+  1ワーカーしか処理しないため、バケットごとのリクエストは直列になる。
+  残数ヘッダーと429の待機はdiscord.pyのHTTPクライアントが処理する
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Generic, TypeVar
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """トークンバケット方式のレート制限"""
+
+    def __init__(self, rate_per_second: float, burst: float | None = None):
+        self.rate_per_second = rate_per_second
+        self.capacity = burst if burst is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired_count = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.rate_per_second,
+        )
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """トークンを1つ取得（不足していれば補充まで待機）"""
+        if self.rate_per_second <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate_per_second
+                await asyncio.sleep(wait)
+                self.wait_seconds += wait
+                self._refill()
+            self._tokens -= 1
+            self.acquired_count += 1
+
+
+class ChannelScheduler(Generic[T]):
+    """優先度順にチャンネルをワーカーへ割り当てる"""
+
+    def __init__(self, concurrency: int = settings.sync_concurrency):
+        self.concurrency = max(1, concurrency)
+        self.completed_count = 0
+        self.wall_seconds = 0.0
+        self.busiest_seconds = 0.0
+        self.busiest_channel: str | None = None
+
+    async def run(
+        self,
+        items: Iterable[tuple[str, T]],
+        handler: Callable[[T], Awaitable[None]],
+    ) -> None:
+        """全アイテムを処理
+
+        Args:
+            items: (表示名, アイテム) の一覧（先頭から優先して処理）
+            handler: 1アイテムの処理（例外は呼び出し側で処理する）
+        """
+        queue: asyncio.Queue[tuple[str, T]] = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        start = time.monotonic()
+        workers = [
+            asyncio.create_task(self._worker(queue, handler))
+            for _ in range(min(self.concurrency, queue.qsize()))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.wall_seconds += time.monotonic() - start
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue[tuple[str, T]],
+        handler: Callable[[T], Awaitable[None]],
+    ) -> None:
+        while not queue.empty():
+            name, item = queue.get_nowait()
+            start = time.monotonic()
+            try:
+                await handler(item)
+            except Exception as e:
+                logger.error(f"同期ワーカーエラー: {name} - {e}")
+            elapsed = time.monotonic() - start
+            self.completed_count += 1
+            if elapsed > self.busiest_seconds:
+                self.busiest_seconds = elapsed
+                self.busiest_channel = name
+
+    def stats(self) -> dict:
+        """スケジューラ統計を取得"""
+        return {
+            "workers": self.concurrency,
+            "channels": self.completed_count,
+            "wall_seconds": round(self.wall_seconds, 2),
+            "busiest_channel": self.busiest_channel,
+            "busiest_channel_seconds": round(self.busiest_seconds, 2),
+        }
@@ -2,16 +2,21 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from uuid import uuid4
 
 import discord
 
+from src.core.chunker import IncrementalChunker
 from src.core.config import settings
-from src.core.firestore import firestore_client
-from src.core.gemini import gemini_client
-from src.core.models import Message, Attachment
-from src.jobs.ocr import ocr_processor
+from src.core.firestore import MessageBatchWriter, get_firestore_client
+from src.core.gemini import get_gemini_client, is_document_name
+from src.core.known_ids import KnownMessageIds
+from src.core.models import ConversationChunk, Message, Attachment, SyncStatus
+from src.jobs.downloader import AttachmentDownloader
+from src.jobs.ocr import get_ocr_processor
+from src.jobs.scheduler import ChannelScheduler, RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -23,18 +28,74 @@ class MessageSyncer:
         self.client = client
         self.processed_count = 0
         self.error_count = 0
+        # 処理（OCR・保存）に失敗したメッセージ数
+        self.failed_message_count = 0
         self.new_count = 0
         self.new_channels: list[str] = []  # 新規検出チャンネル名
+        # チャンネル別のバッファ付き書き込み（書き込みの失敗を同期中のチャンネルに計上する）
+        self._writers: dict[str, MessageBatchWriter] = {}
+        self._started_at = time.monotonic()
+        # 同期済みID集合の判定結果
+        self.known_id_hits = 0
+        self.known_id_misses = 0
+        # 新着がなく履歴取得を省略したチャンネル数
+        self.skipped_channel_count = 0
+        # インデックスした会話チャンク数
+        self.indexed_chunk_count = 0
+        # チャンネル/スレッドごとの末尾チャンク（同期中のチャンネルのみ保持）
+        self.chunker = IncrementalChunker()
+        # インデックス済みの末尾チャンク（チャンネルID → チャンク）
+        self._indexed_open_chunks: dict[str, ConversationChunk | None] = {}
+        # 削除に失敗した置き換え済みのドキュメント（チャンネルID → ドキュメント名）
+        self._stale_documents: dict[str, list[str]] = {}
+        # 再開時: チャンネル別チェックポイントと完了済みチャンネル
+        self._checkpoints: dict[str, int] = {}
+        self._completed_channel_ids: set[str] = set()
+        # 並行同期とDiscord APIのレート制限
+        self.scheduler: ChannelScheduler[discord.TextChannel | discord.Thread] = ChannelScheduler()
+        self.rate_limiter = RateLimiter(settings.discord_requests_per_second)
+        # 添付ファイルのダウンロード（ジョブ全体でコネクションプールを共有）
+        self.downloader = AttachmentDownloader()
+
+    async def sync_guild(
+        self,
+        guild_id: int,
+        full_sync: bool = False,
+        resume_from: SyncStatus | None = None,
+    ) -> dict:
+        """ギルド全体を同期
+
+        Args:
+            guild_id: ギルドID
+            full_sync: 全履歴を同期するか
+            resume_from: 中断した同期のステータス（指定時は完了済みチャンネルを
+                スキップし、途中のチャンネルはチェックポイントから再開する）
+        """
+        if resume_from:
+            sync_id = resume_from.sync_id
+            sync_type = resume_from.sync_type
+            full_sync = sync_type == "initial"
+            self.processed_count = resume_from.processed_count
+            self._checkpoints = {
+                channel_id: int(message_id)
+                for channel_id, message_id in resume_from.channel_checkpoints.items()
+            }
+            self._completed_channel_ids = set(resume_from.completed_channel_ids)
 
-    async def sync_guild(self, guild_id: int, full_sync: bool = False) -> dict:
-        """ギルド全体を同期"""
-        sync_id = str(uuid4())
-        sync_type = "initial" if full_sync else "incremental"
+            logger.info(
+                f"同期再開: guild={guild_id}, type={sync_type}, sync_id={sync_id}, "
+                f"completed_channels={len(self._completed_channel_ids)}, "
+                f"checkpoints={len(self._checkpoints)}"
+            )
+            await get_firestore_client().resume_sync_status(sync_id)
+        else:
+            sync_id = str(uuid4())
+            sync_type = "initial" if full_sync else "incremental"
 
-        logger.info(f"同期開始: guild={guild_id}, type={sync_type}, sync_id={sync_id}")
+            logger.info(f"同期開始: guild={guild_id}, type={sync_type}, sync_id={sync_id}")
 
-        # 同期ステータス作成
-        await firestore_client.create_sync_status(sync_id, sync_type)
+            # 同期ステータス作成
+            await get_firestore_client().create_sync_status(sync_id, sync_type)
 
         try:
             guild = self.client.get_guild(guild_id)
@@ -44,71 +105,61 @@ class MessageSyncer:
             # 最後の同期時刻を取得
             last_sync = None
             if not full_sync:
-                last_sync = await firestore_client.get_last_sync_time()
+                last_sync = await get_firestore_client().get_last_sync_time()
 
-            # 同期済みチャンネルIDを取得
-            synced_channel_ids = await firestore_client.get_synced_channel_ids()
+            # 同期済みチャンネルとウォーターマーク（同期済み最大メッセージID）を取得
+            watermarks = await get_firestore_client().get_channel_watermarks()
+            if full_sync:
+                watermarks = dict.fromkeys(watermarks)
+            synced_channel_ids = set(watermarks)
             logger.info(f"同期済みチャンネル数: {len(synced_channel_ids)}")
 
-            # 全テキストチャンネルを同期
-            for channel in guild.text_channels:
-                try:
-                    channel_id = str(channel.id)
-                    is_new_channel = channel_id not in synced_channel_ids
-
-                    if is_new_channel:
-                        # 新規チャンネル: フル同期
-                        logger.info(f"新規チャンネル検出: {channel.name}")
-                        self.new_channels.append(channel.name)
-                        await self._sync_channel(channel, None, sync_id)
-                    else:
-                        # 既存チャンネル: 差分同期
-                        await self._sync_channel(channel, last_sync, sync_id)
-
-                    # 同期済みとしてマーク
-                    await firestore_client.mark_channel_synced(channel_id, channel.name)
-
-                except discord.errors.Forbidden:
-                    logger.warning(f"チャンネルアクセス拒否: {channel.name}")
-                except Exception as e:
-                    logger.error(f"チャンネル同期エラー: {channel.name} - {e}")
-                    self.error_count += 1
-
-                # チャンネル間で待機（レート制限対策）
-                await asyncio.sleep(settings.sync_delay_seconds * 5)
-
-            # フォーラムチャンネルのスレッドも同期（存在する場合）
+            # 同期対象: テキストチャンネルとフォーラムのスレッド
+            channels: list[discord.TextChannel | discord.Thread] = list(guild.text_channels)
             forum_channels = getattr(guild, "forum_channels", [])
             for channel in forum_channels:
                 try:
+                    await self.rate_limiter.acquire()
                     async for thread in channel.archived_threads():
-                        thread_id = str(thread.id)
-                        is_new_thread = thread_id not in synced_channel_ids
-
-                        if is_new_thread:
-                            logger.info(f"新規スレッド検出: {thread.name}")
-                            self.new_channels.append(f"{channel.name}/{thread.name}")
-                            await self._sync_channel(thread, None, sync_id)
-                        else:
-                            await self._sync_channel(thread, last_sync, sync_id)
-
-                        await firestore_client.mark_channel_synced(thread_id, thread.name)
-                        await asyncio.sleep(settings.sync_delay_seconds * 2)
+                        channels.append(thread)
                 except discord.errors.Forbidden:
                     logger.warning(f"フォーラムアクセス拒否: {channel.name}")
                 except Exception as e:
                     logger.error(f"フォーラム同期エラー: {channel.name} - {e}")
 
+            # 優先度順にワーカーで並行同期
+            await self.scheduler.run(
+                self._prioritize_channels(channels, synced_channel_ids),
+                lambda channel: self._sync_scheduled_channel(
+                    channel, watermarks, last_sync, sync_id
+                ),
+            )
+
+            write_stats = self._write_stats()
+            self.error_count += write_stats["failed"]
+
             # 同期完了
-            await firestore_client.complete_sync(sync_id, self.error_count)
-            await firestore_client.update_last_sync_time(datetime.utcnow())
+            await get_firestore_client().complete_sync(sync_id, self.error_count)
+            await get_firestore_client().update_last_sync_time(datetime.utcnow())
+            if self.indexed_chunk_count:
+                await get_firestore_client().bump_index_version()
 
             if self.new_channels:
                 logger.info(f"新規チャンネル/スレッド: {self.new_channels}")
 
             logger.info(
                 f"同期完了: processed={self.processed_count}, "
-                f"new={self.new_count}, errors={self.error_count}"
+                f"new={self.new_count}, skipped_channels={self.skipped_channel_count}, "
+                f"errors={self.error_count}"
+            )
+            upload_stats = get_gemini_client().uploader.stats()
+            logger.info(f"書き込み統計: {write_stats}")
+            logger.info(f"アップロード統計: {upload_stats}")
+            logger.info(f"スケジューラ統計: {self.scheduler.stats()}")
+            logger.info(f"OCR統計: {get_ocr_processor().stats()}")
+            logger.info(f"ダウンロード統計: {self.downloader.stats()}")
+            logger.info(
+                f"同期済みID判定: hits={self.known_id_hits}, misses={self.known_id_misses}"
             )
 
             return {
@@ -117,84 +168,343 @@ class MessageSyncer:
                 "new_count": self.new_count,
                 "error_count": self.error_count,
                 "new_channels": self.new_channels,
+                "skipped_channel_count": self.skipped_channel_count,
+                "indexed_chunk_count": self.indexed_chunk_count,
+                "write_stats": write_stats,
+                "upload_stats": upload_stats,
+                "scheduler_stats": self.scheduler.stats(),
+                "ocr_stats": get_ocr_processor().stats(),
+                "download_stats": self.downloader.stats(),
+                "known_id_hits": self.known_id_hits,
+                "known_id_misses": self.known_id_misses,
             }
 
         except Exception as e:
             logger.error(f"同期失敗: {e}")
-            await firestore_client.fail_sync(sync_id, str(e))
+            await get_firestore_client().fail_sync(sync_id, str(e))
             raise
+        finally:
+            await self.downloader.close()
 
-    async def _sync_channel(
+    def _prioritize_channels(
+        self,
+        channels: list[discord.TextChannel | discord.Thread],
+        synced_channel_ids: set[str],
+    ) -> list[tuple[str, discord.TextChannel | discord.Thread]]:
+        """同期の優先順に並べる
+
+        全履歴を取得する新規チャンネル（最も大きい処理）を先に、
+        その中では最終メッセージが新しい（活発な）チャンネルを先にする。
+        """
+        def priority(channel: discord.TextChannel | discord.Thread) -> tuple[bool, int]:
+            is_new = str(channel.id) not in synced_channel_ids
+            return is_new, channel.last_message_id or 0
+
+        ordered = sorted(channels, key=priority, reverse=True)
+        return [(self._channel_display_name(channel), channel) for channel in ordered]
+
+    @staticmethod
+    def _channel_display_name(channel: discord.TextChannel | discord.Thread) -> str:
+        """ログ用のチャンネル名（スレッドは 親/スレッド）"""
+        if isinstance(channel, discord.Thread) and channel.parent:
+            return f"{channel.parent.name}/{channel.name}"
+        return channel.name
+
+    async def _sync_scheduled_channel(
         self,
         channel: discord.TextChannel | discord.Thread,
-        after: datetime | None,
+        watermarks: dict[str, int | None],
+        last_sync: datetime | None,
         sync_id: str,
     ) -> None:
-        """チャンネルを同期"""
+        """スケジューラから呼ばれる1チャンネル分の同期
+
+        ウォーターマークがあるチャンネルはそのメッセージIDより後だけを取得し、
+        最終メッセージがウォーターマークより新しくなければ履歴を取得しない。
+        再開時は完了済みチャンネルをスキップし、チェックポイントがあればその後から取得する。
+        """
+        channel_id = str(channel.id)
+        name = self._channel_display_name(channel)
+        if channel_id in self._completed_channel_ids:
+            logger.debug(f"再開: 同期済みのためスキップ: {name}")
+            self.skipped_channel_count += 1
+            return
+
+        watermark = watermarks.get(channel_id)
+        checkpoint = self._checkpoints.get(channel_id)
+        try:
+            if channel_id not in watermarks:
+                # 新規チャンネル: フル同期
+                logger.info(f"新規チャンネル検出: {name}")
+                self.new_channels.append(name)
+                after = None
+            elif watermark:
+                # 既存チャンネル: ウォーターマークから差分同期
+                after = discord.Object(id=watermark)
+            else:
+                # ウォーターマーク未記録: 前回同期時刻から差分同期
+                after = last_sync
+
+            # 中断した同期の続き: チェックポイントまでは保存・インデックス済み
+            # （チェックポイントより後に中断前に保存した分は、同期済みID集合で除く）
+            start_id = max(checkpoint or 0, watermark or 0)
+            if checkpoint:
+                logger.info(f"チェックポイントから再開: {name}, after={checkpoint}")
+                after = discord.Object(id=start_id)
+
+            last_message_id = channel.last_message_id
+            if start_id and last_message_id is not None and last_message_id <= start_id:
+                logger.debug(f"新着なし: {name}")
+                self.skipped_channel_count += 1
+                if not checkpoint:
+                    return
+                latest_id = None
+                incomplete = False
+            else:
+                # 処理に失敗したメッセージがある場合はその直前までのIDが返る
+                latest_id, complete = await self._sync_channel(channel, after, sync_id)
+
+                # 書き込みに失敗した場合は次回再取得できるようウォーターマークを進めない
+                if self._writers[channel_id].failed_count:
+                    latest_id = None
+                    start_id = watermark or 0
+                incomplete = not complete
+
+            if start_id and (latest_id is None or latest_id < start_id):
+                latest_id = start_id
+
+            # 同期済みとしてマーク
+            await get_firestore_client().mark_channel_synced(
+                channel_id,
+                channel.name,
+                last_message_id=str(latest_id) if latest_id else None,
+            )
+            # 処理・書き込みに失敗したチャンネルは再開時に取得し直すため完了にしない
+            if not incomplete:
+                await get_firestore_client().complete_channel_sync(sync_id, channel_id)
+
+        except discord.errors.Forbidden:
+            logger.warning(f"チャンネルアクセス拒否: {name}")
+        except Exception as e:
+            logger.error(f"チャンネル同期エラー: {name} - {e}")
+            self.error_count += 1
+        finally:
+            self._forget_open_chunk(channel_id)
+            if channel_id in self._stale_documents:
+                await self._delete_stale_documents(channel_id)
+                for document_name in self._stale_documents.pop(channel_id, []):
+                    logger.warning(f"置き換え済みドキュメントを削除できません: {document_name}")
+
+    async def _sync_channel(
+        self,
+        channel: discord.TextChannel | discord.Thread,
+        after: datetime | discord.Object | None,
+        sync_id: str,
+    ) -> tuple[int | None, bool]:
+        """チャンネルを同期
+
+        メッセージはチャンネル専用の MessageBatchWriter で書き込むため、並行して
+        同期する他のチャンネルの書き込み失敗はこのチャンネルに計上されない。
+
+        Args:
+            after: 取得開始位置（メッセージIDのウォーターマークまたは時刻、Noneは全履歴）
+
+        Returns:
+            (処理に成功した最大メッセージID（それより前に処理に失敗したメッセージを
+             含まない。取得なし・先頭で失敗した場合はNone）,
+             処理・書き込みに失敗したメッセージがなければTrue)
+        """
         logger.info(f"チャンネル同期: {channel.name}")
 
-        # メッセージ履歴を取得
-        kwargs = {"limit": None}
+        # メッセージ履歴を古い順に取得（チェックポイントを単調に進めるため）
+        kwargs = {"limit": None, "oldest_first": True}
         if after:
             kwargs["after"] = after
 
+        known_ids = await self._load_known_ids(str(channel.id), after)
+        writer = self._writers[str(channel.id)] = MessageBatchWriter(get_firestore_client())
+
         count = 0
-        async for discord_msg in channel.history(**kwargs):
-            try:
-                await self._process_message(discord_msg, channel)
+        failed_count = 0
+        latest_id: int | None = None
+        # 処理中のメッセージ（OCRを待たずに履歴の取得を続け、ページ単位で回収する）
+        pending: list[tuple[int, asyncio.Task[Message | None]]] = []
+        # 同時に処理するメッセージ数の上限（上限に達したら履歴の取得を待つ）
+        slots = asyncio.Semaphore(settings.sync_message_concurrency)
+
+        async def collect() -> bool:
+            """処理中のメッセージを回収して書き込み・インデックスし、失敗がなければTrue"""
+            nonlocal latest_id, pending, failed_count
+            batch, pending = pending, []
+            failed_before_batch = failed_count > 0
+            new_messages, processed_until, failed = await self._collect_messages(batch)
+            failed_count += failed
+            await self._flush_and_index(channel, new_messages)
+            # 処理に失敗したメッセージより後にはウォーターマークを進めない
+            if not failed_before_batch and processed_until is not None:
+                latest_id = processed_until
+            return failed_count == 0 and writer.failed_count == 0
+
+        # 最初のページ取得分
+        await self.rate_limiter.acquire()
+        try:
+            async for discord_msg in channel.history(**kwargs):
+                await slots.acquire()
+                task = asyncio.create_task(self._process_message(discord_msg, channel, known_ids))
+                task.add_done_callback(lambda _: slots.release())
+                pending.append((discord_msg.id, task))
                 count += 1
 
-                # バッチごとに待機（レート制限対策）
+                # バッチ（履歴の1ページ）ごとにレート制限のトークンを取得
                 if count % settings.sync_batch_size == 0:
-                    await asyncio.sleep(settings.sync_delay_seconds)
-                    await firestore_client.update_sync_progress(
-                        sync_id,
-                        last_channel_id=str(channel.id),
-                        last_message_id=str(discord_msg.id),
-                        processed_count=self.processed_count,
-                    )
-
-            except Exception as e:
-                logger.error(f"メッセージ処理エラー: {discord_msg.id} - {e}")
-                self.error_count += 1
+                    await self.rate_limiter.acquire()
+                    # チェックポイントまでのメッセージを書き込み・インデックスしてから記録
+                    # （処理・書き込みに失敗したメッセージより後には進めない）
+                    if await collect():
+                        await get_firestore_client().update_sync_progress(
+                            sync_id,
+                            last_channel_id=str(channel.id),
+                            last_message_id=str(latest_id),
+                            processed_count=self.processed_count,
+                        )
+        finally:
+            # 途中で失敗しても処理済みのメッセージは書き込み、インデックスする
+            await collect()
+            self.known_id_hits += known_ids.hit_count
+            self.known_id_misses += known_ids.miss_count
 
         logger.info(f"チャンネル完了: {channel.name}, messages={count}")
+        return latest_id, failed_count == 0 and writer.failed_count == 0
+
+    async def _collect_messages(
+        self,
+        pending: list[tuple[int, asyncio.Task[Message | None]]],
+    ) -> tuple[list[Message], int | None, int]:
+        """処理中のメッセージの完了を待つ
+
+        Returns:
+            (新規に保存したメッセージ一覧,
+             先頭から連続して処理に成功した最後のメッセージID（先頭で失敗・空の場合はNone）,
+             処理に失敗したメッセージ数)
+        """
+        results = await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+        new_messages = []
+        processed_until = None
+        failed = 0
+        for (message_id, _), result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.error(f"メッセージ処理エラー: {message_id} - {result}")
+                self.error_count += 1
+                self.failed_message_count += 1
+                failed += 1
+                continue
+            if not failed:
+                processed_until = message_id
+            if result:
+                new_messages.append(result)
+        return new_messages, processed_until, failed
+
+    async def _flush_and_index(
+        self,
+        channel: discord.TextChannel | discord.Thread,
+        new_messages: list[Message],
+    ) -> None:
+        """チャンネルのバッファ済みメッセージを書き込み、新着分を会話チャンクとしてインデックス"""
+        await self._writers[str(channel.id)].flush()
+        try:
+            await self._index_new_messages(str(channel.id), new_messages)
+        except Exception as e:
+            logger.error(f"チャンクインデックスエラー: {channel.name} - {e}")
+            self.error_count += 1
+            # 次回はFirestoreに保存済みの末尾チャンクから再開する
+            self._forget_open_chunk(str(channel.id))
+
+    def _write_stats(self) -> dict:
+        """チャンネル別の書き込み統計をジョブ全体で合算"""
+        writers = self._writers.values()
+        written = sum(writer.written_count for writer in writers)
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "written": written,
+            "failed": sum(writer.failed_count for writer in writers),
+            "batches": sum(writer.batch_count for writer in writers),
+            "write_seconds": round(sum(writer.write_seconds for writer in writers), 2),
+            "messages_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+        }
+
+    async def _delete_stale_documents(self, channel_id: str) -> None:
+        """置き換え済みの古いドキュメントを削除（失敗したものは次回に再試行）"""
+        stale_documents = self._stale_documents.pop(channel_id, [])
+        remaining = [
+            document_name for document_name in stale_documents
+            if not await get_gemini_client().delete_document(document_name)
+        ]
+        if remaining:
+            self._stale_documents[channel_id] = remaining
+
+    def _forget_open_chunk(self, channel_id: str) -> None:
+        """チャンネルの末尾チャンクの状態を破棄"""
+        self.chunker.discard(channel_id)
+        self._indexed_open_chunks.pop(channel_id, None)
+
+    async def _load_known_ids(
+        self,
+        channel_id: str,
+        after: datetime | discord.Object | None,
+    ) -> KnownMessageIds:
+        """チャンネルの同期済みメッセージID集合を作成
+
+        差分同期・再開では取得開始位置（ウォーターマーク・チェックポイントのIDに含まれる
+        投稿時刻、または前回同期時刻）以降のID、フル同期ではチャンネル全体のIDを読み込む。
+        """
+        if isinstance(after, discord.Object):
+            since = discord.utils.snowflake_time(after.id)
+        else:
+            since = after
+        return KnownMessageIds(
+            await get_firestore_client().get_message_ids_by_channel(channel_id, since=since)
+        )
 
     async def _process_message(
         self,
         discord_msg: discord.Message,
         channel: discord.TextChannel | discord.Thread,
-    ) -> None:
-        """メッセージを処理"""
+        known_ids: KnownMessageIds,
+    ) -> Message | None:
+        """メッセージを処理
+
+        Returns:
+            新規に保存したメッセージ（同期済みの場合はNone）
+        """
         message_id = str(discord_msg.id)
 
-        # 既存チェック
-        if await firestore_client.message_exists(message_id):
+        # 既存チェック（ローカルの同期済みID集合で判定）
+        if known_ids.check(message_id):
             self.processed_count += 1
-            return
+            return None
 
         # 添付ファイル処理
-        attachments = []
-        for att in discord_msg.attachments:
-            attachment = Attachment(
+        attachments = [
+            Attachment(
                 filename=att.filename,
                 content_type=att.content_type or "application/octet-stream",
                 url=att.url,
                 has_ocr=False,
             )
-
-            # 画像の場合はOCR
-            if ocr_processor.is_available() and ocr_processor.is_image(attachment.content_type):
-                ocr_text = await ocr_processor.process_attachment(
-                    att.url,
-                    att.filename,
-                    attachment.content_type,
-                )
-                if ocr_text:
-                    attachment.has_ocr = True
-                    attachment.ocr_text = ocr_text
-
-            attachments.append(attachment)
+            for att in discord_msg.attachments
+        ]
+
+        # 画像・PDFはテキストを抽出（複数の添付ファイルは並行して処理）
+        ocr = get_ocr_processor()
+        targets = [att for att in attachments if ocr.can_extract(att.content_type)]
+        ocr_texts = await asyncio.gather(*(
+            ocr.process_attachment(att.url, att.filename, att.content_type, self.downloader)
+            for att in targets
+        ))
+        for attachment, ocr_text in zip(targets, ocr_texts):
+            if ocr_text:
+                attachment.has_ocr = True
+                attachment.ocr_text = ocr_text
 
         # スレッド情報
         thread_id = None
@@ -220,18 +530,96 @@ class MessageSyncer:
             has_attachment=len(attachments) > 0,
             attachments=attachments,
             jump_url=discord_msg.jump_url,
+            synced_at=datetime.utcnow(),
         )
 
-        # File Search Storeにインデックス
-        doc_id = await gemini_client.index_message(message)
-        if doc_id:
-            message.file_search_doc_id = doc_id
-            message.indexed_at = datetime.utcnow()
-
-        # Firestoreに保存
-        await firestore_client.save_message(message)
+        # Firestoreに保存（バッファ経由で一括書き込み）
+        await self._writers[str(channel.id)].add(message)
+        logger.debug(f"メッセージ保存: {message_id}")
 
         self.processed_count += 1
         self.new_count += 1
+        return message
 
-        logger.debug(f"メッセージ保存: {message_id}")
+    async def _index_new_messages(self, channel_id: str, new_messages: list[Message]) -> None:
+        """新着メッセージを会話チャンクとしてインデックス
+
+        チャンネルの末尾チャンクに新着メッセージを追加し、
+        新規作成・更新されたチャンクのみアップロードする。
+        末尾チャンクはチャンネルの同期中はメモリに保持し、Firestoreからは初回のみ取得する。
+        """
+        if not new_messages:
+            return
+
+        # 末尾チャンクとそのメッセージを取得（チャンネルの初回のみ）
+        key = (new_messages[0].channel_id, new_messages[0].thread_id)
+        if key not in self.chunker:
+            open_chunk = await get_firestore_client().get_latest_chunk(channel_id)
+            if open_chunk:
+                open_chunk_messages, _ = await get_firestore_client().get_messages_by_ids(
+                    open_chunk.message_ids
+                )
+                self.chunker.restore(open_chunk, open_chunk_messages)
+            self._indexed_open_chunks[channel_id] = open_chunk
+        open_chunk = self._indexed_open_chunks.get(channel_id)
+
+        updates = self.chunker.add(sorted(new_messages, key=lambda m: m.timestamp))
+        if not updates:
+            return
+        chunks = [chunk for chunk, _ in updates]
+
+        items = []
+        for chunk, chunk_messages in updates:
+            chunk.content_hash = chunk.compute_content_hash(chunk_messages)
+            # 末尾チャンクが変わっていなければアップロードしない
+            if open_chunk and chunk.chunk_id == open_chunk.chunk_id:
+                if chunk.content_hash == open_chunk.content_hash:
+                    continue
+            items.append((chunk, chunk_messages))
+
+        # 更新された（または置き換わった）末尾チャンク
+        # （置き換えの保存が済むまでは _indexed_open_chunks に残す）
+        updated_ids = {chunk.chunk_id for chunk, _ in items}
+        replaced_chunk = None
+        if open_chunk and (
+            open_chunk.chunk_id in updated_ids
+            or open_chunk.chunk_id not in {chunk.chunk_id for chunk in chunks}
+        ):
+            replaced_chunk = open_chunk
+
+        doc_ids = await get_gemini_client().index_conversation_chunks(items)
+
+        saved_ids = set()
+        for (chunk, _), doc_id in zip(items, doc_ids):
+            if not doc_id:
+                logger.warning(f"チャンク {chunk.chunk_id}: インデックス失敗")
+                self.error_count += 1
+                continue
+            chunk.file_search_doc_id = doc_id
+            chunk.indexed_at = datetime.utcnow()
+            await get_firestore_client().save_chunk(chunk)
+            saved_ids.add(chunk.chunk_id)
+            self.indexed_chunk_count += 1
+
+        # 古いドキュメントは検索できない期間が生じないよう、新しいドキュメントの保存後に削除
+        # （更新に失敗したチャンクは古いドキュメントを残す）
+        replaced = replaced_chunk is not None and (
+            replaced_chunk.chunk_id in saved_ids or replaced_chunk.chunk_id not in updated_ids
+        )
+        if replaced:
+            if is_document_name(replaced_chunk.file_search_doc_id):
+                self._stale_documents.setdefault(channel_id, []).append(
+                    replaced_chunk.file_search_doc_id
+                )
+            if replaced_chunk.chunk_id not in updated_ids:
+                await get_firestore_client().delete_chunk(replaced_chunk.chunk_id)
+        await self._delete_stale_documents(channel_id)
+
+        # 以降の差分の基準となる末尾チャンク
+        # （末尾チャンクの再アップロードに失敗した場合は古いチャンクのまま、次の更新で置き換える）
+        latest = chunks[-1]
+        if not replaced_chunk or replaced or replaced_chunk.chunk_id != latest.chunk_id:
+            self._indexed_open_chunks[channel_id] = latest if latest.file_search_doc_id else None
+
+        logger.info(f"チャンクをインデックス: channel={channel_id}, chunks={len(items)}, "
+                    f"messages={len(new_messages)}")
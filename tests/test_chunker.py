@@ -0,0 +1,275 @@
+"""会話チャンク生成のテスト"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core import chunker as chunker_module
+from src.core.chunker import (
+    IncrementalChunker,
+    extend_channel_chunks,
+    group_message_stream_into_chunks,
+    group_messages_into_chunks,
+    group_messages_into_chunks_vectorized,
+)
+from src.core.models import Message
+
+
+def _make_message(message_id: int, channel_id: str, minutes: int, author: str = "user") -> Message:
+    return Message(
+        message_id=str(message_id),
+        channel_id=channel_id,
+        channel_name=f"ch-{channel_id}",
+        author_id=author,
+        author_name=author,
+        content=f"message {message_id}",
+        timestamp=datetime(2024, 12, 15, 10, 0, 0) + timedelta(minutes=minutes),
+        jump_url=f"https://discord.com/channels/1/{channel_id}/{message_id}",
+    )
+
+
+async def _aiter(messages: list[Message]):
+    for msg in messages:
+        yield msg
+
+
+def test_group_messages_splits_by_time_window():
+    """時間ウィンドウを超えたら新しいチャンクになる"""
+    messages = [
+        _make_message(1, "a", 0),
+        _make_message(2, "a", 5),
+        _make_message(3, "a", 10),
+        _make_message(4, "a", 120),
+        _make_message(5, "a", 125),
+        _make_message(6, "a", 130),
+    ]
+
+    chunks = group_messages_into_chunks(messages, time_window_minutes=30)
+
+    assert [c.message_ids for c in chunks] == [["1", "2", "3"], ["4", "5", "6"]]
+
+
+async def test_stream_chunks_match_batch_chunks():
+    """チャンネル単位のストリーム処理はバッチ処理と同じチャンクを生成する"""
+    messages = [
+        _make_message(i, channel, minutes, author=f"u{i % 3}")
+        for channel in ("a", "b")
+        for i, minutes in enumerate([0, 1, 2, 50, 51, 200, 201, 202, 203], start=1)
+    ]
+
+    batch = group_messages_into_chunks(messages, max_messages_per_chunk=2)
+    streamed = [
+        chunk
+        async for chunks, _ in group_message_stream_into_chunks(
+            _aiter(messages), max_messages_per_chunk=2
+        )
+        for chunk in chunks
+    ]
+
+    assert [(c.channel_id, c.message_ids) for c in streamed] == [
+        (c.channel_id, c.message_ids) for c in batch
+    ]
+
+
+def test_chunk_ids_are_deterministic():
+    """同じメッセージからは同じチャンクIDが生成される"""
+    messages = [_make_message(i, "a", i * 60) for i in range(1, 5)]
+
+    first = group_messages_into_chunks(messages)
+    second = group_messages_into_chunks(messages)
+
+    assert [c.chunk_id for c in first] == [c.chunk_id for c in second]
+    assert len({c.chunk_id for c in first}) == len(first)
+
+
+def test_content_hash_changes_with_content():
+    """メッセージ内容が変わると内容ハッシュも変わる"""
+    messages = [_make_message(i, "a", i) for i in range(1, 4)]
+    chunk = group_messages_into_chunks(messages)[0]
+    original = chunk.compute_content_hash(messages)
+
+    edited = [*messages[:-1], messages[-1].model_copy(update={"content": "edited"})]
+
+    assert chunk.compute_content_hash(messages) == original
+    assert chunk.compute_content_hash(edited) != original
+
+
+def test_extend_channel_chunks_matches_batch():
+    """末尾チャンクへの追加はバッチ処理と同じチャンクを生成する"""
+    minutes = [0, 1, 2, 3, 60, 61, 62, 200, 201, 300, 301, 302, 303, 304]
+    messages = [_make_message(i, "a", m, author=f"u{i % 2}") for i, m in enumerate(minutes, 1)]
+
+    for split in range(1, len(messages)):
+        old, new = messages[:split], messages[split:]
+        old_chunks = group_messages_into_chunks(old, max_messages_per_chunk=4)
+        open_chunk = old_chunks[-1]
+        open_messages = [m for m in old if m.message_id in open_chunk.message_ids]
+
+        extended = extend_channel_chunks(
+            open_chunk, open_messages, new, max_messages_per_chunk=4
+        )
+        extended_ids = {c.chunk_id for c in extended}
+        combined = [c for c in old_chunks if c.chunk_id not in extended_ids] + extended
+
+        expected = group_messages_into_chunks(messages, max_messages_per_chunk=4)
+        assert extended[0].chunk_id == open_chunk.chunk_id
+        assert [(c.chunk_id, c.message_ids) for c in combined] == [
+            (c.chunk_id, c.message_ids) for c in expected
+        ]
+
+
+def _chunk_summary(chunk):
+    return (
+        chunk.chunk_id,
+        chunk.channel_id,
+        chunk.thread_id,
+        chunk.message_ids,
+        chunk.start_time,
+        chunk.end_time,
+        chunk.participant_names,
+    )
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_incremental_chunker_matches_batch(seed):
+    """逐次チャンク化は、どの区切りで追加・再開してもバッチ処理と同じチャンクになる"""
+    rng = random.Random(seed)
+    params = {
+        "time_window_minutes": rng.randint(1, 60),
+        "max_messages_per_chunk": rng.randint(1, 8),
+        "min_messages_per_chunk": rng.randint(0, 5),
+    }
+
+    # 複数チャンネル・スレッドが混在した時間順のストリーム（同時刻を含む）
+    keys = [("a", None), ("b", None), ("b", "t1")]
+    messages = []
+    minutes = 0
+    for message_id in range(1, rng.randint(0, 80) + 1):
+        minutes += rng.choice([0, 1, 5, 20, 45, 90])
+        channel_id, thread_id = rng.choice(keys)
+        msg = _make_message(message_id, channel_id, minutes, author=f"u{rng.randint(0, 3)}")
+        messages.append(msg.model_copy(update={"thread_id": thread_id}))
+
+    chunker = IncrementalChunker(**params)
+    latest: dict[str, tuple] = {}
+    open_chunks: dict[tuple, tuple] = {}
+    position = 0
+    while position < len(messages):
+        size = rng.randint(1, 10)
+        for chunk, chunk_messages in chunker.add(messages[position:position + size]):
+            assert [m.message_id for m in chunk_messages] == chunk.message_ids
+            latest[chunk.chunk_id] = chunk
+            open_chunks[(chunk.channel_id, chunk.thread_id)] = (chunk, chunk_messages)
+        position += size
+
+        # 途中で保存済みの末尾チャンクから再開する
+        if rng.random() < 0.2:
+            chunker = IncrementalChunker(**params)
+            for chunk, chunk_messages in open_chunks.values():
+                chunker.restore(chunk, chunk_messages)
+
+    expected = group_messages_into_chunks(messages, **params)
+
+    assert sorted(map(_chunk_summary, latest.values())) == sorted(map(_chunk_summary, expected))
+
+
+def test_incremental_chunker_emits_only_changed_chunks():
+    """確定・変更されたチャンクのみを返す"""
+    chunker = IncrementalChunker(time_window_minutes=30, min_messages_per_chunk=0)
+
+    first = chunker.add([_make_message(1, "a", 0), _make_message(2, "b", 0)])
+    second = chunker.add([_make_message(3, "a", 5)])
+    third = chunker.add([_make_message(4, "a", 120)])
+
+    assert [chunk.message_ids for chunk, _ in first] == [["1"], ["2"]]
+    assert [chunk.message_ids for chunk, _ in second] == [["1", "3"]]
+    assert [chunk.message_ids for chunk, _ in third] == [["1", "3"], ["4"]]
+    assert chunker.add([_make_message(4, "a", 120)]) == []
+
+
+def test_incremental_chunker_skips_already_chunked_messages():
+    """確定済みチャンク・復元した末尾チャンクのメッセージを再度追加しても無視する"""
+    chunker = IncrementalChunker(time_window_minutes=30, max_messages_per_chunk=2,
+                                 min_messages_per_chunk=0)
+    messages = [_make_message(i, "a", i) for i in range(1, 6)]
+    emitted = chunker.add(messages)
+    assert [chunk.message_ids for chunk, _ in emitted] == [["1", "2"], ["3", "4"], ["5"]]
+
+    # 確定済みチャンクの古いメッセージは並べ直しの対象にしない
+    assert chunker.add(messages[:4]) == []
+    assert chunker.add([messages[1], _make_message(6, "a", 6)])[0][0].message_ids == ["5", "6"]
+
+    # 復元した末尾チャンク（最小コンテキストを含む）のメッセージも無視する
+    restored = IncrementalChunker(time_window_minutes=30, max_messages_per_chunk=2,
+                                  min_messages_per_chunk=3)
+    last_chunk = group_messages_into_chunks(
+        messages, time_window_minutes=30, max_messages_per_chunk=2, min_messages_per_chunk=3
+    )[-1]
+    assert last_chunk.message_ids == ["3", "4", "5"]
+    restored.restore(last_chunk, messages)
+    assert restored.add(messages[2:]) == []
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_vectorized_chunks_match_batch(seed):
+    """NumPy版の分割は通常版と同じチャンクになる"""
+    pytest.importorskip("numpy")
+    rng = random.Random(seed)
+    params = {
+        "time_window_minutes": rng.randint(1, 60),
+        "max_messages_per_chunk": rng.randint(1, 8),
+        "min_messages_per_chunk": rng.randint(0, 5),
+    }
+    tz = timezone(timedelta(hours=9)) if seed % 2 else None
+
+    # 時刻順でない入力、同時刻、複数チャンネル・スレッド
+    messages = []
+    for message_id in range(1, rng.randint(0, 300) + 1):
+        channel_id, thread_id = rng.choice([("a", None), ("b", None), ("b", "t1")])
+        msg = _make_message(message_id, channel_id, rng.randint(0, 600))
+        messages.append(msg.model_copy(update={
+            "thread_id": thread_id,
+            "author_name": f"u{rng.randint(0, 3)}",
+            "timestamp": msg.timestamp.replace(tzinfo=tz),
+        }))
+
+    vectorized = group_messages_into_chunks_vectorized(messages, **params)
+    expected = group_messages_into_chunks(messages, **params)
+
+    assert list(map(_chunk_summary, vectorized)) == list(map(_chunk_summary, expected))
+
+
+def test_large_input_dispatches_to_vectorized_path(monkeypatch):
+    """VECTORIZE_MIN_MESSAGES 件以上は公開関数からNumPy版を通り、通常版と同じ結果になる"""
+    pytest.importorskip("numpy")
+    rng = random.Random(0)
+    count = chunker_module.VECTORIZE_MIN_MESSAGES + 1000
+    messages = [
+        _make_message(
+            message_id,
+            rng.choice(["a", "b", "c"]),
+            rng.randint(0, count * 2),
+            author=f"u{rng.randint(0, 5)}",
+        )
+        for message_id in range(1, count + 1)
+    ]
+
+    calls = []
+    vectorized = chunker_module.group_messages_into_chunks_vectorized
+
+    def recording_vectorized(messages, **kwargs):
+        calls.append(len(messages))
+        return vectorized(messages, **kwargs)
+
+    monkeypatch.setattr(
+        chunker_module, "group_messages_into_chunks_vectorized", recording_vectorized
+    )
+    chunks = group_messages_into_chunks(messages)
+    assert calls == [count]
+
+    monkeypatch.setattr(chunker_module, "NUMPY_AVAILABLE", False)
+    expected = group_messages_into_chunks(messages)
+    assert calls == [count]
+
+    assert list(map(_chunk_summary, chunks)) == list(map(_chunk_summary, expected))
@@ -0,0 +1,87 @@
+"""添付ファイルダウンローダーのテスト"""
+
+import hashlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.jobs.downloader import AttachmentDownloader
+
+
+@pytest.fixture
+async def cdn():
+    """ダミーCDN（/flaky は1回目だけ503）"""
+    state = {"flaky_calls": 0}
+
+    async def image(request):
+        return web.Response(body=b"x" * 1000)
+
+    async def flaky(request):
+        state["flaky_calls"] += 1
+        if state["flaky_calls"] == 1:
+            return web.Response(status=503)
+        return web.Response(body=b"ok")
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/image.png", image)
+    app.router.add_get("/flaky.png", flaky)
+    app.router.add_get("/missing.png", missing)
+    server = TestServer(app)
+    await server.start_server()
+    yield server, state
+    await server.close()
+
+
+async def test_download_streams_to_file_with_hash(cdn):
+    """一時ファイルに保存し、内容のSHA-256を返す"""
+    server, _ = cdn
+    downloader = AttachmentDownloader()
+
+    downloaded = await downloader.download(str(server.make_url("/image.png")), "image.png")
+    await downloader.close()
+
+    assert downloaded.path.suffix == ".png"
+    assert downloaded.path.read_bytes() == b"x" * 1000
+    assert downloaded.sha256 == hashlib.sha256(b"x" * 1000).hexdigest()
+    downloaded.cleanup()
+    assert not downloaded.path.exists()
+    assert downloader.stats()["bytes"] == 1000
+
+
+async def test_download_skips_files_over_size_cap(cdn):
+    """サイズ上限を超えるファイルは保存しない"""
+    server, _ = cdn
+    downloader = AttachmentDownloader(max_bytes=500)
+
+    downloaded = await downloader.download(str(server.make_url("/image.png")), "image.png")
+    await downloader.close()
+
+    assert downloaded is None
+    assert downloader.stats()["too_large"] == 1
+
+
+async def test_download_retries_server_errors(cdn, monkeypatch):
+    """5xxは再試行し、4xxは再試行しない"""
+    server, state = cdn
+    monkeypatch.setattr("src.jobs.downloader.asyncio.sleep", _no_sleep)
+    downloader = AttachmentDownloader(max_retries=2)
+
+    flaky = await downloader.download(str(server.make_url("/flaky.png")), "flaky.png")
+    missing = await downloader.download(str(server.make_url("/missing.png")), "missing.png")
+    await downloader.close()
+
+    assert flaky.path.read_bytes() == b"ok"
+    flaky.cleanup()
+    assert state["flaky_calls"] == 2
+    assert missing is None
+    stats = downloader.stats()
+    assert stats["retries"] == 1
+    assert stats["failed"] == 1
+
+
+async def _no_sleep(seconds):
+    return None
@@ -0,0 +1,41 @@
+"""Firestoreのバッファ付き一括書き込みのテスト"""
+
+import asyncio
+
+from src.core.firestore import MessageBatchWriter
+
+
+class _SlowClient:
+    """save_messages の完了を外部から制御するダミー"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.saved: list[str] = []
+
+    async def save_messages(self, messages) -> int:
+        await self.release.wait()
+        self.saved += [msg.message_id for msg in messages]
+        return len(messages)
+
+
+async def test_flush_waits_for_in_flight_flush(sample_message, sample_message_with_attachment):
+    """別のタスクがバッファを書き込み中なら、flush() はその完了を待ってから返る"""
+    client = _SlowClient()
+    writer = MessageBatchWriter(client, batch_size=2)
+
+    # 別チャンネルの add() がしきい値に達してバッファごとフラッシュを開始する
+    await writer.add(sample_message)
+    in_flight = asyncio.create_task(writer.add(sample_message_with_attachment))
+    await asyncio.sleep(0)
+
+    # チェックポイント前の flush() は、書き込み中のメッセージが確定するまで返らない
+    flush = asyncio.create_task(writer.flush())
+    await asyncio.sleep(0)
+    assert not flush.done()
+
+    client.release.set()
+    await flush
+    assert client.saved == [sample_message.message_id, sample_message_with_attachment.message_id]
+    assert writer.written_count == 2
+    await in_flight
+    assert writer.batch_count == 1
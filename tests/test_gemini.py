@@ -0,0 +1,87 @@
+"""検索レスポンスのパース・ストア操作のテスト"""
+
+from types import SimpleNamespace
+
+from src.core.gemini import GeminiClient, parse_search_response
+
+
+def test_parses_json_block():
+    """```json ブロックから結果を取り出し、msg_ プレフィックスを除去する"""
+    response_text = """検索結果です。
+```json
+{"results": [
+  {"message_id": "msg_1300000000000000001", "reason": "請求書の話題", "highlight": "請求書"},
+  {"message_id": "1300000000000000002"}
+]}
+```"""
+
+    assert parse_search_response(response_text) == [
+        {"message_id": "1300000000000000001", "reason": "請求書の話題", "highlight": "請求書"},
+        {"message_id": "1300000000000000002", "reason": "", "highlight": ""},
+    ]
+
+
+def test_parses_bare_json_and_applies_limit():
+    response_text = '{"results": [{"message_id": "msg_1"}, {"message_id": "msg_2"}]}'
+
+    assert [r["message_id"] for r in parse_search_response(response_text, limit=1)] == ["1"]
+
+
+def test_falls_back_to_message_ids_in_text():
+    """JSONとして読めない場合は本文中の msg_<ID> を拾う"""
+    response_text = "関連するのは msg_111 と msg_222 です"
+
+    assert parse_search_response(response_text) == [
+        {"message_id": "111", "reason": "", "highlight": ""},
+        {"message_id": "222", "reason": "", "highlight": ""},
+    ]
+
+
+def test_empty_response():
+    assert parse_search_response("") == []
+
+
+def test_non_object_json_is_not_a_result():
+    """JSONがオブジェクトでない応答は結果として読めないものとしてNoneを返す"""
+    assert parse_search_response('[{"message_id": "msg_1"}]') is None
+    assert parse_search_response('```json\n"該当なし"\n```') is None
+
+
+class _FakeDocuments:
+    """client.aio.file_search_stores.documents のダミー（1ページ2件）"""
+
+    def __init__(self, names: list[str], failing_names: set[str] = frozenset()):
+        self.names = list(names)
+        self.failing_names = failing_names
+        self.deleted: list[str] = []
+
+    async def list(self, parent: str):
+        assert parent == "fileSearchStores/s"
+        names = list(self.names)
+
+        async def pages():
+            for start in range(0, len(names), 2):
+                for name in names[start:start + 2]:
+                    yield SimpleNamespace(name=name)
+
+        return pages()
+
+    async def delete(self, name: str, config=None):
+        if name in self.failing_names:
+            raise RuntimeError("500 Internal")
+        self.names.remove(name)
+        self.deleted.append(name)
+
+
+async def test_delete_all_files_in_store_deletes_listed_documents():
+    """ストア内のドキュメントを一覧して削除し、削除できた件数を返す"""
+    names = [f"fileSearchStores/s/documents/d{i}" for i in range(5)]
+    documents = _FakeDocuments(names, failing_names={names[1]})
+    client = GeminiClient.__new__(GeminiClient)
+    client.store_name = "fileSearchStores/s"
+    client.client = SimpleNamespace(
+        aio=SimpleNamespace(file_search_stores=SimpleNamespace(documents=documents))
+    )
+
+    assert await client.delete_all_files_in_store() == 4
+    assert documents.deleted == [name for name in names if name != names[1]]
@@ -0,0 +1,48 @@
+"""キーワード検索インデックスのテスト"""
+
+from src.core.keyword_index import KeywordIndex, extract_keywords, make_highlight, tokenize
+
+
+def test_tokenize_japanese_bigrams_and_ascii_words():
+    """日本語はbi-gram、英数字は単語単位でトークン化する"""
+    tokens = tokenize("請求書 Invoice.PDF １００円")
+
+    assert tokens == ["請求", "求書", "invoice", "pdf", "100", "円"]
+
+
+def test_extract_keywords():
+    """キーワード型のクエリのみキーワードを取り出す"""
+    assert extract_keywords("「見積書」") == "見積書"
+    assert extract_keywords("invoice.pdf を探して") == "invoice.pdf"
+    assert extract_keywords("100,000円の件") == "100,000円"
+    assert extract_keywords("先月の経理の話") is None
+
+
+def test_search_ranks_matching_messages(sample_message, sample_message_with_attachment):
+    """全キーワードを含むメッセージのみBM25順で返す"""
+    index = KeywordIndex()
+    index.add_many([sample_message, sample_message_with_attachment])
+
+    results = index.search("100,000円")
+
+    assert [r["message_id"] for r in results] == [sample_message_with_attachment.message_id]
+    assert index.search("screenshot.png")[0]["message_id"] == (
+        sample_message_with_attachment.message_id
+    )
+    assert index.search("存在しない語") == []
+
+
+def test_add_is_idempotent(sample_message):
+    """同じメッセージは重複して追加されない"""
+    index = KeywordIndex()
+
+    assert index.add(sample_message) is True
+    assert index.add(sample_message) is False
+    assert len(index) == 1
+
+
+def test_make_highlight_uses_ocr_text(sample_message_with_attachment):
+    """OCRテキスト内の一致箇所をハイライトする"""
+    highlight = make_highlight(sample_message_with_attachment, "100,000円")
+
+    assert "100,000円" in highlight
@@ -0,0 +1,41 @@
+"""同期済みメッセージID集合のテスト"""
+
+from src.core.known_ids import KnownMessageIds
+
+
+def test_known_ids_membership():
+    """含まれるIDのみTrueを返す"""
+    known = KnownMessageIds(["1234567890123456789", "1234567890123456700", 42])
+
+    assert "1234567890123456789" in known
+    assert 1234567890123456700 in known
+    assert "42" in known
+    assert "1234567890123456788" not in known
+    assert len(known) == 3
+
+
+def test_known_ids_deduplicates():
+    """重複IDは1件として保持する"""
+    known = KnownMessageIds(["100", "100", 100])
+
+    assert len(known) == 1
+
+
+def test_known_ids_check_counts_hits_and_misses():
+    """check()はヒット/ミスを記録する"""
+    known = KnownMessageIds(["100", "200"])
+
+    assert known.check("100") is True
+    assert known.check("300") is False
+    assert known.check("200") is True
+
+    assert known.hit_count == 2
+    assert known.miss_count == 1
+
+
+def test_known_ids_empty():
+    """空集合は常にミス"""
+    known = KnownMessageIds()
+
+    assert known.check("100") is False
+    assert known.miss_count == 1
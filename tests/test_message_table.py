@@ -0,0 +1,84 @@
+"""列指向メッセージテーブルのテスト"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.message_table import MessageTable
+from src.core.models import Attachment, Message
+
+
+def _make_message(message_id: int, **overrides) -> Message:
+    fields = {
+        "message_id": str(message_id),
+        "channel_id": "1100000000000000001",
+        "channel_name": "雑談",
+        "author_id": "1200000000000000002",
+        "author_name": "たろう",
+        "content": f"メッセージ {message_id} 🎉",
+        "timestamp": datetime(2024, 12, 15, 10, 0, message_id % 60),
+        "jump_url": f"https://discord.com/channels/1/1100000000000000001/{message_id}",
+    }
+    return Message(**{**fields, **overrides})
+
+
+def test_round_trip_preserves_all_fields():
+    """Message → テーブル → Message で全フィールドが一致する"""
+    messages = [
+        _make_message(1300000000000000001),
+        _make_message(
+            1300000000000000002,
+            thread_id="1400000000000000003",
+            thread_name="プロジェクトA",
+            content="",
+            has_attachment=True,
+            attachments=[
+                Attachment(
+                    filename="請求書.png",
+                    content_type="image/png",
+                    url="https://cdn.discordapp.com/attachments/1/2/invoice.png?ex=1",
+                    has_ocr=True,
+                    ocr_text="株式会社〇〇\n金額: 100,000円",
+                ),
+                Attachment(filename="memo.pdf", content_type="application/pdf", url="https://x/y"),
+            ],
+            synced_at=datetime(2024, 12, 16, 1, 2, 3, 456789),
+            file_search_doc_id="fileSearchStores/s/documents/d",
+        ),
+        _make_message(
+            1300000000000000004,
+            timestamp=datetime(2024, 12, 15, 1, 0, tzinfo=timezone.utc),
+            indexed_at=datetime(2024, 12, 16, tzinfo=timezone.utc),
+            jump_url="https://discord.com/channels/1/2/3",
+        ),
+    ]
+
+    table = MessageTable.from_messages(messages)
+
+    assert len(table) == 3
+    assert table.to_messages() == messages
+    assert table[-1] == messages[-1]
+
+
+def test_names_are_interned():
+    """チャンネル名・投稿者名は1つだけ保持する"""
+    table = MessageTable.from_messages(
+        _make_message(1300000000000000000 + i) for i in range(1, 101)
+    )
+
+    assert sorted(table.strings.values) == sorted([
+        "雑談", "たろう", "https://discord.com/channels/1/1100000000000000001/",
+    ])
+    assert len(table.contents.data) == sum(
+        len(f"メッセージ {1300000000000000000 + i} 🎉".encode()) for i in range(1, 101)
+    )
+
+
+@pytest.mark.parametrize("channel_id", ["general", "0123", "9223372036854775808", "１２３"])
+def test_non_snowflake_ids_are_rejected(channel_id):
+    """snowflake以外のIDは保持できない（列の長さは揃ったまま）"""
+    table = MessageTable()
+    with pytest.raises(ValueError):
+        table.append(_make_message(1, channel_id=channel_id))
+
+    assert len(table) == len(table.channel_ids) == 0
@@ -0,0 +1,57 @@
+"""OCR処理のテスト（抽出処理はダミー）"""
+
+import asyncio
+from pathlib import Path
+
+from src.core.singleflight import SingleFlight
+from src.jobs.downloader import DownloadedFile
+from src.jobs.ocr import OCRProcessor
+
+
+class _FakeDownloader:
+    """同じ内容の画像を呼び出しごとに別の一時ファイルへ保存するダミー"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.paths: list[Path] = []
+
+    async def download(self, url, filename) -> DownloadedFile:
+        path = self.directory / f"{len(self.paths)}.png"
+        path.write_text("請求書")
+        self.paths.append(path)
+        return DownloadedFile(path=path, sha256="same", size=path.stat().st_size)
+
+
+async def test_cancelled_caller_does_not_delete_file_used_by_shared_extraction(tmp_path):
+    """先に抽出を始めた呼び出し元がキャンセルされても、同じ画像を待つ呼び出し元は結果を受け取り、
+    一時ファイルは抽出の完了後に削除される"""
+    processor = OCRProcessor.__new__(OCRProcessor)
+    processor._inflight = SingleFlight()
+    processor.can_extract = lambda content_type: True
+    downloader = _FakeDownloader(tmp_path)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def extract_text_cached(sha256, path, filename, run):
+        started.set()
+        await release.wait()
+        return path.read_text()
+
+    processor._extract_text_cached = extract_text_cached
+
+    def process():
+        return asyncio.create_task(processor.process_attachment(
+            "https://cdn.example/a.png", "a.png", "image/png", downloader
+        ))
+
+    leader = process()
+    await started.wait()
+    follower = process()
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+
+    release.set()
+    assert await follower == "請求書"
+    assert leader.cancelled()
+    assert not any(path.exists() for path in downloader.paths)
@@ -0,0 +1,75 @@
+"""OCR結果キャッシュのテスト"""
+
+import hashlib
+
+from src.jobs.ocr_cache import OCRResultCache
+
+
+class _FakeRemote:
+    """FirestoreClient のOCRキャッシュ部分のダミー"""
+
+    def __init__(self):
+        self.docs: dict[str, tuple[str, float]] = {}
+
+    async def get_ocr_result(self, sha256):
+        return self.docs.get(sha256)
+
+    async def save_ocr_result(self, sha256, text, cpu_seconds):
+        self.docs[sha256] = (text, cpu_seconds)
+
+
+async def test_local_cache_persists_across_instances(tmp_path):
+    """SQLiteに保存した結果は別インスタンスからも取得できる"""
+    path = str(tmp_path / "ocr.sqlite3")
+    key = hashlib.sha256(b"screenshot").hexdigest()
+
+    cache = OCRResultCache(path=path)
+    assert await cache.get(key) is None
+    await cache.put(key, "請求書 100,000円", 2.5)
+    cache.close()
+
+    reopened = OCRResultCache(path=path)
+    assert await reopened.get(key) == "請求書 100,000円"
+    assert reopened.stats() == {
+        "hits": 1,
+        "local_hits": 1,
+        "remote_hits": 0,
+        "misses": 0,
+        "hit_ratio": 1.0,
+        "cpu_seconds_saved": 2.5,
+    }
+
+
+async def test_empty_result_is_cached(tmp_path):
+    """文字のない画像も再度推論しない"""
+    cache = OCRResultCache(path=str(tmp_path / "ocr.sqlite3"))
+    await cache.put("key", "", 1.0)
+
+    assert await cache.get("key") == ""
+
+
+async def test_remote_hit_fills_local_cache(tmp_path):
+    """Firestoreのヒットはローカルにも保存される"""
+    remote = _FakeRemote()
+    remote.docs["key"] = ("共有済み", 3.0)
+    cache = OCRResultCache(path=str(tmp_path / "ocr.sqlite3"), remote=remote)
+
+    assert await cache.get("key") == "共有済み"
+    remote.docs.clear()
+    assert await cache.get("key") == "共有済み"
+
+    stats = cache.stats()
+    assert stats["remote_hits"] == 1
+    assert stats["local_hits"] == 1
+    assert stats["cpu_seconds_saved"] == 6.0
+
+
+async def test_put_writes_to_remote(tmp_path):
+    """新しい結果はFirestoreにも保存される"""
+    remote = _FakeRemote()
+    cache = OCRResultCache(path="", remote=remote)
+
+    await cache.put("key", "text", 1.5)
+
+    assert remote.docs["key"] == ("text", 1.5)
+    assert cache.stats()["misses"] == 0
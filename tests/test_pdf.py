@@ -0,0 +1,97 @@
+"""PDFテキスト抽出のテスト"""
+
+import pytest
+
+pytest.importorskip("pypdfium2")
+
+from src.core.config import settings  # noqa: E402
+from src.jobs.ocr import OCRProcessor  # noqa: E402
+from src.jobs.pdf import extract_page, page_count  # noqa: E402
+
+
+def _make_pdf(path, pages: list[str]) -> None:
+    """ページごとのテキスト（空文字は白紙）からPDFを作成"""
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 24 Tf 72 720 Td ({text}) Tj ET".encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    path.write_bytes(bytes(out))
+
+
+def test_text_layer_is_extracted_without_ocr(tmp_path):
+    """テキストレイヤーのあるページはOCRしない"""
+    path = tmp_path / "invoice.pdf"
+    _make_pdf(path, ["Invoice total 100000 JPY"])
+
+    def ocr(image):
+        raise AssertionError("OCRされた")
+
+    assert page_count(path) == 1
+    assert extract_page(path, 0, ocr=ocr) == ("Invoice total 100000 JPY", "text")
+
+
+def test_page_without_text_falls_back_to_ocr(tmp_path):
+    """テキストのないページは画像化してOCRする"""
+    path = tmp_path / "scan.pdf"
+    _make_pdf(path, [""])
+    rendered = []
+
+    def ocr(image):
+        rendered.append(image)
+        return "scanned text"
+
+    assert extract_page(path, 0, ocr=ocr, render_dpi=72) == ("scanned text", "ocr")
+    assert rendered[0].size == (612, 792)
+    assert rendered[0].mode == "RGB"
+
+
+def test_page_without_text_and_ocr(tmp_path):
+    """OCRが使えない場合は白紙扱い"""
+    path = tmp_path / "scan.pdf"
+    _make_pdf(path, [""])
+
+    assert extract_page(path, 0) == ("", "empty")
+
+
+def test_short_text_layer_is_kept_when_ocr_finds_nothing(tmp_path):
+    """OCRで何も取れなければ短いテキストレイヤーを使う"""
+    path = tmp_path / "numbered.pdf"
+    _make_pdf(path, ["12"])
+
+    assert extract_page(path, 0, ocr=lambda image: "") == ("12", "text")
+
+
+async def test_pages_are_processed_in_order_up_to_limit(tmp_path, monkeypatch):
+    """ページはワーカープールで並行して処理し、上限までをページ順に結合する"""
+    path = tmp_path / "report.pdf"
+    _make_pdf(path, ["First page", "", "Third page", "Fourth page"])
+    monkeypatch.setattr(settings, "pdf_max_pages", 3)
+
+    processor = OCRProcessor(max_workers=2)
+    try:
+        text, _ = await processor._run_pdf(path, "report.pdf")
+    finally:
+        processor.shutdown()
+
+    assert text == "First page\n\nThird page"
+    assert sum(processor.stats()["pdf_pages"].values()) == 3
@@ -0,0 +1,86 @@
+"""OCR前処理のテスト"""
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from src.jobs.preprocess import preprocess_image  # noqa: E402
+
+
+def _text_image(width: int, height: int) -> "Image.Image":
+    """文字が並んだスクリーンショット風の画像"""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(10, height - 20, max(height // 20, 12)):
+        draw.text((10, y), "Invoice 2024-12 total 100,000 JPY " * 4, fill="black")
+    return image
+
+
+def test_large_image_is_downscaled(tmp_path):
+    """長辺の上限まで縮小する"""
+    path = tmp_path / "screenshot.png"
+    _text_image(4000, 2000).save(path)
+
+    prepared = preprocess_image(path, max_edge=2000)
+
+    assert not prepared.skipped
+    assert prepared.original_size == (4000, 2000)
+    assert prepared.image.size == (2000, 1000)
+
+
+def test_dpi_is_used_when_available(tmp_path):
+    """DPI情報があれば目標DPIまで縮小する"""
+    path = tmp_path / "scan.png"
+    _text_image(1200, 1200).save(path, dpi=(600, 600))
+
+    prepared = preprocess_image(path, target_dpi=200, max_edge=4000)
+
+    assert prepared.image.size == (400, 400)
+
+
+def test_small_image_is_not_upscaled(tmp_path):
+    """上限以下の画像はそのまま"""
+    path = tmp_path / "small.png"
+    _text_image(640, 480).save(path)
+
+    assert preprocess_image(path).image.size == (640, 480)
+
+
+def test_tiny_image_is_skipped(tmp_path):
+    """絵文字サイズの画像はOCRしない"""
+    path = tmp_path / "emoji.png"
+    Image.new("RGB", (24, 24), "red").save(path)
+
+    assert preprocess_image(path).skip_reason == "too_small"
+
+
+def test_blank_image_is_skipped(tmp_path):
+    """単色の画像はOCRしない"""
+    path = tmp_path / "blank.png"
+    Image.new("RGB", (800, 600), "white").save(path)
+
+    assert preprocess_image(path).skip_reason == "low_entropy"
+
+
+def test_smooth_image_is_skipped(tmp_path):
+    """エッジの少ない画像（グラデーション等）はOCRしない"""
+    path = tmp_path / "gradient.png"
+    gradient = Image.linear_gradient("L").resize((800, 800)).convert("RGB")
+    gradient.save(path)
+
+    assert preprocess_image(path).skip_reason == "no_text"
+
+
+def test_animated_gif_uses_first_frame(tmp_path):
+    """アニメーションGIFは先頭フレームを使う"""
+    path = tmp_path / "anim.gif"
+    first = _text_image(400, 300)
+    second = Image.new("RGB", (400, 300), "white")
+    first.save(path, save_all=True, append_images=[second], duration=100, loop=0)
+
+    prepared = preprocess_image(path)
+
+    assert not prepared.skipped
+    assert prepared.image.mode == "RGB"
+    assert prepared.image.getextrema() != ((255, 255), (255, 255), (255, 255))
@@ -0,0 +1,74 @@
+"""チャンネル同期スケジューラのテスト"""
+
+import asyncio
+import time
+
+from src.jobs.scheduler import ChannelScheduler, RateLimiter
+
+
+async def test_scheduler_runs_in_priority_order_with_limited_workers():
+    """先頭から順にワーカー数までの並行で処理される"""
+    scheduler = ChannelScheduler(concurrency=2)
+    started: list[str] = []
+    active = 0
+    max_active = 0
+
+    async def handler(name: str) -> None:
+        nonlocal active, max_active
+        started.append(name)
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    names = ["busy", "medium", "quiet1", "quiet2", "quiet3"]
+    await scheduler.run([(name, name) for name in names], handler)
+
+    assert started == names
+    assert max_active == 2
+    assert scheduler.stats()["channels"] == 5
+
+
+async def test_scheduler_wall_time_tracks_busiest_channel():
+    """所要時間は合計ではなく最も重いチャンネルに近くなる"""
+    scheduler = ChannelScheduler(concurrency=4)
+    durations = {"busy": 0.1, "a": 0.02, "b": 0.02, "c": 0.02, "d": 0.02}
+
+    async def handler(name: str) -> None:
+        await asyncio.sleep(durations[name])
+
+    await scheduler.run([(name, name) for name in durations], handler)
+
+    stats = scheduler.stats()
+    assert stats["busiest_channel"] == "busy"
+    assert stats["wall_seconds"] < sum(durations.values())
+
+
+async def test_scheduler_continues_after_handler_error():
+    """1チャンネルの失敗で他のチャンネルは止まらない"""
+    scheduler = ChannelScheduler(concurrency=1)
+    done: list[str] = []
+
+    async def handler(name: str) -> None:
+        if name == "broken":
+            raise RuntimeError("boom")
+        done.append(name)
+
+    await scheduler.run([("broken", "broken"), ("ok", "ok")], handler)
+
+    assert done == ["ok"]
+
+
+async def test_rate_limiter_paces_requests():
+    """バースト分を超えるとレートに合わせて待機する"""
+    limiter = RateLimiter(rate_per_second=100, burst=2)
+
+    start = time.monotonic()
+    for _ in range(6):
+        await limiter.acquire()
+    elapsed = time.monotonic() - start
+
+    # 2件はバースト、残り4件は10msずつ待機
+    assert elapsed >= 0.035
+    assert limiter.acquired_count == 6
+    assert limiter.wait_seconds > 0
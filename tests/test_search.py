@@ -0,0 +1,101 @@
+"""検索コマンド（Gemini検索のキャッシュ・集約）のテスト"""
+
+import asyncio
+
+import pytest
+
+from src.bot.commands import search
+from src.bot.commands.search import SearchCog
+from src.core.search_cache import make_cache_key
+
+RESULTS = [{"message_id": "1", "reason": "", "highlight": ""}]
+
+
+class _FakeGemini:
+    """GeminiClient の検索部分のダミー"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.call_count = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def search_with_context(self, query, previous_results=None):
+        self.call_count += 1
+        self.started.set()
+        await self.release.wait()
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, "response"
+
+
+@pytest.fixture
+def cog():
+    return SearchCog(bot=None)
+
+
+def _use_gemini(monkeypatch, gemini: _FakeGemini) -> None:
+    monkeypatch.setattr(search, "get_gemini_client", lambda: gemini)
+
+
+async def test_search_error_is_not_cached(cog, monkeypatch):
+    """Geminiのエラーは0件の結果としてキャッシュせず、次の検索で再実行する"""
+    gemini = _FakeGemini(TimeoutError("deadline exceeded"), RESULTS)
+    _use_gemini(monkeypatch, gemini)
+
+    with pytest.raises(TimeoutError):
+        await cog._search_gemini("請求書")
+    assert len(cog.search_cache) == 0
+
+    assert await cog._search_gemini("請求書") == (RESULTS, "response")
+    assert gemini.call_count == 2
+
+
+async def test_unparseable_response_is_empty_and_not_cached(cog, monkeypatch):
+    """結果として読めない応答は0件として返し、キャッシュしない"""
+    gemini = _FakeGemini(None, RESULTS)
+    _use_gemini(monkeypatch, gemini)
+
+    assert await cog._search_gemini("請求書") == ([], "response")
+    assert len(cog.search_cache) == 0
+
+    assert await cog._search_gemini("請求書") == (RESULTS, "response")
+    assert gemini.call_count == 2
+
+
+async def test_result_fetched_across_invalidation_is_not_cached(cog, monkeypatch):
+    """検索中にインデックスが更新された場合、その結果はキャッシュしない"""
+    gemini = _FakeGemini(RESULTS)
+    gemini.release.clear()
+    _use_gemini(monkeypatch, gemini)
+
+    task = asyncio.create_task(cog._search_gemini("請求書"))
+    await gemini.started.wait()
+    cog.search_cache.invalidate()
+    cog._index_version = "2"
+    gemini.release.set()
+
+    assert await task == (RESULTS, "response")
+    assert cog.search_cache.get(make_cache_key("請求書")) is None
+
+
+async def test_search_error_is_raised_to_every_coalesced_caller(cog, monkeypatch):
+    """集約中の検索が失敗した場合、全ての呼び出し元に例外を送出して再実行できるようにする"""
+    gemini = _FakeGemini(ConnectionError("503"), RESULTS)
+    gemini.release.clear()
+    _use_gemini(monkeypatch, gemini)
+
+    callers = [asyncio.create_task(cog._search_gemini("請求書")) for _ in range(3)]
+    await gemini.started.wait()
+    gemini.release.set()
+    outcomes = await asyncio.gather(*callers, return_exceptions=True)
+
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+    assert gemini.call_count == 1
+    assert cog.search_flight.stats()["in_flight"] == 0
+    assert len(cog.search_cache) == 0
+
+    assert await cog._search_gemini("請求書") == (RESULTS, "response")
+    assert gemini.call_count == 2
@@ -0,0 +1,79 @@
+"""検索結果キャッシュのテスト"""
+
+import time
+
+from src.core.search_cache import SearchResultCache, make_cache_key
+
+RESULTS = [{"message_id": "1", "reason": "", "highlight": ""}]
+
+
+def test_cache_key_normalizes_query():
+    """全角・大文字・空白の違いは同じキーになる"""
+    assert make_cache_key("ＡＢＣ　会議") == make_cache_key(" abc 会議 ")
+    assert make_cache_key("会議", ["1", "2"]) != make_cache_key("会議")
+
+
+def test_cache_hit_and_miss_counts():
+    """ヒット率を記録する"""
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=60)
+    key = make_cache_key("会議")
+
+    assert cache.get(key) is None
+    cache.put(key, RESULTS, "text")
+
+    assert cache.get(key) == (RESULTS, "text")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    """上限を超えたら最も古く使われたエントリを破棄する"""
+    cache = SearchResultCache(max_size=2, ttl_seconds=60, negative_ttl_seconds=60)
+    a, b, c = make_cache_key("a"), make_cache_key("b"), make_cache_key("c")
+
+    cache.put(a, RESULTS, "")
+    cache.put(b, RESULTS, "")
+    cache.get(a)
+    cache.put(c, RESULTS, "")
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    assert cache.get(c) is not None
+
+
+def test_negative_results_use_short_ttl():
+    """0件の結果は短い有効期限でキャッシュする"""
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=0.01)
+    key = make_cache_key("なし")
+
+    cache.put(key, [], "")
+    assert cache.get(key) == ([], "")
+
+    time.sleep(0.02)
+    assert cache.get(key) is None
+
+
+def test_invalidate_clears_entries():
+    """インデックス更新時は全エントリを破棄する"""
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=60)
+    cache.put(make_cache_key("a"), RESULTS, "")
+
+    cache.invalidate()
+
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_put_skips_results_fetched_before_invalidate():
+    """検索中に invalidate() された場合、古いインデックスの結果は保存しない"""
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=60)
+    key = make_cache_key("a")
+    generation = cache.generation
+
+    cache.invalidate()
+    cache.put(key, RESULTS, "", generation=generation)
+
+    assert cache.get(key) is None
+    cache.put(key, RESULTS, "", generation=cache.generation)
+    assert cache.get(key) == (RESULTS, "")
@@ -0,0 +1,87 @@
+"""single-flightのテスト"""
+
+import asyncio
+
+import pytest
+
+from src.core.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    """同じキーの同時呼び出しは1回だけ実行される"""
+    flight = SingleFlight()
+    executions = 0
+
+    async def fetch():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return ["result"]
+
+    results = await asyncio.gather(*(flight.do("query", fetch) for _ in range(5)))
+
+    assert results == [["result"]] * 5
+    assert executions == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+async def test_different_keys_run_separately():
+    """異なるキーはそれぞれ実行される"""
+    flight = SingleFlight()
+
+    async def fetch(value):
+        await asyncio.sleep(0)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: fetch("a")),
+        flight.do("b", lambda: fetch("b")),
+    )
+
+    assert results == ["a", "b"]
+    assert flight.stats()["coalesced"] == 0
+
+
+async def test_exception_is_shared_and_key_released():
+    """例外は全ての呼び出し元に伝わり、次の呼び出しは再実行される"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("gemini error")
+
+    results = await asyncio.gather(
+        flight.do("q", fail), flight.do("q", fail), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def ok():
+        return "ok"
+
+    assert await flight.do("q", ok) == "ok"
+    assert flight.stats()["calls"] == 2
+
+
+async def test_cancelled_shared_call_is_not_reported_as_caller_cancellation():
+    """共有中の処理がキャンセルされた場合、待っている呼び出し元には RuntimeError を送出する"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    leader = asyncio.create_task(flight.do("q", slow))
+    follower = asyncio.create_task(flight.do("q", slow))
+    await started.wait()
+
+    # 呼び出し元自身のキャンセルはそのまま伝わり、共有中の処理は継続する
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert flight.stats()["in_flight"] == 1
+
+    flight._calls["q"].cancel()
+    with pytest.raises(RuntimeError):
+        await follower
+    assert flight.stats()["in_flight"] == 0
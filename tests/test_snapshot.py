@@ -0,0 +1,246 @@
+"""メッセージスナップショットのテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core.firestore import FirestoreClient
+from src.core.message_table import MessageTable
+from src.core.models import Attachment, Message
+from src.core.snapshot import (
+    SYNC_WRITE_LAG,
+    load_snapshot,
+    messages_by_channel,
+    read_snapshot_info,
+    refresh_snapshot,
+    save_snapshot,
+)
+
+
+def _make_message(message_id: int, channel_id: str = "1100000000000000001", **overrides) -> Message:
+    fields = {
+        "message_id": str(message_id),
+        "channel_id": channel_id,
+        "channel_name": "雑談",
+        "author_id": "1200000000000000002",
+        "author_name": "たろう",
+        "content": f"メッセージ {message_id}",
+        "timestamp": datetime(2024, 12, 15, 10, 0, message_id % 60, tzinfo=timezone.utc),
+        "jump_url": f"https://discord.com/channels/1/{channel_id}/{message_id}",
+    }
+    return Message(**{**fields, **overrides})
+
+
+def _sample_messages() -> list[Message]:
+    return [
+        _make_message(1300000000000000001),
+        _make_message(
+            1300000000000000002,
+            thread_id="1400000000000000003",
+            thread_name="プロジェクトA",
+            has_attachment=True,
+            attachments=[
+                Attachment(
+                    filename="請求書.png",
+                    content_type="image/png",
+                    url="https://cdn.discordapp.com/attachments/1/2/invoice.png",
+                    has_ocr=True,
+                    ocr_text="株式会社〇〇\n金額: 100,000円",
+                )
+            ],
+            synced_at=datetime(2024, 12, 15, 10, 5, 30, 123456),
+            indexed_at=datetime(2024, 12, 16),
+            file_search_doc_id="fileSearchStores/s/documents/d",
+        ),
+        _make_message(1300000000000000003, channel_id="1100000000000000000"),
+    ]
+
+
+class _FakeQuery:
+    """messages コレクションのクエリのダミー
+
+    Firestoreと同様に synced_at（ISO 8601 文字列）を文字列として比較し、
+    synced_at のないドキュメントは返さない。返したドキュメント数を記録する。
+    """
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+        self.filters: list[tuple] = []
+        self.read_count = 0
+        self._limit = None
+        self._after = None
+
+    def where(self, field, op, value):
+        assert (field, op) == ("synced_at", ">=")
+        self.filters.append((field, op, value))
+        return self
+
+    def order_by(self, field):
+        assert field == "synced_at"
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def start_after(self, doc):
+        self._after = doc
+        return self
+
+    async def stream(self):
+        _, _, since = self.filters[-1]
+        docs = sorted(
+            (d for d in self.docs if d["synced_at"] is not None and d["synced_at"] >= since),
+            key=lambda d: d["synced_at"],
+        )
+        if self._after is not None:
+            docs = docs[docs.index(self._after.data) + 1:]
+        for data in docs[:self._limit]:
+            self.read_count += 1
+            yield _FakeDoc(data)
+
+
+class _FakeDoc:
+    def __init__(self, data: dict):
+        self.data = data
+
+    def to_dict(self) -> dict:
+        return dict(self.data)
+
+
+def _firestore_client(messages: list[Message]) -> tuple[FirestoreClient, _FakeQuery]:
+    """messages_ref をダミーに差し替えた FirestoreClient"""
+    client = FirestoreClient.__new__(FirestoreClient)
+    client.messages_ref = _FakeQuery([msg.model_dump(mode="json") for msg in messages])
+
+    async def stream_messages():
+        for msg in messages:
+            yield msg
+
+    client.stream_messages = stream_messages
+    return client, client.messages_ref
+
+
+def _synced_message(message_id: int, synced_at: datetime) -> Message:
+    return _make_message(message_id, synced_at=synced_at)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(tmp_path, compress, use_mmap):
+    """保存・読み込みで全メッセージが一致する"""
+    messages = _sample_messages()
+    path = tmp_path / "messages.snapshot"
+    save_snapshot(MessageTable.from_messages(messages), path, compress=compress)
+
+    table = load_snapshot(path, use_mmap=use_mmap)
+
+    assert table.to_messages() == messages
+    info = read_snapshot_info(path)
+    assert info["rows"] == 3
+    assert info["last_synced_at"] == "2024-12-15T10:05:30.123456"
+
+
+def test_mmap_table_is_read_only_and_loaded_table_is_appendable(tmp_path):
+    """メモリマップしたテーブルは追記できず、全列を読み込んだテーブルは追記できる"""
+    path = tmp_path / "messages.snapshot"
+    save_snapshot(MessageTable.from_messages(_sample_messages()), path)
+
+    with pytest.raises(AttributeError):
+        load_snapshot(path).append(_make_message(1300000000000000004))
+
+    table = load_snapshot(path, use_mmap=False)
+    table.append(_make_message(1300000000000000004, channel_name="雑談"))
+    assert len(table) == 4
+    # 文字列プールの番号は読み込み前のものを引き継ぐ
+    assert len(table.strings) == len(load_snapshot(path).strings)
+
+
+def test_empty_table(tmp_path):
+    path = tmp_path / "messages.snapshot"
+    save_snapshot(MessageTable(), path)
+
+    assert len(load_snapshot(path)) == 0
+    assert read_snapshot_info(path)["last_synced_at"] is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "messages.snapshot"
+    path.write_bytes(b"PAR1" + b"\x00" * 32)
+
+    with pytest.raises(ValueError):
+        load_snapshot(path)
+
+
+def test_messages_by_channel_orders_by_channel_and_time():
+    table = MessageTable.from_messages(_sample_messages())
+
+    ordered = [msg.message_id for msg in messages_by_channel(table)]
+
+    assert ordered == ["1300000000000000003", "1300000000000000001", "1300000000000000002"]
+
+
+async def test_refresh_appends_messages_synced_since_last_refresh(tmp_path):
+    """前回以降に保存されたメッセージは、投稿時刻・IDが古くても追記する"""
+    path = tmp_path / "messages.snapshot"
+    base = datetime(2024, 12, 15, 10, 0)
+    messages = [
+        _synced_message(1300000000000000010 + i, base + timedelta(minutes=i)) for i in range(3)
+    ]
+    client, query = _firestore_client(messages)
+
+    table, added = await refresh_snapshot(client, path)
+    assert added == 3
+    assert query.filters == []
+
+    new_messages = [
+        # 最新の同期日時より前に記録され、後から書き込まれたメッセージ
+        _synced_message(1300000000000000020, base + timedelta(minutes=1, seconds=30)),
+        # 再開・再取得で後から保存された、既存の最大IDより古いメッセージ
+        _synced_message(1300000000000000001, base + timedelta(minutes=5)),
+    ]
+    client.messages_ref.docs += [msg.model_dump(mode="json") for msg in new_messages]
+    table, added = await refresh_snapshot(client, path)
+
+    assert added == 2
+    assert load_snapshot(path).to_messages() == messages + new_messages
+    assert read_snapshot_info(path)["last_synced_at"] == (base + timedelta(minutes=5)).isoformat()
+
+    _, added = await refresh_snapshot(client, path)
+    assert added == 0
+
+
+async def test_refresh_bounds_query_by_last_synced_at(tmp_path):
+    """ヘッダーの最新の同期日時から SYNC_WRITE_LAG 以上前に保存されたメッセージは読まない"""
+    path = tmp_path / "messages.snapshot"
+    last_synced_at = datetime(2024, 12, 15, 10, 30, 5, 250_000)
+    old = [
+        _synced_message(1300000000000000001 + i, datetime(2019 + i, 6, 1)) for i in range(3)
+    ]
+    latest = _synced_message(1300000000000000007, last_synced_at)
+    # 同期日時の記録がないメッセージ（差分更新では取得されない）
+    unsynced = _make_message(1300000000000000008)
+    client, query = _firestore_client(old + [latest, unsynced])
+    await refresh_snapshot(client, path)
+
+    query.read_count = 0
+    _, added = await refresh_snapshot(client, path)
+
+    assert added == 0
+    since = last_synced_at - SYNC_WRITE_LAG
+    assert query.filters == [("synced_at", ">=", since.strftime("%Y-%m-%dT%H:%M:%S"))]
+    assert query.read_count == 1
+
+
+async def test_refresh_exports_all_without_synced_at(tmp_path):
+    """同期日時の記録がないスナップショットは全件エクスポートし直す"""
+    path = tmp_path / "messages.snapshot"
+    messages = [_make_message(1300000000000000001 + i) for i in range(2)]
+    save_snapshot(MessageTable.from_messages(messages[:1]), path)
+    client, query = _firestore_client(messages)
+
+    table, added = await refresh_snapshot(client, path)
+
+    assert added == 2
+    assert query.filters == []
+    assert load_snapshot(path).to_messages() == messages
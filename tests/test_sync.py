@@ -0,0 +1,386 @@
+"""メッセージ同期ジョブのテスト（Discord・Firestore・Geminiはダミー）"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from discord.utils import snowflake_time
+
+from src.core.chunker import group_messages_into_chunks
+from src.core.models import Message, SyncStatus
+from src.jobs import main as sync_main
+from src.jobs import sync
+from src.jobs.sync import MessageSyncer
+
+CHANNEL_ID = 1100000000000000001
+
+
+class _FakeFirestore:
+    """同期ジョブが使うFirestore操作の記録"""
+
+    def __init__(self, failing_ids: set[str] = frozenset(), existing_ids: list[str] = ()):
+        self.failing_ids = failing_ids
+        # 前回までに保存済みのメッセージID
+        self.existing_ids = list(existing_ids)
+        self.known_id_queries: list[datetime | None] = []
+        self.saved_ids: list[str] = []
+        self.watermarks: dict[str, str | None] = {}
+        self.checkpoints: list[str] = []
+        self.completed_channel_ids: list[str] = []
+        self.last_status: SyncStatus | None = None
+
+    async def save_messages(self, messages) -> int:
+        # バッチコミットの待ち時間（並行同期中の他のチャンネルに処理を譲る）
+        await asyncio.sleep(0)
+        saved = [msg.message_id for msg in messages if msg.message_id not in self.failing_ids]
+        self.saved_ids += saved
+        return len(saved)
+
+    async def get_message_ids_by_channel(self, channel_id: str, since=None) -> list[str]:
+        self.known_id_queries.append(since)
+        return [
+            message_id for message_id in self.existing_ids
+            if since is None or snowflake_time(int(message_id)) >= since.replace(microsecond=0)
+        ]
+
+    async def update_sync_progress(self, sync_id, last_channel_id=None, last_message_id=None,
+                                   processed_count=None) -> None:
+        self.checkpoints.append(last_message_id)
+
+    async def mark_channel_synced(self, channel_id, channel_name, last_message_id=None) -> None:
+        self.watermarks[channel_id] = last_message_id
+
+    async def complete_channel_sync(self, sync_id: str, channel_id: str) -> None:
+        self.completed_channel_ids.append(channel_id)
+
+    async def get_last_sync_status(self) -> SyncStatus | None:
+        return self.last_status
+
+
+class _FakeGemini:
+    """チャンクのアップロード・ドキュメント削除の記録"""
+
+    def __init__(self, events: list[tuple], fail_uploads: bool = False):
+        self.events = events
+        self.fail_uploads = fail_uploads
+
+    async def index_conversation_chunks(self, items):
+        self.events.append(("index", [chunk.chunk_id for chunk, _ in items]))
+        if self.fail_uploads:
+            return [None] * len(items)
+        return [f"fileSearchStores/s/documents/new-{i}" for i in range(len(items))]
+
+    async def delete_document(self, document_name: str) -> bool:
+        self.events.append(("delete_document", document_name))
+        return True
+
+
+class _FakeChannel:
+    def __init__(self, message_ids: list[int], channel_id: int = CHANNEL_ID):
+        self.id = channel_id
+        self.name = "雑談"
+        self.message_ids = message_ids
+        self.last_message_id = message_ids[-1]
+
+    async def history(self, **kwargs):
+        for message_id in self.message_ids:
+            yield SimpleNamespace(
+                id=message_id,
+                attachments=[],
+                author=SimpleNamespace(id=1200000000000000002, display_name="たろう"),
+                content=f"メッセージ {message_id}",
+                created_at=datetime(2024, 12, 15, 10, 0, message_id % 60, tzinfo=timezone.utc),
+                jump_url=f"https://discord.com/channels/1/{self.id}/{message_id}",
+            )
+
+
+@pytest.fixture
+def syncer_with(monkeypatch):
+    """ダミーのFirestoreを使う MessageSyncer（インデックスは行わない）"""
+    monkeypatch.setattr(sync.settings, "sync_batch_size", 2)
+
+    def make(firestore: _FakeFirestore) -> MessageSyncer:
+        monkeypatch.setattr(sync, "get_firestore_client", lambda: firestore)
+        syncer = MessageSyncer(client=None)
+
+        async def index_new_messages(channel_id, new_messages):
+            pass
+
+        syncer._index_new_messages = index_new_messages
+        return syncer
+
+    return make
+
+
+async def test_channel_is_completed_after_all_writes_succeed(syncer_with):
+    firestore = _FakeFirestore()
+    syncer = syncer_with(firestore)
+    message_ids = [1300000000000000001 + i for i in range(5)]
+
+    await syncer._sync_scheduled_channel(_FakeChannel(message_ids), {}, None, "sync-1")
+
+    assert firestore.saved_ids == [str(i) for i in message_ids]
+    assert firestore.watermarks == {str(CHANNEL_ID): str(message_ids[-1])}
+    assert firestore.completed_channel_ids == [str(CHANNEL_ID)]
+
+
+async def test_failed_write_holds_back_checkpoint_and_completion(syncer_with):
+    """書き込みに失敗したチャンネルは完了にせず、チェックポイントも失敗以降は進めない"""
+    message_ids = [1300000000000000001 + i for i in range(6)]
+    firestore = _FakeFirestore(failing_ids={str(message_ids[2])})
+    syncer = syncer_with(firestore)
+    watermark = 1300000000000000000
+
+    await syncer._sync_scheduled_channel(
+        _FakeChannel(message_ids), {str(CHANNEL_ID): watermark}, None, "sync-1"
+    )
+
+    assert firestore.checkpoints == [str(message_ids[1])]
+    assert firestore.watermarks == {str(CHANNEL_ID): str(watermark)}
+    assert firestore.completed_channel_ids == []
+
+
+async def test_failed_commit_is_charged_to_its_own_channel(syncer_with):
+    """並行同期で一方のチャンネルのバッチコミットが失敗しても、他方のチャンネルは
+    ウォーターマークを進めて完了し、失敗したチャンネルだけを保留する"""
+    ok_ids = [1300000000000000001 + i for i in range(5)]
+    failing_ids = [1300000000000000101 + i for i in range(5)]
+    failing_channel_id = CHANNEL_ID + 1
+    firestore = _FakeFirestore(failing_ids={str(i) for i in failing_ids})
+    syncer = syncer_with(firestore)
+    watermark = 1300000000000000000
+    watermarks = {str(CHANNEL_ID): watermark, str(failing_channel_id): watermark}
+
+    await asyncio.gather(
+        syncer._sync_scheduled_channel(_FakeChannel(ok_ids), watermarks, None, "sync-1"),
+        syncer._sync_scheduled_channel(
+            _FakeChannel(failing_ids, failing_channel_id), watermarks, None, "sync-1"
+        ),
+    )
+
+    assert firestore.saved_ids == [str(i) for i in ok_ids]
+    assert firestore.watermarks == {
+        str(CHANNEL_ID): str(ok_ids[-1]),
+        str(failing_channel_id): str(watermark),
+    }
+    assert firestore.completed_channel_ids == [str(CHANNEL_ID)]
+    assert syncer._write_stats()["failed"] == len(failing_ids)
+
+
+async def test_incremental_sync_skips_messages_saved_after_watermark(syncer_with):
+    """ウォーターマークより後の保存済みメッセージ（前回ウォーターマークを進めなかった分）は
+    Firestoreから読み込んだ同期済みIDで除き、保存し直さない"""
+    watermark = 1300000000000000000
+    message_ids = [watermark + 1 + i for i in range(6)]
+    firestore = _FakeFirestore(existing_ids=[str(i) for i in message_ids[:3]])
+    syncer = syncer_with(firestore)
+
+    await syncer._sync_scheduled_channel(
+        _FakeChannel(message_ids), {str(CHANNEL_ID): watermark}, None, "sync-1"
+    )
+
+    assert firestore.known_id_queries == [snowflake_time(watermark)]
+    assert firestore.saved_ids == [str(i) for i in message_ids[3:]]
+    assert syncer.known_id_hits == 3
+    assert firestore.watermarks == {str(CHANNEL_ID): str(message_ids[-1])}
+
+
+async def test_resumed_channel_skips_messages_saved_after_checkpoint(syncer_with):
+    """再開時はチェックポイントより後に保存済みのメッセージ（中断前に保存した分）を除く"""
+    watermark = 1300000000000000000
+    checkpoint = watermark + 2
+    message_ids = [checkpoint + 1 + i for i in range(5)]
+    # 中断前にチェックポイントより後の2件まで保存済み
+    firestore = _FakeFirestore(existing_ids=[str(i) for i in message_ids[:2]])
+    syncer = syncer_with(firestore)
+    syncer._checkpoints = {str(CHANNEL_ID): checkpoint}
+
+    await syncer._sync_scheduled_channel(
+        _FakeChannel(message_ids), {str(CHANNEL_ID): watermark}, None, "sync-1"
+    )
+
+    assert firestore.known_id_queries == [snowflake_time(checkpoint)]
+    assert firestore.saved_ids == [str(i) for i in message_ids[2:]]
+    assert firestore.completed_channel_ids == [str(CHANNEL_ID)]
+
+
+async def test_processing_failure_holds_watermark_before_failed_message(syncer_with):
+    """処理に失敗したメッセージの直前までしかウォーターマークを進めない"""
+    firestore = _FakeFirestore()
+    syncer = syncer_with(firestore)
+    message_ids = [1300000000000000001 + i for i in range(6)]
+    process_message = syncer._process_message
+
+    async def failing_process_message(discord_msg, channel, known_ids):
+        if discord_msg.id == message_ids[3]:
+            raise RuntimeError("OCR失敗")
+        return await process_message(discord_msg, channel, known_ids)
+
+    syncer._process_message = failing_process_message
+    await syncer._sync_scheduled_channel(_FakeChannel(message_ids), {}, None, "sync-1")
+
+    # 失敗したメッセージ以外は保存する
+    assert len(firestore.saved_ids) == 5
+    assert firestore.checkpoints == [str(message_ids[1])]
+    assert firestore.watermarks == {str(CHANNEL_ID): str(message_ids[2])}
+    assert firestore.completed_channel_ids == []
+    assert syncer.failed_message_count == 1
+
+
+async def test_message_processing_is_bounded(syncer_with, monkeypatch):
+    """同時に処理するメッセージ数は sync_message_concurrency 以下"""
+    monkeypatch.setattr(sync.settings, "sync_batch_size", 100)
+    monkeypatch.setattr(sync.settings, "sync_message_concurrency", 3)
+    firestore = _FakeFirestore()
+    syncer = syncer_with(firestore)
+    message_ids = [1300000000000000001 + i for i in range(20)]
+    process_message = syncer._process_message
+    running = peak = 0
+
+    async def slow_process_message(discord_msg, channel, known_ids):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return await process_message(discord_msg, channel, known_ids)
+
+    syncer._process_message = slow_process_message
+    await syncer._sync_scheduled_channel(_FakeChannel(message_ids), {}, None, "sync-1")
+
+    assert peak == 3
+    assert firestore.watermarks == {str(CHANNEL_ID): str(message_ids[-1])}
+
+
+def _chat_message(message_id: int, minutes: int) -> Message:
+    return Message(
+        message_id=str(message_id),
+        channel_id=str(CHANNEL_ID),
+        channel_name="雑談",
+        author_id="1200000000000000002",
+        author_name="たろう",
+        content=f"メッセージ {message_id}",
+        timestamp=datetime(2024, 12, 15, 10, 0) + timedelta(minutes=minutes),
+        jump_url=f"https://discord.com/channels/1/{CHANNEL_ID}/{message_id}",
+    )
+
+
+def _open_chunk_syncer(monkeypatch) -> tuple[MessageSyncer, list[tuple], _FakeGemini, str]:
+    """インデックス済みの末尾チャンク（3件）があるチャンネルの MessageSyncer
+
+    Returns:
+        (syncer, 記録されたイベント, ダミーのGemini, 末尾チャンクのID)
+    """
+    old_messages = [_chat_message(1300000000000000001 + i, i) for i in range(3)]
+    open_chunk = group_messages_into_chunks(old_messages)[0]
+    open_chunk.content_hash = open_chunk.compute_content_hash(old_messages)
+    open_chunk.file_search_doc_id = "fileSearchStores/s/documents/old"
+
+    events = []
+    firestore = _FakeFirestore()
+
+    async def get_latest_chunk(channel_id):
+        return open_chunk
+
+    async def get_messages_by_ids(message_ids):
+        return old_messages, []
+
+    async def save_chunk(chunk):
+        events.append(("save_chunk", chunk.chunk_id))
+
+    firestore.get_latest_chunk = get_latest_chunk
+    firestore.get_messages_by_ids = get_messages_by_ids
+    firestore.save_chunk = save_chunk
+    gemini = _FakeGemini(events)
+    monkeypatch.setattr(sync, "get_firestore_client", lambda: firestore)
+    monkeypatch.setattr(sync, "get_gemini_client", lambda: gemini)
+    return MessageSyncer(client=None), events, gemini, open_chunk.chunk_id
+
+
+@pytest.mark.parametrize("fail_uploads", [False, True])
+async def test_open_chunk_document_is_deleted_after_replacement_upload(
+    monkeypatch, fail_uploads
+):
+    """更新した末尾チャンクの古いドキュメントは新しいドキュメントの保存後に削除する"""
+    syncer, events, gemini, chunk_id = _open_chunk_syncer(monkeypatch)
+    gemini.fail_uploads = fail_uploads
+
+    await syncer._index_new_messages(str(CHANNEL_ID), [_chat_message(1300000000000000004, 3)])
+
+    if fail_uploads:
+        # アップロードに失敗した場合は古いドキュメントを残す
+        assert events == [("index", [chunk_id])]
+    else:
+        assert events == [
+            ("index", [chunk_id]),
+            ("save_chunk", chunk_id),
+            ("delete_document", "fileSearchStores/s/documents/old"),
+        ]
+
+
+async def test_open_chunk_document_is_deleted_after_failed_then_successful_upload(monkeypatch):
+    """再アップロードに失敗した末尾チャンクは、次の更新の保存後に古いドキュメントを削除する"""
+    syncer, events, gemini, chunk_id = _open_chunk_syncer(monkeypatch)
+
+    gemini.fail_uploads = True
+    await syncer._index_new_messages(str(CHANNEL_ID), [_chat_message(1300000000000000004, 3)])
+    gemini.fail_uploads = False
+    await syncer._index_new_messages(str(CHANNEL_ID), [_chat_message(1300000000000000005, 4)])
+
+    assert events == [
+        ("index", [chunk_id]),
+        ("index", [chunk_id]),
+        ("save_chunk", chunk_id),
+        ("delete_document", "fileSearchStores/s/documents/old"),
+    ]
+
+
+async def test_failed_document_delete_is_retried(monkeypatch):
+    """古いドキュメントの削除に失敗した場合は次の更新時に再試行する"""
+    syncer, events, gemini, chunk_id = _open_chunk_syncer(monkeypatch)
+    delete_document = gemini.delete_document
+    failures = iter([True])
+
+    async def flaky_delete_document(document_name):
+        await delete_document(document_name)
+        return not next(failures, False)
+
+    gemini.delete_document = flaky_delete_document
+    await syncer._index_new_messages(str(CHANNEL_ID), [_chat_message(1300000000000000004, 3)])
+    await syncer._index_new_messages(str(CHANNEL_ID), [_chat_message(1300000000000000005, 4)])
+
+    deleted = [name for event, name in events if event == "delete_document"]
+    assert deleted == [
+        "fileSearchStores/s/documents/old",
+        "fileSearchStores/s/documents/old",
+        "fileSearchStores/s/documents/new-0",
+    ]
+    assert syncer._stale_documents == {}
+
+
+@pytest.mark.parametrize(
+    ("status", "resume_count", "resumable"),
+    [
+        ("in_progress", 0, True),
+        ("failed", 1, True),
+        ("failed", sync_main.MAX_RESUME_FAILURES, False),
+        # 強制終了（in_progress のまま）を繰り返す同期も上限で打ち切る
+        ("in_progress", sync_main.MAX_RESUME_FAILURES, False),
+        ("completed", 0, False),
+    ],
+)
+async def test_find_resumable_sync_caps_resume_attempts(
+    monkeypatch, status, resume_count, resumable
+):
+    firestore = _FakeFirestore()
+    firestore.last_status = SyncStatus(
+        sync_id="sync-1",
+        status=status,
+        resume_count=resume_count,
+    )
+    monkeypatch.setattr(sync_main, "get_firestore_client", lambda: firestore)
+
+    result = await sync_main.find_resumable_sync()
+
+    assert (result is not None) == resumable
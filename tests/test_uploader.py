@@ -0,0 +1,74 @@
+"""並行アップロードエンジンのテスト"""
+
+from types import SimpleNamespace
+
+from src.core.uploader import FileSearchUploader
+
+
+class _FakeAio:
+    """genai.Client.aio のダミー（2回目のポーリングで完了）"""
+
+    def __init__(self, fail_names: set[str] = frozenset()):
+        self.fail_names = fail_names
+        self.active_uploads = 0
+        self.max_active_uploads = 0
+        self._polls: dict[str, int] = {}
+        self.file_search_stores = SimpleNamespace(upload_to_file_search_store=self._upload)
+        self.operations = SimpleNamespace(get=self._get)
+
+    async def _upload(self, file, file_search_store_name, config):
+        self.active_uploads += 1
+        self.max_active_uploads = max(self.max_active_uploads, self.active_uploads)
+        name = config["display_name"]
+        if name in self.fail_names:
+            self.active_uploads -= 1
+            raise RuntimeError("upload failed")
+        self._polls[name] = 0
+        return SimpleNamespace(name=name, done=False, error=None, response=None)
+
+    async def _get(self, operation):
+        self._polls[operation.name] += 1
+        if self._polls[operation.name] < 2:
+            return operation
+        self.active_uploads -= 1
+        return SimpleNamespace(
+            name=operation.name,
+            done=True,
+            error=None,
+            response=SimpleNamespace(document_name=f"fileSearchStores/s/documents/{operation.name}"),
+        )
+
+
+async def test_upload_many_returns_document_names_in_order():
+    """アップロード結果は入力順のドキュメント名で返る"""
+    aio = _FakeAio()
+    uploader = FileSearchUploader(SimpleNamespace(aio=aio), concurrency=4, poll_interval_seconds=0)
+
+    items = [(f"chunk_{i}", f"content {i}") for i in range(10)]
+    results = await uploader.upload_many("store", items)
+
+    assert results == [f"fileSearchStores/s/documents/chunk_{i}" for i in range(10)]
+    assert uploader.stats()["completed"] == 10
+    assert uploader.stats()["in_flight"] == 0
+
+
+async def test_upload_respects_concurrency_limit():
+    """同時アップロード数はconcurrency以下に制限される"""
+    aio = _FakeAio()
+    uploader = FileSearchUploader(SimpleNamespace(aio=aio), concurrency=3, poll_interval_seconds=0)
+
+    await uploader.upload_many("store", [(f"msg_{i}", "x") for i in range(12)])
+
+    assert aio.max_active_uploads == 3
+
+
+async def test_failed_upload_returns_none():
+    """失敗したアップロードはNoneとして記録される"""
+    aio = _FakeAio(fail_names={"msg_1"})
+    uploader = FileSearchUploader(SimpleNamespace(aio=aio), concurrency=2, poll_interval_seconds=0)
+
+    results = await uploader.upload_many("store", [("msg_0", "a"), ("msg_1", "b")])
+
+    assert results[0] == "fileSearchStores/s/documents/msg_0"
+    assert results[1] is None
+    assert uploader.stats()["failed"] == 1